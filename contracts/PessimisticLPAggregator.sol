@@ -0,0 +1,145 @@
+// SPDX-License-Identifier: AGLP-3.0
+pragma solidity ^0.8.20;
+
+import {Clones} from "@openzeppelin/contracts@5.3.0/proxy/Clones.sol";
+import {IERC20Metadata} from "@openzeppelin/contracts@5.3.0/token/ERC20/extensions/IERC20Metadata.sol";
+import {IChainLinkOracle} from "./interfaces/IChainLinkOracle.sol";
+import {IPessimisticVelodromeLPOracle} from "./interfaces/IPessimisticVelodromeLPOracle.sol";
+
+/**
+ * @title Pessimistic LP Aggregator
+ * @author Yearn Finance
+ * @notice Serves a single pool's price from our Velodrome LP pessimistic oracle in Chainlink's aggregator format, for
+ *  markets that only understand latestRoundData(). Prices are served from the oracle's stored last price while it is
+ *  fresh, and priced live otherwise. updatedAt always matches answer: the stored price's timestamp, or the current
+ *  block's for a live price.
+ *
+ *  Each aggregator is a minimal clone of this contract deployed by PessimisticLPAggregatorFactory, with its pool and
+ *  max age appended to the clone's code. This implementation isn't meant to be used directly.
+ */
+
+contract PessimisticLPAggregator is IChainLinkOracle {
+    /// @notice Oracle we pull our pool's price from.
+    /// @dev Immutable in our implementation's code, so shared by every clone.
+    IPessimisticVelodromeLPOracle public immutable oracle;
+
+    constructor(address _oracle) {
+        oracle = IPessimisticVelodromeLPOracle(_oracle);
+    }
+
+    /* ========== VIEW FUNCTIONS ========== */
+
+    /// @notice LP token this aggregator prices.
+    function pool() public view returns (address _pool) {
+        (_pool, ) = _getArgs();
+    }
+
+    /// @notice Maximum age in seconds of a stored oracle price before we price live instead.
+    function maxAge() public view returns (uint256 _maxAge) {
+        (, _maxAge) = _getArgs();
+    }
+
+    /// @notice Our prices use 8 decimals, same as our oracle and Chainlink USD feeds.
+    function decimals() external pure returns (uint8) {
+        return 8;
+    }
+
+    /// @notice Description of this aggregator's price, e.g. "vAMMV2-USDC/OP / USD".
+    function description() external view returns (string memory) {
+        return string.concat(IERC20Metadata(pool()).symbol(), " / USD");
+    }
+
+    /// @notice Version of this aggregator.
+    function version() external pure returns (uint256) {
+        return 1;
+    }
+
+    /**
+     * @notice Gets the current price of our pool in Chainlink's format.
+     * @dev If our oracle's stored price is missing, older than maxAge or priced with since-changed settings, we price
+     *  live and report the current block's timestamp, since that's when answer was computed. This means updatedAt is
+     *  never older than maxAge, so a consumer's staleness check won't notice keepers have stopped; watch our oracle's
+     *  lastPrices for that instead.
+     *
+     *  Our oracle doesn't have rounds, so each round ID is simply the timestamp its answer was computed at. Round IDs
+     *  never decrease, answeredInRound always equals roundId, and live answers in the same block share a round ID.
+     * @return roundId Round ID, equal to updatedAt.
+     * @return answer The price of one LP token, 8 decimals.
+     * @return startedAt Timestamp answer was computed at, same as updatedAt.
+     * @return updatedAt Timestamp answer was computed at, the current block's if it was priced live.
+     * @return answeredInRound Round ID, equal to roundId.
+     */
+    function latestRoundData()
+        public
+        view
+        returns (
+            uint80 roundId,
+            int256 answer,
+            uint256 startedAt,
+            uint256 updatedAt,
+            uint80 answeredInRound
+        )
+    {
+        (address _pool, uint256 _maxAge) = _getArgs();
+        (uint256 price, uint256 priceUpdatedAt) = oracle
+            .getCachedPoolPriceWithTimestamp(_pool, _maxAge);
+
+        roundId = uint80(priceUpdatedAt);
+        return (
+            roundId,
+            int256(price),
+            priceUpdatedAt,
+            priceUpdatedAt,
+            roundId
+        );
+    }
+
+    /**
+     * @notice Gets the price for a given round in Chainlink's format.
+     * @dev We don't keep historical rounds, so this reverts for any round besides the one latestRoundData would
+     *  currently return. See latestRoundData for how round IDs work.
+     * @param _roundId Round ID to check, must be our latest round ID.
+     */
+    function getRoundData(
+        uint80 _roundId
+    )
+        external
+        view
+        returns (
+            uint80 roundId,
+            int256 answer,
+            uint256 startedAt,
+            uint256 updatedAt,
+            uint80 answeredInRound
+        )
+    {
+        (
+            roundId,
+            answer,
+            startedAt,
+            updatedAt,
+            answeredInRound
+        ) = latestRoundData();
+        if (_roundId != roundId) {
+            revert("Only latest round available");
+        }
+    }
+
+    /// @notice Gets the current price of our pool, 8 decimals.
+    function latestAnswer() external view returns (int256 answer) {
+        (, answer, , , ) = latestRoundData();
+    }
+
+    // our pool and max age are appended to our clone's code
+    function _getArgs()
+        internal
+        view
+        returns (address _pool, uint256 _maxAge)
+    {
+        return
+            abi.decode(
+                Clones.fetchCloneArgs(address(this)),
+                (address, uint256)
+            );
+    }
+}
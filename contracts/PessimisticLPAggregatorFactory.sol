@@ -0,0 +1,110 @@
+// SPDX-License-Identifier: AGLP-3.0
+pragma solidity ^0.8.20;
+
+import {Clones} from "@openzeppelin/contracts@5.3.0/proxy/Clones.sol";
+import {PessimisticLPAggregator} from "./PessimisticLPAggregator.sol";
+
+/**
+ * @title Pessimistic LP Aggregator Factory
+ * @author Yearn Finance
+ * @notice Deploys Chainlink-compatible aggregators for pools priced by our Velodrome LP pessimistic oracle. Each
+ *  aggregator is an EIP-1167 minimal clone with its pool and max age baked into its code, so deploying one costs a
+ *  fraction of a full contract and reads don't touch storage outside of the oracle.
+ */
+
+contract PessimisticLPAggregatorFactory {
+    /// @notice Aggregator implementation that all of our clones point to.
+    address public immutable implementation;
+
+    /// @notice Oracle our aggregators pull prices from.
+    address public immutable oracle;
+
+    /// @notice Aggregator deployed for a given pool and max age, if any.
+    mapping(address => mapping(uint256 => address)) public aggregators; // pool => max age => aggregator
+
+    /* ========== CONSTRUCTOR ========== */
+
+    constructor(address _oracle) {
+        oracle = _oracle;
+        implementation = address(new PessimisticLPAggregator(_oracle));
+    }
+
+    /* ========== EVENTS ========== */
+
+    event AggregatorCreated(
+        address indexed pool,
+        uint256 maxAge,
+        address aggregator
+    );
+
+    /* ========== VIEW FUNCTIONS ========== */
+
+    /**
+     * @notice Address an aggregator for a given pool and max age is (or would be) deployed at.
+     * @param _pool LP token our aggregator prices.
+     * @param _maxAge Maximum age in seconds of a stored oracle price before our aggregator prices live.
+     * @return Address of our aggregator.
+     */
+    function predictAggregatorAddress(
+        address _pool,
+        uint256 _maxAge
+    ) external view returns (address) {
+        return
+            Clones.predictDeterministicAddressWithImmutableArgs(
+                implementation,
+                abi.encode(_pool, _maxAge),
+                bytes32(0)
+            );
+    }
+
+    /* ========== MUTATIVE FUNCTIONS ========== */
+
+    /**
+     * @notice Deploy an aggregator for a given pool.
+     * @dev Anyone may call this, aggregators are read-only. Only one aggregator may exist per pool and max age.
+     * @param _pool LP token our aggregator prices.
+     * @param _maxAge Maximum age in seconds of a stored oracle price before our aggregator prices live.
+     * @return Address of our new aggregator.
+     */
+    function createAggregator(
+        address _pool,
+        uint256 _maxAge
+    ) external returns (address) {
+        return _createAggregator(_pool, _maxAge);
+    }
+
+    /**
+     * @notice Deploy aggregators for many pools at once, all using the same max age.
+     * @dev Anyone may call this. Reverts if any of our pools already has an aggregator for this max age.
+     * @param _pools LP tokens to deploy aggregators for.
+     * @param _maxAge Maximum age in seconds of a stored oracle price before our aggregators price live.
+     * @return newAggregators Addresses of our new aggregators.
+     */
+    function createAggregators(
+        address[] calldata _pools,
+        uint256 _maxAge
+    ) external returns (address[] memory newAggregators) {
+        newAggregators = new address[](_pools.length);
+        for (uint256 i; i < _pools.length; ++i) {
+            newAggregators[i] = _createAggregator(_pools[i], _maxAge);
+        }
+    }
+
+    function _createAggregator(
+        address _pool,
+        uint256 _maxAge
+    ) internal returns (address aggregator) {
+        if (aggregators[_pool][_maxAge] != address(0)) {
+            revert("Aggregator already exists");
+        }
+
+        // our args make each clone's address unique, so no need for a salt
+        aggregator = Clones.cloneDeterministicWithImmutableArgs(
+            implementation,
+            abi.encode(_pool, _maxAge),
+            bytes32(0)
+        );
+        aggregators[_pool][_maxAge] = aggregator;
+        emit AggregatorCreated(_pool, _maxAge, aggregator);
+    }
+}
@@ -0,0 +1,575 @@
+// SPDX-License-Identifier: AGLP-3.0
+pragma solidity ^0.8.20;
+
+import {IERC4626} from "@openzeppelin/contracts@5.3.0/interfaces/IERC4626.sol";
+import {Ownable2Step, Ownable} from "@openzeppelin/contracts@5.3.0/access/Ownable2Step.sol";
+import {IYearnVaultV2} from "./interfaces/IYearnVaultV2.sol";
+import {IVeloPool} from "./interfaces/IVeloPool.sol";
+import {IChainLinkOracle} from "./interfaces/IChainLinkOracle.sol";
+import {ShareValueHelper} from "./ShareValueHelper.sol";
+import {FixedPointMathLib} from "./FixedPointMathLib.sol";
+
+/**
+ * @title Velodrome LP Pessimistic Single Oracle Base
+ * @author Yearn Finance
+ * @notice Pricing and daily low logic shared by our single-pool oracles. See PessimisticVeloSingleOracle for details
+ *  on how pricing works.
+ *
+ *  Our pool, feeds and TWAP settings never change after deployment, but where they live depends on how an oracle is
+ *  deployed: immutables for a full deployment, or args appended to a clone's code. Either way, we read them through
+ *  _getConfig().
+ */
+
+abstract contract PessimisticVeloSingleOracleBase is Ownable2Step {
+    // everything we need from our pool to price it, read once per pricing
+    struct PoolSnapshot {
+        uint256 decimals0; // note that this will be "1e18", not "18"
+        uint256 decimals1;
+        uint256 reserve0;
+        uint256 reserve1;
+        uint256 totalSupply;
+        bool stable;
+    }
+
+    // everything set on deployment for our pool
+    struct OracleConfig {
+        address pool;
+        address token0;
+        address token1;
+        address token0Feed;
+        address token1Feed;
+        uint96 token0Heartbeat;
+        uint96 token1Heartbeat;
+        uint256 points;
+        bool useChainlinkOnly;
+    }
+
+    /* ========== STATE VARIABLES ========== */
+
+    /// @notice Daily low price.
+    mapping(uint256 => uint256) public dailyLow; // day => price
+
+    /// @notice Number of times our token's price was checked on a given day.
+    mapping(uint256 => uint256) public dailyUpdates; // day => number of updates
+
+    /// @notice Whether we use a three-day low instead of a two-day low.
+    /// @dev May only be updated by owner. Realistically most useful when price updating is public, as this
+    ///  guarantees any price observations used must be at least 24 hours apart.
+    bool public useThreeDayLow = false;
+
+    /// @notice Chainlink feed to check that Optimism's sequencer is online.
+    /// @dev This prevents transactions sent while the sequencer is down from being executed when it comes back online.
+    IChainLinkOracle public constant sequencerUptimeFeed =
+        IChainLinkOracle(0x371EAD81c9102C9BF4874A9075FFFf170F2Ee389);
+
+    /// @notice Check if an address can update our LP pricing.
+    /// @dev May only be updated by owner.
+    mapping(address => bool) public operator;
+
+    /// @notice Used to track the deployed version of this contract.
+    string public constant apiVersion = "3.0.0a";
+
+    // our pool/LP token decimals, just in case velodrome has weird pools in the future with different decimals
+    uint256 internal constant DECIMALS = 10 ** 18;
+
+    /* ========== CONSTRUCTOR ========== */
+
+    constructor(address _owner) Ownable(_owner) {}
+
+    /* ========== EVENTS/MODIFIERS ========== */
+
+    event RecordDailyLow(uint256 price);
+    event OperatorUpdated(address indexed account, bool canEndorse);
+    event SetUseThreeDayLow(bool useThreeDayWindow);
+
+    /* ========== VIEW FUNCTIONS ========== */
+
+    /// @notice Address of the pool for this oracle.
+    function pool() external view returns (address) {
+        return _getConfig().pool;
+    }
+
+    /// @notice Address of the pool's token0.
+    function token0() external view returns (address) {
+        return _getConfig().token0;
+    }
+
+    /// @notice Address of the Chainlink price feed for token0.
+    function token0Feed() external view returns (address) {
+        return _getConfig().token0Feed;
+    }
+
+    /// @notice Heartbeat of the Chainlink price feed for token0.
+    function token0Heartbeat() external view returns (uint96) {
+        return _getConfig().token0Heartbeat;
+    }
+
+    /// @notice Address of the pool's token1.
+    function token1() external view returns (address) {
+        return _getConfig().token1;
+    }
+
+    /// @notice Address of the Chainlink price feed for token1.
+    function token1Feed() external view returns (address) {
+        return _getConfig().token1Feed;
+    }
+
+    /// @notice Heartbeat of the Chainlink price feed for token1.
+    function token1Heartbeat() external view returns (uint96) {
+        return _getConfig().token1Heartbeat;
+    }
+
+    /// @notice Custom number of periods our TWAP price should cover.
+    /// @dev Set on deployment, default is 4 (2 hours).
+    function points() external view returns (uint256) {
+        return _getConfig().points;
+    }
+
+    /// @notice Whether we only use Chainlink feeds or allow TWAP for one of the two assets.
+    function useChainlinkOnly() external view returns (bool) {
+        return _getConfig().useChainlinkOnly;
+    }
+
+    /**
+     * @notice Check the last time a token's Chainlink price was updated.
+     * @dev Useful for external checks if a price is stale. Reverts if no Chainlink feed set.
+     * @param _tokenIndex The index of the token to get the price of (0 or 1).
+     * @return updatedAt The timestamp of our last price update.
+     */
+    function chainlinkPriceLastUpdated(
+        uint256 _tokenIndex
+    ) external view returns (uint256 updatedAt) {
+        OracleConfig memory config = _getConfig();
+        if (_tokenIndex == 0) {
+            (, , , updatedAt, ) = IChainLinkOracle(config.token0Feed)
+                .latestRoundData();
+        } else {
+            (, , , updatedAt, ) = IChainLinkOracle(config.token1Feed)
+                .latestRoundData();
+        }
+    }
+
+    /// @notice Current day used for storing daily lows.
+    /// @dev Note that this is in unix time.
+    function currentDay() public view returns (uint256) {
+        return block.timestamp / 1 days;
+    }
+
+    /*
+     * @notice Gets the current price of Yearn V3 Velodrome vault token.
+     * @dev Will use fair reserves and pessimistic pricing as desired, and account for vault profits.
+     * @param _vault Vault token whose price we want to check.
+     * @param _usePessimisticPricing Whether we use our pessimistic pricing or not.
+     * @return The current price of one LP token.
+     */
+    function getCurrentVaultPriceV3(
+        address _vault,
+        bool _usePessimisticPricing
+    ) external view returns (uint256) {
+        IERC4626 vault = IERC4626(_vault);
+        require(vault.asset() == _getConfig().pool, "!pool");
+
+        if (_usePessimisticPricing) {
+            return
+                (_getAdjustedPrice() * vault.convertToAssets(DECIMALS)) /
+                DECIMALS;
+        } else {
+            return
+                (_getFairReservesPricing() * vault.convertToAssets(DECIMALS)) /
+                DECIMALS;
+        }
+    }
+
+    /*
+     * @notice Gets the current price of Yearn V2 Velodrome vault token.
+     * @dev Will use fair reserves and pessimistic pricing as desired, and account for vault profits.
+     * @param _vault Vault token whose price we want to check..
+     * @param _usePessimisticPricing Whether we use our pessimistic pricing or not.
+     * @return The current price of one LP token.
+     */
+    function getCurrentVaultPriceV2(
+        address _vault,
+        bool _usePessimisticPricing
+    ) external view returns (uint256) {
+        IYearnVaultV2 vault = IYearnVaultV2(_vault);
+        require(vault.token() == _getConfig().pool, "!pool");
+
+        if (_usePessimisticPricing) {
+            return
+                (_getAdjustedPrice() *
+                    ShareValueHelper.sharesToAmount(_vault, DECIMALS)) /
+                DECIMALS;
+        } else {
+            return
+                (_getFairReservesPricing() *
+                    ShareValueHelper.sharesToAmount(_vault, DECIMALS)) /
+                DECIMALS;
+        }
+    }
+
+    /*
+     * @notice Gets the current price of a our Velodrome LP token.
+     * @dev Will use fair reserves and pessimistic pricing if enabled.
+     * @param _usePessimisticPricing Whether we use our pessimistic pricing or not.
+     * @return The current price of one LP token.
+     */
+    function getCurrentPoolPrice(
+        bool _usePessimisticPricing
+    ) external view returns (uint256) {
+        if (_usePessimisticPricing) {
+            return _getAdjustedPrice();
+        } else {
+            return _getFairReservesPricing();
+        }
+    }
+
+    /**
+     * @notice Returns the Chainlink feed price of the given token address.
+     * @dev Will revert if price is negative or feed is not added.
+     * @param _tokenIndex The index of the token to get the price of (0 or 1).
+     * @return currentPrice The current price of the underlying token.
+     */
+    function getChainlinkPrice(
+        uint256 _tokenIndex
+    ) external view returns (uint256 currentPrice) {
+        return _getChainlinkPrice(_getConfig(), _tokenIndex);
+    }
+
+    /**
+     * @notice Returns the TWAP price for a token relative to the other token in its pool.
+     * @dev Note that we can customize the length of points but we default to 4 points (2 hours). Additionally, if a
+     *  pool is very small, it may not be priced as accurately if we attempt to use 1 full token to price.
+     * @param _token The address of the token to get the price of, and that we are swapping in.
+     * @param _tokenAmount Amount of the token we are swapping in.
+     * @return twapPrice Amount of other token we get when swapping in _tokenAmount looking back over our TWAP period.
+     */
+    function getTwapPrice(
+        address _token,
+        uint256 _tokenAmount
+    ) external view returns (uint256 twapPrice) {
+        return _getTwapPrice(_getConfig(), _token, _tokenAmount);
+    }
+
+    // by default we use 0.01 tokens in this function to more accurately price small pools
+    function getTokenPrices()
+        public
+        view
+        returns (uint256 price0, uint256 price1)
+    {
+        OracleConfig memory config = _getConfig();
+        return _getTokenPrices(config, _getPoolSnapshot(config));
+    }
+
+    /* ========== MUTATIVE FUNCTIONS ========== */
+
+    /// @notice Checks current token price and saves the price if it is the day's lowest.
+    /// @dev This may only be called by approved addresses; the more frequently it is called the better.
+    // @param _pool LP token to update pricing for.
+    function updatePrice() external {
+        // don't let just anyone update deez prices
+        require(operator[msg.sender], "unauthorized");
+        _updatePrice();
+    }
+
+    // internal logic to update our stored daily low pool prices
+    function _updatePrice() internal {
+        // get current fair reserves pricing
+        uint256 currentPrice = _getFairReservesPricing();
+
+        // increment our counter whether we store the price or not
+        uint256 day = currentDay();
+        dailyUpdates[day] += 1;
+
+        // store price if it's today's low
+        uint256 todaysLow = dailyLow[day];
+        if (todaysLow == 0 || currentPrice < todaysLow) {
+            dailyLow[day] = currentPrice;
+            emit RecordDailyLow(currentPrice);
+        }
+    }
+
+    /* ========== HELPER VIEW FUNCTIONS ========== */
+
+    // our pool, tokens, feeds and TWAP settings, however they're stored
+    function _getConfig() internal view virtual returns (OracleConfig memory);
+
+    // make sure a config can actually price its pool, reverting if not
+    function _checkConfig(OracleConfig memory _config) internal view {
+        // The default number of periods (points) we look back in time for TWAP pricing.
+        // Each period is 30 mins, so minimum is 2 hours.
+        require(_config.points > 3, "!points");
+
+        if (
+            _config.token0Feed == address(0) &&
+            _config.token1Feed == address(0)
+        ) {
+            revert("At least one token must have CL oracle");
+        }
+
+        // revert if we are supposed to only use chainlink
+        if (
+            _config.useChainlinkOnly &&
+            (_config.token0Feed == address(0) ||
+                _config.token1Feed == address(0))
+        ) {
+            revert("Only Chainlink feeds supported");
+        }
+
+        // we always expect 8 decimals for USD pricing
+        if (
+            _config.token0Feed != address(0) &&
+            IChainLinkOracle(_config.token0Feed).decimals() != 8
+        ) {
+            revert("Must be 8 decimals");
+        }
+        if (
+            _config.token1Feed != address(0) &&
+            IChainLinkOracle(_config.token1Feed).decimals() != 8
+        ) {
+            revert("Must be 8 decimals");
+        }
+    }
+
+    function _getChainlinkPrice(
+        OracleConfig memory _config,
+        uint256 _tokenIndex
+    ) internal view returns (uint256 currentPrice) {
+        address feedAddress;
+        uint256 heartbeat;
+        if (_tokenIndex == 0) {
+            feedAddress = _config.token0Feed;
+            heartbeat = _config.token0Heartbeat;
+        } else {
+            feedAddress = _config.token1Feed;
+            heartbeat = _config.token1Heartbeat;
+        }
+
+        // pull latest data
+        (, int256 price, , uint256 updatedAt, ) = IChainLinkOracle(feedAddress)
+            .latestRoundData();
+
+        // if a price is older than our preset heartbeat, we're in trouble
+        if (block.timestamp - updatedAt > heartbeat) {
+            revert("Price is stale");
+        }
+
+        // you mean we can't have negative prices?
+        if (price <= 0) {
+            revert("Invalid feed price");
+        }
+
+        // make sure the sequencer is up
+        // uint80 roundID int256 sequencerAnswer, uint256 startedAt, uint256 updatedAt, uint80 answeredInRound
+        (, int256 sequencerAnswer, , , ) = sequencerUptimeFeed
+            .latestRoundData();
+
+        // Answer == 0: Sequencer is up
+        // Answer == 1: Sequencer is down
+        if (sequencerAnswer == 1) {
+            revert("L2 sequencer down");
+        }
+        currentPrice = uint256(price);
+    }
+
+    function _getTwapPrice(
+        OracleConfig memory _config,
+        address _token,
+        uint256 _tokenAmount
+    ) internal view returns (uint256 twapPrice) {
+        IVeloPool poolContract = IVeloPool(_config.pool);
+
+        // swapping one of our token gets us this many otherToken, returned in decimals of the other token
+        twapPrice = poolContract.quote(_token, _tokenAmount, _config.points);
+    }
+
+    // since this is called on every check for pricing, a potential liquidator could manipulate the price downward to liquidate a user
+
+    // adjust our reported pool price as needed for 48-hour lows and hard upper/lower limits
+    function _getAdjustedPrice() internal view returns (uint256 adjustedPrice) {
+        // start off with our standard price
+        uint256 day = currentDay();
+
+        // if we haven't updated yet today, pretend it's yesterday instead
+        if (dailyUpdates[day] == 0) {
+            day -= 1;
+            require(dailyUpdates[day] > 0, "!updates");
+        }
+
+        // get today's low
+        uint256 todaysLow = dailyLow[day];
+
+        // get yesterday's low
+        uint256 yesterdaysLow = dailyLow[day - 1];
+
+        // calculate price based on two-day low
+        adjustedPrice = todaysLow > yesterdaysLow && yesterdaysLow > 0
+            ? yesterdaysLow
+            : todaysLow;
+
+        // if using three-day low, compare again
+        if (useThreeDayLow) {
+            uint256 dayBeforeYesterdaysLow = dailyLow[day - 2];
+            adjustedPrice = adjustedPrice > dayBeforeYesterdaysLow &&
+                dayBeforeYesterdaysLow > 0
+                ? dayBeforeYesterdaysLow
+                : adjustedPrice;
+        }
+    }
+
+    // calculate price based on fair reserves, not spot reserves
+    function _getFairReservesPricing()
+        internal
+        view
+        returns (uint256 fairReservesPricing)
+    {
+        OracleConfig memory config = _getConfig();
+        PoolSnapshot memory snapshot = _getPoolSnapshot(config);
+
+        // make sure our reserves are normalized to 18 decimals (looking at you, USDC)
+        uint256 reserve0 = (snapshot.reserve0 * DECIMALS) / snapshot.decimals0;
+        uint256 reserve1 = (snapshot.reserve1 * DECIMALS) / snapshot.decimals1;
+
+        // pull our prices
+        (uint256 price0, uint256 price1) = _getTokenPrices(config, snapshot);
+
+        if (snapshot.stable) {
+            fairReservesPricing = _calculate_stable_lp_token_price(
+                snapshot.totalSupply,
+                price0,
+                price1,
+                reserve0,
+                reserve1,
+                8
+            );
+        } else {
+            uint256 k = FixedPointMathLib.sqrt(reserve0 * reserve1); // xy = k, p0r0' = p1r1', this is in 1e18
+            uint256 p = FixedPointMathLib.sqrt(price0 * 1e16 * price1); // boost this to 1e16 to give us more precision
+
+            // we want k and total supply to have same number of decimals so price has decimals of chainlink oracle
+            fairReservesPricing = (2 * p * k) / (1e8 * snapshot.totalSupply);
+        }
+    }
+
+    function _getTokenPrices(
+        OracleConfig memory _config,
+        PoolSnapshot memory _snapshot
+    ) internal view returns (uint256 price0, uint256 price1) {
+        uint256 decimals0 = _snapshot.decimals0;
+        uint256 decimals1 = _snapshot.decimals1;
+
+        // check if we have chainlink feeds or TWAP for each token
+        if (_config.token0Feed != address(0)) {
+            price0 = _getChainlinkPrice(_config, 0); // returned with 8 decimals
+            if (_config.token1Feed != address(0)) {
+                price1 = _getChainlinkPrice(_config, 1); // returned with 8 decimals
+            } else {
+                // get twap price for token1. this is the amount of token1 we would get from 1 token0
+                price1 =
+                    ((decimals1 * decimals1) / 100) /
+                    _getTwapPrice(
+                        _config,
+                        _config.token0,
+                        decimals0 / 100
+                    ); // returned in decimals1
+                price1 = (price0 * price1) / (decimals1);
+            }
+        } else if (_config.token1Feed != address(0)) {
+            price1 = _getChainlinkPrice(_config, 1); // returned with 8 decimals
+            // get twap price for token0
+            price0 =
+                ((decimals0 * decimals0) / 100) /
+                _getTwapPrice(
+                    _config,
+                    _config.token1,
+                    decimals1 / 100
+                ); // returned in decimals0
+            price0 = (price0 * price1) / (decimals0);
+        }
+    }
+
+    // get what we need to calculate our reserves and pricing
+    function _getPoolSnapshot(
+        OracleConfig memory _config
+    ) internal view returns (PoolSnapshot memory snapshot) {
+        IVeloPool poolContract = IVeloPool(_config.pool);
+        if (poolContract.decimals() != 18) {
+            revert("Lp token must have 18 decimals");
+        }
+
+        // our tokens are immutable, so we skip them here
+        (
+            snapshot.decimals0,
+            snapshot.decimals1,
+            snapshot.reserve0,
+            snapshot.reserve1,
+            snapshot.stable,
+            ,
+
+        ) = poolContract.metadata();
+        snapshot.totalSupply = poolContract.totalSupply();
+    }
+
+    // solves for cases where curve is x^3 * y + y^3 * x = k
+    // fair reserves math formula author: @ksyao2002
+    function _calculate_stable_lp_token_price(
+        uint256 total_supply,
+        uint256 price0,
+        uint256 price1,
+        uint256 reserve0,
+        uint256 reserve1,
+        uint256 priceDecimals
+    ) internal pure returns (uint256) {
+        uint256 k = _getK(reserve0, reserve1);
+        // fair_reserves = ( (k * (price0 ** 3) * (price1 ** 3)) )^(1/4) / ((price0 ** 2) + (price1 ** 2));
+        price0 *= 1e18 / (10 ** priceDecimals); // convert to 18 dec
+        price1 *= 1e18 / (10 ** priceDecimals);
+        uint256 a = FixedPointMathLib.rpow(price0, 3, 1e18); // keep same decimals as chainlink
+        uint256 b = FixedPointMathLib.rpow(price1, 3, 1e18);
+        uint256 c = FixedPointMathLib.rpow(price0, 2, 1e18);
+        uint256 d = FixedPointMathLib.rpow(price1, 2, 1e18);
+
+        uint256 p0 = k * FixedPointMathLib.mulWadDown(a, b); // 2*18 decimals
+
+        uint256 fair = p0 / (c + d); // number of decimals is 18
+
+        // each sqrt divides the num decimals by 2. So need to replenish the decimals midway through with another 1e18
+        uint256 frth_fair = FixedPointMathLib.sqrt(
+            FixedPointMathLib.sqrt(fair * 1e18) * 1e18
+        ); // number of decimals is 18
+
+        return 2 * ((frth_fair * (10 ** priceDecimals)) / total_supply); // converts to chainlink decimals
+    }
+
+    function _getK(uint256 x, uint256 y) internal pure returns (uint256) {
+        //x, n, scalar
+        uint256 x_cubed = FixedPointMathLib.rpow(x, 3, 1e18);
+        uint256 newX = FixedPointMathLib.mulWadDown(x_cubed, y);
+        uint256 y_cubed = FixedPointMathLib.rpow(y, 3, 1e18);
+        uint256 newY = FixedPointMathLib.mulWadDown(y_cubed, x);
+
+        return newX + newY; // 18 decimals
+    }
+
+    /* ========== SETTERS ========== */
+
+    /*
+     * @notice Set whether we look back two or three days when using pessimistic pricing.
+     * @dev This may only be called by owner.
+     * @param _useThreeDayLow True for three day window, false for two day window.
+     */
+    function setUseThreeDayLow(bool _useThreeDayLow) external onlyOwner {
+        useThreeDayLow = _useThreeDayLow;
+        emit SetUseThreeDayLow(_useThreeDayLow);
+    }
+
+    /**
+     * @notice Set the ability of an address to update LP pricing.
+     * @dev Throws if caller is not owner.
+     * @param _addr The address to approve or deny access.
+     * @param _approved Allowed to update prices
+     */
+    function setOperator(address _addr, bool _approved) external onlyOwner {
+        operator[_addr] = _approved;
+        emit OperatorUpdated(_addr, _approved);
+    }
+}
@@ -0,0 +1,44 @@
+// SPDX-License-Identifier: AGLP-3.0
+pragma solidity ^0.8.20;
+
+import {Clones} from "@openzeppelin/contracts@5.3.0/proxy/Clones.sol";
+import {PessimisticVeloSingleOracleBase} from "./PessimisticVeloSingleOracleBase.sol";
+
+/**
+ * @title Velodrome LP Pessimistic Single Oracle Clone
+ * @author Yearn Finance
+ * @notice Same as PessimisticVeloSingleOracle, but deployed as a minimal clone by PessimisticVeloSingleOracleFactory.
+ *  Our pool, feeds and TWAP settings are appended to the clone's code instead of being stored as immutables, so
+ *  onboarding a pool costs a fraction of a full deployment. This implementation isn't meant to be used directly.
+ */
+
+contract PessimisticVeloSingleOracleClone is PessimisticVeloSingleOracleBase {
+    /* ========== CONSTRUCTOR ========== */
+
+    // our implementation is owned by its deployer so it can never be initialized
+    constructor() PessimisticVeloSingleOracleBase(msg.sender) {}
+
+    /**
+     * @notice Set up a freshly deployed clone, making sure its config can price its pool.
+     * @dev May only be called once, as our owner must be unset.
+     * @param _owner Owner role. Can set operators and adjust 2 vs 3 day pessimistic pricing.
+     * @param _operator Address allowed to update our pricing, typically our factory.
+     */
+    function initialize(address _owner, address _operator) external {
+        require(owner() == address(0), "initialized");
+        require(_owner != address(0), "!owner");
+        _checkConfig(_getConfig());
+
+        _transferOwnership(_owner);
+        operator[_operator] = true;
+        emit OperatorUpdated(_operator, true);
+    }
+
+    /* ========== HELPER VIEW FUNCTIONS ========== */
+
+    // our config is appended to our clone's code
+    function _getConfig() internal view override returns (OracleConfig memory) {
+        return
+            abi.decode(Clones.fetchCloneArgs(address(this)), (OracleConfig));
+    }
+}
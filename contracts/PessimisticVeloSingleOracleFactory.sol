@@ -0,0 +1,169 @@
+// SPDX-License-Identifier: AGLP-3.0
+pragma solidity ^0.8.20;
+
+import {Clones} from "@openzeppelin/contracts@5.3.0/proxy/Clones.sol";
+import {Ownable2Step, Ownable} from "@openzeppelin/contracts@5.3.0/access/Ownable2Step.sol";
+import {IVeloPool} from "./interfaces/IVeloPool.sol";
+import {PessimisticVeloSingleOracleBase} from "./PessimisticVeloSingleOracleBase.sol";
+import {PessimisticVeloSingleOracleClone} from "./PessimisticVeloSingleOracleClone.sol";
+
+/**
+ * @title Velodrome LP Pessimistic Single Oracle Factory
+ * @author Yearn Finance
+ * @notice Deploys single-pool oracles as minimal clones with immutable args, and keeps a registry of every oracle
+ *  deployed for each pool. Each oracle makes this factory an operator, so keepers can update every oracle in one
+ *  transaction with updateMany.
+ */
+
+contract PessimisticVeloSingleOracleFactory is Ownable2Step {
+    /* ========== STATE VARIABLES ========== */
+
+    /// @notice Oracle implementation that all of our clones point to.
+    address public immutable implementation;
+
+    /// @notice Every oracle we've deployed.
+    address[] public allOracles;
+
+    // every oracle we've deployed for a given pool
+    mapping(address => address[]) internal poolOracles;
+
+    /// @notice Check if an address can update pricing through this factory.
+    /// @dev May only be updated by owner.
+    mapping(address => bool) public operator;
+
+    /* ========== CONSTRUCTOR ========== */
+
+    constructor(address _owner) Ownable(_owner) {
+        implementation = address(new PessimisticVeloSingleOracleClone());
+    }
+
+    /* ========== EVENTS ========== */
+
+    event OracleCreated(address indexed pool, address oracle);
+    event OperatorUpdated(address indexed account, bool canEndorse);
+
+    /* ========== VIEW FUNCTIONS ========== */
+
+    /// @notice Number of oracles we've deployed.
+    function allOraclesLength() external view returns (uint256) {
+        return allOracles.length;
+    }
+
+    /// @notice Every oracle we've deployed, useful for keepers building an updateMany call.
+    function getAllOracles() external view returns (address[] memory) {
+        return allOracles;
+    }
+
+    /**
+     * @notice Every oracle we've deployed for a given pool, oldest first.
+     * @param _pool LP token to check.
+     * @return Oracles pricing this pool.
+     */
+    function getPoolOracles(
+        address _pool
+    ) external view returns (address[] memory) {
+        return poolOracles[_pool];
+    }
+
+    /**
+     * @notice Gets the current LP token prices of many single-pool oracles in one call.
+     * @param _oracles Oracles whose prices we want to check.
+     * @param _usePessimisticPricing Whether we use our pessimistic pricing or not.
+     * @return prices The current price of one LP token from each oracle.
+     */
+    function getManyPoolPrices(
+        address[] calldata _oracles,
+        bool _usePessimisticPricing
+    ) external view returns (uint256[] memory prices) {
+        prices = new uint256[](_oracles.length);
+        for (uint256 i; i < _oracles.length; ++i) {
+            prices[i] = PessimisticVeloSingleOracleBase(_oracles[i])
+                .getCurrentPoolPrice(_usePessimisticPricing);
+        }
+    }
+
+    /* ========== MUTATIVE FUNCTIONS ========== */
+
+    /**
+     * @notice Deploy a new single-pool oracle.
+     * @dev This may only be called by owner. Our new oracle makes this factory an operator.
+     * @param _pool Address of the Velodrome pool this oracle is pricing.
+     * @param _useChainlinkOnly Whether to require that we only price using Chainlink feeds.
+     * @param _token0Feed The Chainlink feed for token0.
+     * @param _token1Feed The Chainlink feed for token1.
+     * @param _token0Heartbeat The heartbeat for our token0 feed (maximum time allowed before refresh).
+     * @param _token1Heartbeat The heartbeat for our token1 feed (maximum time allowed before refresh).
+     * @param _twapPoints Number of samples for TWAP pricing. Minimum is 4 (2 hours).
+     * @param _owner Owner of our new oracle. Can set operators and adjust 2 vs 3 day pessimistic pricing.
+     * @return oracle Address of our new oracle.
+     */
+    function createOracle(
+        address _pool,
+        bool _useChainlinkOnly,
+        address _token0Feed,
+        address _token1Feed,
+        uint96 _token0Heartbeat,
+        uint96 _token1Heartbeat,
+        uint256 _twapPoints,
+        address _owner
+    ) external onlyOwner returns (address oracle) {
+        (, , , , , address token0, address token1) = IVeloPool(_pool)
+            .metadata();
+
+        oracle = Clones.cloneWithImmutableArgs(
+            implementation,
+            abi.encode(
+                PessimisticVeloSingleOracleBase.OracleConfig({
+                    pool: _pool,
+                    token0: token0,
+                    token1: token1,
+                    token0Feed: _token0Feed,
+                    token1Feed: _token1Feed,
+                    token0Heartbeat: _token0Feed == address(0)
+                        ? 0
+                        : _token0Heartbeat,
+                    token1Heartbeat: _token1Feed == address(0)
+                        ? 0
+                        : _token1Heartbeat,
+                    points: _twapPoints,
+                    useChainlinkOnly: _useChainlinkOnly
+                })
+            )
+        );
+        PessimisticVeloSingleOracleClone(oracle).initialize(
+            _owner,
+            address(this)
+        );
+
+        allOracles.push(oracle);
+        poolOracles[_pool].push(oracle);
+        emit OracleCreated(_pool, oracle);
+    }
+
+    /**
+     * @notice Checks current prices for many single-pool oracles and saves any new daily lows.
+     * @dev This may only be called by approved addresses. Each oracle must still have this factory as an operator.
+     * @param _oracles Oracles to update pricing for.
+     */
+    function updateMany(address[] calldata _oracles) external {
+        // don't let just anyone update deez prices
+        require(operator[msg.sender], "unauthorized");
+
+        for (uint256 i; i < _oracles.length; ++i) {
+            PessimisticVeloSingleOracleBase(_oracles[i]).updatePrice();
+        }
+    }
+
+    /* ========== SETTERS ========== */
+
+    /**
+     * @notice Set the ability of an address to update LP pricing through this factory.
+     * @dev Throws if caller is not owner.
+     * @param _addr The address to approve or deny access.
+     * @param _approved Allowed to update prices
+     */
+    function setOperator(address _addr, bool _approved) external onlyOwner {
+        operator[_addr] = _approved;
+        emit OperatorUpdated(_addr, _approved);
+    }
+}
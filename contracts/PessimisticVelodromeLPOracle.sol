@@ -1,5 +1,5 @@
 // SPDX-License-Identifier: AGLP-3.0
-pragma solidity ^0.8.19;
+pragma solidity ^0.8.24;
 
 import {IERC4626} from "@openzeppelin/contracts@4.9.3/interfaces/IERC4626.sol";
 import {IYearnVaultV2} from "./interfaces/IYearnVaultV2.sol";
@@ -38,13 +38,98 @@ contract PessimisticVelodromeLPOracle {
         uint96 heartbeat;
     }
 
+    // immutable pool metadata cached when a pool is registered, packed into two words
+    struct PoolInfo {
+        address token0;
+        uint8 decimals0; // note that this is "18", not "1e18"
+        uint8 decimals1;
+        bool stable;
+        address token1;
+        uint32 index; // position in registeredPools plus one, zero if unregistered
+    }
+
+    // everything we need from a pool to price it, read once per pricing
+    struct PoolSnapshot {
+        address pool;
+        address token0;
+        address token1;
+        uint256 decimals0; // note that this will be "1e18", not "18"
+        uint256 decimals1;
+        uint256 reserve0;
+        uint256 reserve1;
+        uint256 totalSupply;
+        bool stable;
+        bool token0HasFeed;
+        bool token1HasFeed;
+    }
+
+    // prices already pulled during a call, so batches only read each feed (and our sequencer), pool or vault once
+    struct PriceCache {
+        address[] tokens;
+        uint256[] prices;
+        uint256 length;
+        bool sequencerChecked;
+    }
+
+    // fair reserves price computed by the last update of a pool, packed into a single slot. our pessimistic window
+    //  and price bounds are applied when it's read, so only settings that change the fair price itself can stale it.
+    struct LastPrice {
+        uint96 fairPrice;
+        uint32 timestamp;
+        uint32 blockNumber;
+        uint96 settingsEpoch; // _fairPriceEpoch when this was priced, older prices are ignored
+    }
+
+    // snapshot of a token's feed for monitoring, see getFeedHealth
+    struct FeedHealth {
+        address feedAddress;
+        uint96 heartbeat;
+        int256 answer;
+        uint256 updatedAt;
+        uint256 secondsUntilStale; // zero once stale
+        bool isStale; // true if pricing with this feed would revert
+    }
+
+    // every intermediate value behind a pool's price, see getPriceBreakdown
+    struct PriceBreakdown {
+        address token0;
+        address token1;
+        bool stable;
+        uint256 totalSupply;
+        uint256 reserve0; // normalized to 18 decimals
+        uint256 reserve1;
+        uint256 price0; // 8 decimals, as with our feeds
+        uint256 price1;
+        address twapToken; // token priced with our TWAP, zero if both have feeds
+        uint256 twapQuote; // raw TWAP quote for one unit of the other token, in twapToken's decimals
+        uint256 k; // sqrt(x * y) for volatile pools, x^3y + y^3x for stable pools
+        uint256 fairPrice;
+        uint256 todaysLow; // stored lows, not including the current price
+        uint256 yesterdaysLow;
+        uint256 dayBeforeYesterdaysLow;
+        uint256 adjustedPrice; // lowest of fairPrice and our window's lows, before price bounds
+        uint256 upperBound;
+        uint256 lowerBound;
+        bool useAdjustedPricing;
+        bool useThreeDayLow;
+        uint256 windowDays; // length of the window our adjusted price covers
+        bool outOfBounds; // true if getCurrentPoolPrice would revert on our price bounds
+        uint256 reportedPrice; // what getCurrentPoolPrice returns, zero if out of bounds
+    }
+
     /* ========== STATE VARIABLES ========== */
 
-    /// @notice Daily low price stored per token.
-    mapping(address => mapping(uint256 => uint256)) public dailyLows; // token => day => price
+    // packed ring buffer holding the last three days of lows and update counts for each pool, in a single word.
+    //  bits [0, 16) hold the (wrapping) day of our last update, followed by one 80-bit slot per day (day % 3), each
+    //  holding a 64-bit packed low and a 16-bit update counter. see _packLow for how lows are packed.
+    mapping(address => uint256) internal lowsBuffer; // pool => packed buffer
 
-    /// @notice Number of times a token's price was checked on a given day.
-    mapping(address => mapping(uint256 => uint256)) public dailyUpdates; // token => day => number of updates
+    // slots that have rolled out of a pool's ring buffer, kept so older days can still be queried
+    mapping(address => mapping(uint256 => uint256)) internal archivedLows; // pool => day => packed slot
+
+    /// @notice Fair reserves price stored by the most recent update of each pool.
+    /// @dev Read by getCachedPoolPrice to skip recomputing prices.
+    mapping(address => LastPrice) public lastPrices;
 
     /// @notice A hard upper bound on our LP token price. This puts a cap on bad debt from oracle errors in a market.
     /// @dev May only be updated by operator.
@@ -60,9 +145,16 @@ contract PessimisticVelodromeLPOracle {
 
     /// @notice Whether we use a three-day low instead of a two-day low.
     /// @dev May only be updated by operator. Realistically most useful when price updating is public, as this
-    ///  guarantees any price observations used must be at least 24 hours apart.
+    ///  guarantees any price observations used must be at least 24 hours apart. Pools with a custom window (see
+    ///  setWindowDays) ignore this.
     bool public useThreeDayLow = false;
 
+    // per-pool window settings, packed into a single word. bits [0, 8) hold the window length in days (zero to use
+    //  our global two or three day window), bits [8, 40) the day our older lows were last computed on, bits [40, 104)
+    //  the packed lowest low of that day's window days that have rolled out of our ring buffer, and bits [104, 168)
+    //  the same for the day after. those older days are all over by then, so tomorrow's can be worked out today.
+    mapping(address => uint256) internal windowLows; // pool => packed window
+
     /// @notice Whether we only use Chainlink feeds or allow TWAP for one of the two assets.
     /// @dev May only be updated by operator.
     bool public useChainlinkOnly = false;
@@ -75,11 +167,30 @@ contract PessimisticVelodromeLPOracle {
     /// @dev May only be updated by operator, default is 4 (2 hours).
     mapping(address => uint256) public pointsOverride;
 
+    /// @notice Whether a pool's TWAP is derived from its cumulative reserves instead of pool.quote().
+    /// @dev May only be updated by operator. Cost of a cumulative TWAP doesn't depend on the number of points used.
+    mapping(address => bool) public useCumulativeTwap;
+
     /// @notice Chainlink feed to check that Optimism's sequencer is online.
     /// @dev This prevents transactions sent while the sequencer is down from being executed when it comes back online.
     IChainLinkOracle public constant sequencerUptimeFeed =
         IChainLinkOracle(0x371EAD81c9102C9BF4874A9075FFFf170F2Ee389);
 
+    /// @notice Cached metadata for pools in our registry.
+    /// @dev May only be updated by operator. Registered pools skip external metadata reads when priced.
+    mapping(address => PoolInfo) public poolInfo;
+
+    /// @notice All pools in our registry.
+    /// @dev May only be updated by operator. Note that indices may change when a pool is unregistered.
+    address[] public registeredPools;
+
+    // bumped by setters that change every pool's fair price (feeds, chainlink only), so prices memoized in transient
+    //  storage or stored in lastPrices before the change are ignored. see _fairPriceEpoch.
+    uint256 internal settingsEpoch;
+
+    // same as settingsEpoch, but for settings that only change a single pool's fair price (TWAP points and mode)
+    mapping(address => uint256) internal poolSettingsEpochs; // pool => epoch
+
     /// @notice Check if an address can update our LP pricing.
     /// @dev May only be updated by operator.
     mapping(address => bool) public priceUpdatooors;
@@ -101,6 +212,28 @@ contract PessimisticVelodromeLPOracle {
     // our pool/LP token decimals, just in case velodrome has weird pools in the future with different decimals
     uint256 internal constant DECIMALS = 10 ** 18;
 
+    // number of days of lows held in each pool's ring buffer
+    uint256 internal constant BUFFER_DAYS = 3;
+
+    // masks for our ring buffer's day stamp, a single day's slot, and the packed low within a slot
+    uint256 internal constant DAY_MASK = type(uint16).max;
+    uint256 internal constant SLOT_MASK = type(uint80).max;
+    uint256 internal constant LOW_MASK = type(uint64).max;
+
+    /// @notice The longest pessimistic window a pool may use, in days.
+    uint256 public constant MAX_WINDOW_DAYS = 7;
+
+    // masks for a pool's window length and the day its older low was computed for
+    uint256 internal constant WINDOW_DAYS_MASK = type(uint8).max;
+    uint256 internal constant WINDOW_DAY_MASK = type(uint32).max;
+
+    // set on memoized prices so we can tell a memoized zero from an empty slot
+    uint256 internal constant MEMO_FLAG = 1 << 255;
+
+    // transient counter bumped by setters applied on read (window, bounds, adjusted pricing), see _adjustedMemoSlot
+    uint256 internal constant MEMO_RESET_SLOT =
+        uint256(keccak256("PessimisticVelodromeLPOracle.memoReset"));
+
     /* ========== CONSTRUCTOR ========== */
 
     constructor(address _operator) {
@@ -117,15 +250,31 @@ contract PessimisticVelodromeLPOracle {
         uint256 lowerPriceCap
     );
     event UpdatedPointsOverride(address pool, uint256 points);
+    event UpdatedManyPointsOverrides(address[] pools, uint256[] points);
+    event ManyManualPriceCapsUpdated(
+        address[] tokens,
+        uint256[] upperPriceCaps,
+        uint256[] lowerPriceCaps
+    );
     event ChangeOperator(address indexed newOperator);
     event SetTokenFeed(
         address indexed token,
         address indexed feed,
         uint96 heartbeat
     );
+    event SetTokenFeeds(
+        address[] tokens,
+        address[] feeds,
+        uint96[] heartbeats
+    );
     event SetUseAdjustedPricing(bool useAdjusted, bool useThreeDayWindow);
     event SetUseChainlinkOnly(bool onlyChainlink);
+    event SetWindowDays(address indexed pool, uint256 windowDays);
     event ApprovedPriceUpdatooor(address account, bool canEndorse);
+    event SetUseCumulativeTwap(address pool, bool useCumulative);
+    event PriceUpdateFailed(address indexed pool, bytes reason);
+    event PoolRegistered(address indexed pool, uint256 index);
+    event PoolUnregistered(address indexed pool);
 
     modifier onlyOperator() {
         require(msg.sender == operator, "ONLY OPERATOR");
@@ -147,12 +296,154 @@ contract PessimisticVelodromeLPOracle {
             .latestRoundData();
     }
 
+    /**
+     * @notice Check the health of many tokens' Chainlink feeds, along with our sequencer, in one call.
+     * @dev Never reverts on a bad feed. A feed is stale whenever getChainlinkPrice would reject it: if it's missing,
+     *  its call reverts, it doesn't report 8 decimals, its answer isn't positive, its last update is in the future or
+     *  it has gone longer than its heartbeat without an update. Our sequencer is reported separately.
+     * @param _tokens The addresses of the tokens whose feeds we want to check.
+     * @return health Feed, heartbeat, latest answer and staleness for each token.
+     * @return sequencerUp Whether Optimism's sequencer is up.
+     * @return sequencerStatusSince Timestamp our sequencer's current status started at.
+     */
+    function getFeedHealth(
+        address[] calldata _tokens
+    )
+        external
+        view
+        returns (
+            FeedHealth[] memory health,
+            bool sequencerUp,
+            uint256 sequencerStatusSince
+        )
+    {
+        health = new FeedHealth[](_tokens.length);
+        for (uint256 i; i < _tokens.length; ++i) {
+            FeedInfo memory feed = feeds[_tokens[i]];
+            FeedHealth memory feedHealth = health[i];
+            feedHealth.feedAddress = feed.feedAddress;
+            feedHealth.heartbeat = feed.heartbeat;
+            feedHealth.isStale = true;
+
+            // calls to addresses without code can't be caught
+            if (feed.feedAddress.code.length == 0) {
+                continue;
+            }
+
+            try IChainLinkOracle(feed.feedAddress).latestRoundData() returns (
+                uint80,
+                int256 answer,
+                uint256,
+                uint256 updatedAt,
+                uint80
+            ) {
+                feedHealth.answer = answer;
+                feedHealth.updatedAt = updatedAt;
+
+                // check a future timestamp first so we don't underflow, getChainlinkPrice reverts on those too
+                feedHealth.isStale =
+                    updatedAt > block.timestamp ||
+                    block.timestamp - updatedAt > feed.heartbeat ||
+                    answer <= 0 ||
+                    !_hasUsdDecimals(feed.feedAddress);
+                if (!feedHealth.isStale) {
+                    feedHealth.secondsUntilStale =
+                        updatedAt +
+                        feed.heartbeat -
+                        block.timestamp;
+                }
+            } catch {}
+        }
+
+        // Answer == 0: Sequencer is up
+        int256 sequencerAnswer;
+        (, sequencerAnswer, sequencerStatusSince, , ) = sequencerUptimeFeed
+            .latestRoundData();
+        sequencerUp = sequencerAnswer == 0;
+    }
+
+    /// @notice Number of pools in our registry.
+    function registeredPoolsLength() external view returns (uint256) {
+        return registeredPools.length;
+    }
+
+    /**
+     * @notice Number of days of lows a pool's adjusted price looks back over, including today.
+     * @dev Pools without a custom window use our global two or three day window.
+     * @param _pool LP token to check.
+     * @return Length of the pool's pessimistic window, in days.
+     */
+    function getWindowDays(address _pool) external view returns (uint256) {
+        return _getWindowDays(windowLows[_pool]);
+    }
+
     /// @notice Current day used for storing daily lows.
     /// @dev Note that this is in unix time.
     function currentDay() public view returns (uint256) {
         return block.timestamp / 1 days;
     }
 
+    /**
+     * @notice Daily low price stored per pool.
+     * @dev Recent days are read from the pool's ring buffer, older days from our archive.
+     * @param _pool LP token to check.
+     * @param _day Day to check, in unix days.
+     * @return Lowest price recorded for the pool on that day, zero if it was never updated.
+     */
+    function dailyLows(
+        address _pool,
+        uint256 _day
+    ) external view returns (uint256) {
+        return _unpackLow(_getDaySlot(_pool, _day) & LOW_MASK);
+    }
+
+    /**
+     * @notice Number of times a pool's price was checked on a given day.
+     * @dev Saturates at type(uint16).max updates per day. Only a pool's first update in a block (with the same fair
+     *  price settings) is recorded, and repeats are skipped without being counted. This is done to keep repeats cheap,
+     *  and it accepts that swaps, mints or burns later in the block may move the pool's price in between: a lower
+     *  price reached after our first update won't be recorded until the pool is updated in a later block.
+     * @param _pool LP token to check.
+     * @param _day Day to check, in unix days.
+     * @return Number of price updates for the pool on that day.
+     */
+    function dailyUpdates(
+        address _pool,
+        uint256 _day
+    ) external view returns (uint256) {
+        return _getDaySlot(_pool, _day) >> 64;
+    }
+
+    /**
+     * @notice Daily lows and update counts for many pools over a range of days, in one call.
+     * @dev Results are flattened by pool, so the entry for _pools[i] on day _startDay + j is at index
+     *  i * _numDays + j. Each pool's ring buffer is only read once.
+     * @param _pools LP tokens to check.
+     * @param _startDay First day to check, in unix days.
+     * @param _numDays Number of consecutive days to check.
+     * @return lows Lowest price recorded for each pool on each day, zero if it was never updated.
+     * @return updates Number of price updates for each pool on each day.
+     */
+    function getDailyLowsRange(
+        address[] calldata _pools,
+        uint256 _startDay,
+        uint256 _numDays
+    ) external view returns (uint256[] memory lows, uint256[] memory updates) {
+        lows = new uint256[](_pools.length * _numDays);
+        updates = new uint256[](_pools.length * _numDays);
+        uint256 today = currentDay();
+
+        for (uint256 i; i < _pools.length; ++i) {
+            address pool = _pools[i];
+            uint256 buffer = lowsBuffer[pool];
+            for (uint256 j; j < _numDays; ++j) {
+                uint256 slot = _getDaySlot(pool, buffer, today, _startDay + j);
+                lows[i * _numDays + j] = _unpackLow(slot & LOW_MASK);
+                updates[i * _numDays + j] = slot >> 64;
+            }
+        }
+    }
+
     /*
      * @notice Gets the current price of Yearn V3 Velodrome vault token.
      * @dev Will use fair reserves and pessimistic pricing if enabled, and account for vault profits.
@@ -201,6 +492,72 @@ contract PessimisticVelodromeLPOracle {
         }
     }
 
+    /**
+     * @notice Gets the current prices of many Yearn V3 Velodrome vault tokens in one call.
+     * @dev Each distinct vault is only read once and each distinct underlying LP only priced once per call, and feeds
+     *  are shared as in getManyPoolPrices.
+     * @param _vaults Vault tokens whose prices we want to check.
+     * @return prices The current price of one of each vault token.
+     */
+    function getManyVaultPricesV3(
+        address[] calldata _vaults
+    ) external view returns (uint256[] memory prices) {
+        PriceCache memory vaultCache = _newPriceCache(_vaults.length);
+        PriceCache memory poolCache = _newPriceCache(_vaults.length);
+        PriceCache memory feedCache = _newPriceCache(_vaults.length * 2);
+        prices = new uint256[](_vaults.length);
+
+        for (uint256 i; i < _vaults.length; ++i) {
+            IERC4626 vault = IERC4626(_vaults[i]);
+            (bool cached, uint256 price) = _getCachedPrice(
+                vaultCache,
+                address(vault)
+            );
+            if (!cached) {
+                price =
+                    (_getVaultAssetPrice(vault.asset(), poolCache, feedCache) *
+                        vault.convertToAssets(DECIMALS)) /
+                    DECIMALS;
+                _cachePrice(vaultCache, address(vault), price);
+            }
+            prices[i] = price;
+        }
+    }
+
+    /**
+     * @notice Gets the current prices of many Yearn V2 Velodrome vault tokens in one call.
+     * @dev Each distinct vault's token and share value are only read once and each distinct underlying LP only priced
+     *  once per call, and feeds are shared as in getManyPoolPrices. Note that V2 vaults have no getter returning
+     *  everything our share value needs, so each distinct vault still costs up to five reads for it (totalSupply,
+     *  totalAssets, lastReport, lockedProfitDegradation and lockedProfit), same as pricing it on its own.
+     * @param _vaults Vault tokens whose prices we want to check.
+     * @return prices The current price of one of each vault token.
+     */
+    function getManyVaultPricesV2(
+        address[] calldata _vaults
+    ) external view returns (uint256[] memory prices) {
+        PriceCache memory vaultCache = _newPriceCache(_vaults.length);
+        PriceCache memory poolCache = _newPriceCache(_vaults.length);
+        PriceCache memory feedCache = _newPriceCache(_vaults.length * 2);
+        prices = new uint256[](_vaults.length);
+
+        for (uint256 i; i < _vaults.length; ++i) {
+            address _vault = _vaults[i];
+            (bool cached, uint256 price) = _getCachedPrice(vaultCache, _vault);
+            if (!cached) {
+                price =
+                    (_getVaultAssetPrice(
+                        IYearnVaultV2(_vault).token(),
+                        poolCache,
+                        feedCache
+                    ) * ShareValueHelper.sharesToAmount(_vault, DECIMALS)) /
+                    DECIMALS;
+                _cachePrice(vaultCache, _vault, price);
+            }
+            prices[i] = price;
+        }
+    }
+
     /*
      * @notice Gets the current price of a given Velodrome LP token.
      * @dev Will use fair reserves and pessimistic pricing if enabled.
@@ -218,49 +575,170 @@ contract PessimisticVelodromeLPOracle {
     }
 
     /**
-     * @notice Returns the Chainlink feed price of the given token address.
-     * @dev Will revert if price is negative or feed is not added.
-     * @param _token The address of the token to get the price of.
-     * @return currentPrice The current price of the underlying token.
+     * @notice Gets the price of a given Velodrome LP token as of its last update, if that update is recent enough.
+     * @dev Returns the fair reserves price stored by our last update without recomputing it, applying our pessimistic
+     *  window and price bounds on read. Falls back to live pricing, as in getCurrentPoolPrice, if the pool hasn't been
+     *  updated within _maxAge seconds or operator has since changed a setting that affects its fair price (feeds,
+     *  useChainlinkOnly, or the pool's TWAP points or mode). Window and bound changes apply to stored prices as is.
+     * @param _pool LP token whose price we want to check.
+     * @param _maxAge Maximum age of our stored price, in seconds.
+     * @return The price of one LP token.
      */
-    function getChainlinkPrice(
-        address _token
-    ) public view returns (uint256 currentPrice) {
-        (, int256 price, , uint256 updatedAt, ) = IChainLinkOracle(
-            feeds[_token].feedAddress
-        ).latestRoundData();
+    function getCachedPoolPrice(
+        address _pool,
+        uint256 _maxAge
+    ) external view returns (uint256 price) {
+        (price, ) = _getCachedPoolPrice(_pool, _maxAge);
+    }
 
-        // we always expect 8 decimals for USD pricing
-        if (IChainLinkOracle(feeds[_token].feedAddress).decimals() != 8) {
-            revert("Must be 8 decimals");
-        }
+    /**
+     * @notice Same as getCachedPoolPrice, but also returns when that price was computed.
+     * @dev Useful for adapters that need to report how fresh our price is.
+     * @param _pool LP token whose price we want to check.
+     * @param _maxAge Maximum age of our stored price, in seconds.
+     * @return price The price of one LP token.
+     * @return updatedAt Timestamp our price was computed at, the current timestamp if it was priced live.
+     */
+    function getCachedPoolPriceWithTimestamp(
+        address _pool,
+        uint256 _maxAge
+    ) external view returns (uint256 price, uint256 updatedAt) {
+        return _getCachedPoolPrice(_pool, _maxAge);
+    }
 
-        // you mean we can't have negative prices?
-        if (price <= 0) {
-            revert("Invalid feed price");
+    /*
+     * @notice Gets the current fair reserves price of a given Velodrome LP token.
+     * @dev This is the price we record when updating, and ignores pessimistic pricing and price bounds.
+     * @param _pool LP token whose price we want to check.
+     * @return The current fair reserves price of one LP token.
+     */
+    function getFairReservesPrice(
+        address _pool
+    ) external view returns (uint256) {
+        return _getFairReservesPricing(_pool);
+    }
+
+    /**
+     * @notice Gets the current price of a given Velodrome LP token, memoized for the rest of the transaction.
+     * @dev Same pricing as getCurrentPoolPrice, but repeat reads of a pool within a transaction only cost a TLOAD.
+     *  This writes to transient storage, so it must be called rather than staticcalled. Memoized prices are ignored
+     *  once operator changes a setting affecting them, and adjusted prices also once the pool's price is updated.
+     *  Settings for other pools never affect a pool's memos.
+     * @param _pool LP token whose price we want to check.
+     * @return The current price of one LP token.
+     */
+    function getMemoizedPoolPrice(address _pool) external returns (uint256) {
+        return _getMemoizedPoolPrice(_pool, _newPriceCache(2));
+    }
+
+    /**
+     * @notice Gets the current fair reserves price of a given Velodrome LP token, memoized for the rest of the
+     *  transaction.
+     * @dev Same pricing as getFairReservesPrice, see getMemoizedPoolPrice for how memoized prices behave.
+     * @param _pool LP token whose price we want to check.
+     * @return The current fair reserves price of one LP token.
+     */
+    function getMemoizedFairReservesPrice(
+        address _pool
+    ) external returns (uint256) {
+        return
+            _getMemoizedFairReservesPricing(
+                _pool,
+                _memoSlot(_pool),
+                _newPriceCache(2)
+            );
+    }
+
+    /**
+     * @notice Gets the current prices of many Velodrome LP tokens in one call, memoized for the rest of the
+     *  transaction.
+     * @dev Same pricing as getMemoizedPoolPrice, with feed prices shared across pools as in getManyPoolPrices.
+     * @param _pools LP tokens whose prices we want to check.
+     * @return prices The current price of one of each LP token.
+     */
+    function getManyMemoizedPoolPrices(
+        address[] calldata _pools
+    ) external returns (uint256[] memory prices) {
+        PriceCache memory cache = _newPriceCache(_pools.length * 2);
+        prices = new uint256[](_pools.length);
+
+        for (uint256 i; i < _pools.length; ++i) {
+            prices[i] = _getMemoizedPoolPrice(_pools[i], cache);
         }
+    }
 
-        // if a price is older than our preset heartbeat, we're in trouble
-        if (block.timestamp - updatedAt > feeds[_token].heartbeat) {
-            revert("Price is stale");
+    /**
+     * @notice Gets the current prices of many Velodrome LP tokens in one call.
+     * @dev Each distinct token's Chainlink feed (and our sequencer feed) is only read once per call.
+     * @param _pools LP tokens whose prices we want to check.
+     * @param _usePessimisticPricing Whether we use our pessimistic pricing or not.
+     * @return prices The current price of one of each LP token.
+     */
+    function getManyPoolPrices(
+        address[] calldata _pools,
+        bool _usePessimisticPricing
+    ) external view returns (uint256[] memory prices) {
+        PriceCache memory cache = _newPriceCache(_pools.length * 2);
+        prices = new uint256[](_pools.length);
+
+        for (uint256 i; i < _pools.length; ++i) {
+            if (_usePessimisticPricing) {
+                prices[i] = _getAdjustedPrice(_pools[i], cache);
+            } else {
+                prices[i] = _getFairReservesPricing(_pools[i], cache);
+            }
         }
+    }
 
-        // make sure the sequencer is up
-        // uint80 roundID int256 sequencerAnswer, uint256 startedAt, uint256 updatedAt, uint80 answeredInRound
-        (, int256 sequencerAnswer, , , ) = sequencerUptimeFeed
-            .latestRoundData();
+    /**
+     * @notice Check which pools would have their stored pricing changed by an update.
+     * @dev Useful for keepers to skip updates that would only increment a pool's update counter. Each pool is priced
+     *  in its own call, so one pool we can't price doesn't stop us from checking the rest.
+     * @param _pools LP tokens to check.
+     * @return bitmap Bit i % 256 of word i / 256 is set if _pools[i] can currently be priced, and either hasn't been
+     *  updated today or its current fair reserves price is below today's stored low. Pools we can't price are left
+     *  unset, since updating them would only fail.
+     */
+    function needsUpdate(
+        address[] calldata _pools
+    ) external view returns (uint256[] memory bitmap) {
+        bitmap = new uint256[]((_pools.length + 255) / 256);
+        uint256 day = currentDay();
 
-        // Answer == 0: Sequencer is up
-        // Answer == 1: Sequencer is down
-        if (sequencerAnswer == 1) {
-            revert("L2 sequencer down");
+        for (uint256 i; i < _pools.length; ++i) {
+            try this.getFairReservesPrice(_pools[i]) returns (
+                uint256 currentPrice
+            ) {
+                uint256 todaysLow = _getBufferLow(
+                    lowsBuffer[_pools[i]],
+                    day,
+                    day
+                );
+                if (todaysLow == 0 || currentPrice < todaysLow) {
+                    bitmap[i / 256] |= 1 << (i % 256);
+                }
+            } catch {}
         }
-        currentPrice = uint256(price);
+    }
+
+    /**
+     * @notice Returns the Chainlink feed price of the given token address.
+     * @dev Will revert if price is negative or feed is not added.
+     * @param _token The address of the token to get the price of.
+     * @return currentPrice The current price of the underlying token.
+     */
+    function getChainlinkPrice(
+        address _token
+    ) public view returns (uint256 currentPrice) {
+        currentPrice = _getFeedPrice(_token);
+        _checkSequencer();
     }
 
     /**
      * @notice Returns the TWAP price for a token relative to the other token in its pool.
-     * @dev Note that we can customize the length of points but we default to 4 points (2 hours).
+     * @dev Note that we can customize the length of points but we default to 4 points (2 hours). If the pool uses a
+     *  cumulative TWAP, we swap against the average reserves over the whole window rather than averaging a swap at each
+     *  point like pool.quote() does, so results will differ slightly between the two.
      * @param _pool The address of the LP (pool) token we are using to price our assets with.
      * @param _token The address of the token to get the price of, and that we are swapping in.
      * @param _oneToken One of the token we are swapping in.
@@ -271,65 +749,103 @@ contract PessimisticVelodromeLPOracle {
         address _token,
         uint256 _oneToken
     ) public view returns (uint256 twapPrice) {
-        IVeloPool pool = IVeloPool(_pool);
-
-        // how far back in time should we look?
-        uint256 points = pointsOverride[_pool];
-        if (points == 0) {
-            points = DEFAULT_POINTS;
+        if (useCumulativeTwap[_pool]) {
+            return
+                _getCumulativeTwapPrice(
+                    _getPoolSnapshot(_pool),
+                    _token,
+                    _oneToken
+                );
         }
 
         // swapping one of our token gets us this many otherToken, returned in decimals of the other token
-        twapPrice = pool.quote(_token, _oneToken, points);
+        twapPrice = IVeloPool(_pool).quote(
+            _token,
+            _oneToken,
+            _getTwapPoints(_pool)
+        );
     }
 
     function getTokenPrices(
         address _pool
     ) public view returns (uint256 price0, uint256 price1) {
-        IVeloPool pool = IVeloPool(_pool);
-        (
-            uint256 decimals0, // note that this will be "1e18"", not "18"
-            uint256 decimals1,
-            ,
-            ,
-            ,
-            address token0,
-            address token1
-        ) = pool.metadata();
+        return _getTokenPrices(_getPoolSnapshot(_pool), _newPriceCache(2));
+    }
 
-        // check if we have chainlink feeds or TWAP for each token
-        if (feeds[token0].feedAddress != address(0)) {
-            price0 = getChainlinkPrice(token0); // returned with 8 decimals
-            if (feeds[token1].feedAddress != address(0)) {
-                price1 = getChainlinkPrice(token1); // returned with 8 decimals
-            } else {
-                // revert if we are supposed to only use chainlink
-                if (useChainlinkOnly) {
-                    revert("Only Chainlink feeds supported");
-                }
+    /**
+     * @notice Every intermediate value behind a given Velodrome LP token's price, read in a single call.
+     * @dev Useful for triaging pricing incidents, since all values come from the same block. Unlike
+     *  getCurrentPoolPrice, this won't revert on our price bounds, but flags it with outOfBounds instead.
+     * @param _pool LP token whose price we want to check.
+     * @return breakdown Reserves, token prices, TWAP quote, k, fair price, stored lows, bounds and final price.
+     */
+    function getPriceBreakdown(
+        address _pool
+    ) external view returns (PriceBreakdown memory breakdown) {
+        PoolSnapshot memory snapshot = _getPoolSnapshot(_pool);
+        breakdown.token0 = snapshot.token0;
+        breakdown.token1 = snapshot.token1;
+        breakdown.stable = snapshot.stable;
+        breakdown.totalSupply = snapshot.totalSupply;
+        breakdown.reserve0 =
+            (snapshot.reserve0 * DECIMALS) /
+            snapshot.decimals0;
+        breakdown.reserve1 =
+            (snapshot.reserve1 * DECIMALS) /
+            snapshot.decimals1;
 
-                // get twap price for token1. this is the amount of token1 we would get from 1 token0
-                price1 =
-                    (decimals1 * decimals1) /
-                    getTwapPrice(_pool, token0, decimals0); // returned in decimals1
-                price1 = (price0 * price1) / (decimals1);
+        (
+            breakdown.price0,
+            breakdown.price1,
+            breakdown.twapToken,
+            breakdown.twapQuote
+        ) = _getTokenPricesWithTwap(snapshot, _newPriceCache(2));
+        breakdown.k = snapshot.stable
+            ? _getK(breakdown.reserve0, breakdown.reserve1)
+            : FixedPointMathLib.sqrt(breakdown.reserve0 * breakdown.reserve1);
+        breakdown.fairPrice = _getFairReservesPricing(
+            snapshot,
+            breakdown.price0,
+            breakdown.price1
+        );
+
+        // pull our stored lows, then find the low we would actually use
+        uint256 buffer = lowsBuffer[_pool];
+        uint256 day = currentDay();
+        breakdown.todaysLow = _getBufferLow(buffer, day, day);
+        breakdown.yesterdaysLow = _getBufferLow(buffer, day, day - 1);
+        breakdown.dayBeforeYesterdaysLow = _getBufferLow(buffer, day, day - 2);
+        breakdown.adjustedPrice = _getWindowLow(
+            _pool,
+            buffer,
+            breakdown.fairPrice,
+            day
+        );
+
+        // check our bounds without reverting
+        breakdown.upperBound = upperPriceBound[_pool];
+        breakdown.lowerBound = lowerPriceBound[_pool];
+        breakdown.useAdjustedPricing = useAdjustedPricing;
+        breakdown.useThreeDayLow = useThreeDayLow;
+        breakdown.windowDays = _getWindowDays(windowLows[_pool]);
+        if (useAdjustedPricing) {
+            breakdown.outOfBounds =
+                (breakdown.upperBound > 0 &&
+                    breakdown.adjustedPrice > breakdown.upperBound) ||
+                breakdown.adjustedPrice < breakdown.lowerBound;
+            if (!breakdown.outOfBounds) {
+                breakdown.reportedPrice = breakdown.adjustedPrice;
             }
-        } else if (feeds[token1].feedAddress != address(0)) {
-            price1 = getChainlinkPrice(token1); // returned with 8 decimals
-            // get twap price for token0
-            price0 =
-                (decimals0 * decimals0) /
-                getTwapPrice(_pool, token1, decimals1); // returned in decimals0
-            price0 = (price0 * price1) / (decimals0);
         } else {
-            revert("At least one token must have CL oracle");
+            breakdown.reportedPrice = breakdown.fairPrice;
         }
     }
 
     /* ========== MUTATIVE FUNCTIONS ========== */
 
     /// @notice Checks current token price and saves the price if it is the day's lowest.
-    /// @dev This may only be called by approved addresses; the more frequently it is called the better.
+    /// @dev This may only be called by approved addresses; the more frequently it is called the better. Repeat
+    ///  updates of a pool within a block are skipped, see dailyUpdates.
     // @param _pool LP token to update pricing for.
     function updatePrice(address _pool) external {
         // don't let just anyone update deez prices
@@ -339,108 +855,916 @@ contract PessimisticVelodromeLPOracle {
     }
 
     /// @notice Checks current LP token prices and saves the price if it is the day's lowest.
-    /// @dev This may only be called by approved addresses; the more frequently it is called the better.
+    /// @dev This may only be called by approved addresses; the more frequently it is called the better. Each token's
+    ///  Chainlink price (and our sequencer status) is only pulled once for the whole batch.
     // @param _pools Array of LP token to update pricing for.
     function updateManyPrices(address[] memory _pools) external {
         // don't let just anyone update deez prices
         require(priceUpdatooors[msg.sender], "unauthorized");
 
+        PriceCache memory cache = _newPriceCache(_pools.length * 2);
         for (uint256 i; i < _pools.length; ++i) {
             address _pool = _pools[i];
-            _updatePrice(_pool);
+            _updatePrice(_pool, cache);
         }
     }
 
-    // internal logic to update our stored daily low pool prices
-    function _updatePrice(address _pool) internal {
-        // get current fair reserves pricing
-        uint256 currentPrice = _getFairReservesPricing(_pool);
-
-        // increment our counter whether we store the price or not
-        uint256 day = currentDay();
-        dailyUpdates[_pool][day] += 1;
+    /**
+     * @notice Checks current LP token prices and saves any new daily lows, skipping pools that fail to price.
+     * @dev This may only be called by approved addresses. Unlike updateManyPrices, one pool with a stale or missing
+     *  feed won't revert the whole batch; each failure emits PriceUpdateFailed with its revert data instead. If a pool
+     *  runs out of gas pricing, the whole batch reverts rather than reporting it as a failed pool.
+     * @param _pools Array of LP tokens to update pricing for.
+     * @return updated Whether each pool's price was successfully updated.
+     */
+    function tryUpdateManyPrices(
+        address[] calldata _pools
+    ) external returns (bool[] memory updated) {
+        // don't let just anyone update deez prices
+        require(priceUpdatooors[msg.sender], "unauthorized");
 
-        // store price if it's today's low
-        uint256 todaysLow = dailyLows[_pool][day];
-        if (todaysLow == 0 || currentPrice < todaysLow) {
-            dailyLows[_pool][day] = currentPrice;
-            emit RecordDailyLow(_pool, currentPrice);
+        updated = new bool[](_pools.length);
+        for (uint256 i; i < _pools.length; ++i) {
+            bool outOfGas;
+            (updated[i], outOfGas) = _tryUpdatePrice(_pools[i], 0);
+            require(!outOfGas, "!gas");
         }
     }
 
-    /* ========== HELPER VIEW FUNCTIONS ========== */
-
-    // adjust our reported pool price as needed for 48-hour lows and hard upper/lower limits
-    function _getAdjustedPrice(
-        address _pool
-    ) internal view returns (uint256 adjustedPrice) {
-        // start off with our standard price
-        uint256 currentPrice = _getFairReservesPricing(_pool);
-        uint256 day = currentDay();
+    /**
+     * @notice Checks prices for registered pools given by their index, and saves any new daily lows.
+     * @dev This may only be called by approved addresses. Meant to keep calldata (and L1 data fees) to a minimum.
+     *  The first byte of our payload is the width of each index (1 or 2 bytes), followed by tightly packed big-endian
+     *  indices into registeredPools. As with updateManyPrices, feed prices are shared across the batch.
+     * @param _packedIndices Index width followed by packed registeredPools indices to update pricing for. Reverts if
+     *  any index is past the end of registeredPools.
+     */
+    function updatePricesPacked(bytes calldata _packedIndices) external {
+        // don't let just anyone update deez prices
+        require(priceUpdatooors[msg.sender], "unauthorized");
 
-        // get today's low
-        uint256 todaysLow = dailyLows[_pool][day];
-        if (todaysLow == 0 || currentPrice < todaysLow) {
-            todaysLow = currentPrice;
+        require(_packedIndices.length > 0, "!indices");
+        uint256 width = uint8(_packedIndices[0]);
+        require(width == 1 || width == 2, "!width");
+        uint256 count = (_packedIndices.length - 1) / width;
+        require(count * width + 1 == _packedIndices.length, "!length");
+
+        PriceCache memory cache = _newPriceCache(count * 2);
+        uint256 length = registeredPools.length;
+        for (uint256 i; i < count; ++i) {
+            uint256 offset = 1 + i * width;
+            uint256 index = width == 1
+                ? uint8(_packedIndices[offset])
+                : uint16(bytes2(_packedIndices[offset:offset + 2]));
+            require(index < length, "!index");
+            _updatePrice(registeredPools[index], cache);
         }
+    }
 
-        // get yesterday's low
-        uint256 yesterdaysLow = dailyLows[_pool][day - 1];
+    /**
+     * @notice Checks prices for our registered pools, starting at a given index and stopping before gas runs low.
+     * @dev This may only be called by approved addresses. Pools that fail to price are skipped, as in
+     *  tryUpdateManyPrices. If a pool runs out of gas pricing, we stop there without reporting it as failed, and it's
+     *  retried first next time. Pass the returned cursor into the next call to pick up where we left off.
+     * @param _startCursor Index in registeredPools to start from.
+     * @param _minGasLeft We stop before updating a pool with less gas than this left, should cover one pool's update.
+     *  A pool that fails with less than this left is assumed to have run out of gas.
+     * @return nextCursor Index to start from next time, zero once we've made it through every registered pool.
+     */
+    function updateAll(
+        uint256 _startCursor,
+        uint256 _minGasLeft
+    ) external returns (uint256 nextCursor) {
+        // don't let just anyone update deez prices
+        require(priceUpdatooors[msg.sender], "unauthorized");
 
-        // calculate price based on two-day low
-        adjustedPrice = todaysLow > yesterdaysLow && yesterdaysLow > 0
-            ? yesterdaysLow
-            : todaysLow;
+        uint256 length = registeredPools.length;
+        for (
+            nextCursor = _startCursor;
+            nextCursor < length && gasleft() > _minGasLeft;
+            ++nextCursor
+        ) {
+            (, bool outOfGas) = _tryUpdatePrice(
+                registeredPools[nextCursor],
+                _minGasLeft
+            );
+            if (outOfGas) {
+                break;
+            }
+        }
 
-        // if using three-day low, compare again
-        if (useThreeDayLow) {
-            uint256 dayBeforeYesterdaysLow = dailyLows[_pool][day - 2];
-            adjustedPrice = adjustedPrice > dayBeforeYesterdaysLow &&
-                dayBeforeYesterdaysLow > 0
-                ? dayBeforeYesterdaysLow
-                : adjustedPrice;
+        // start over once we've been through everything
+        if (nextCursor >= length) {
+            nextCursor = 0;
         }
+    }
 
-        // use a hard cap to protect against oracle pricing errors
-        uint256 upperBound = upperPriceBound[_pool];
-        uint256 lowerBound = lowerPriceBound[_pool];
+    // internal logic to update our stored daily low pool prices
+    function _updatePrice(address _pool) internal {
+        _updatePrice(_pool, _newPriceCache(2));
+    }
 
-        if (upperBound > 0 && adjustedPrice > upperBound) {
-            revert("Price above upper bound");
-        } else if (adjustedPrice < lowerBound) {
-            revert("Price below lower bound");
+    function _updatePrice(address _pool, PriceCache memory _cache) internal {
+        // we only record a pool's first price each block. reserves may have moved since then, but we accept missing
+        //  that to keep repeat updates cheap.
+        if (_updatedThisBlock(_pool)) {
+            return;
         }
+
+        // get current fair reserves pricing
+        _recordPrice(_pool, _getFairReservesPricing(_pool, _cache));
     }
 
-    // calculate price based on fair reserves, not spot reserves
-    function _getFairReservesPricing(
-        address _pool
-    ) internal view returns (uint256 fairReservesPricing) {
-        // get what we need to calculate our reserves and pricing
-        IVeloPool pool = IVeloPool(_pool);
-        if (pool.decimals() != 18) {
-            revert("Lp token must have 18 decimals");
+    // store a freshly computed fair reserves price for a pool
+    function _recordPrice(address _pool, uint256 _currentPrice) internal {
+        // roll our buffer forward to today, archiving any days that drop out of it
+        uint256 day = currentDay();
+        uint256 buffer = _rollBuffer(_pool, day);
+        uint256 shift = _slotShift(day);
+        uint256 slot = (buffer >> shift) & SLOT_MASK;
+
+        // increment our counter whether we store the price or not
+        uint256 updates = slot >> 64;
+        if (updates < type(uint16).max) {
+            updates += 1;
         }
-        (
-            uint256 decimals0, // note that this will be "1e18"", not "18"
-            uint256 decimals1,
-            uint256 reserve0,
-            uint256 reserve1,
-            ,
-            ,
 
-        ) = pool.metadata();
+        // store price if it's today's low
+        uint256 packedLow = slot & LOW_MASK;
+        uint256 todaysLow = _unpackLow(packedLow);
+        if (todaysLow == 0 || _currentPrice < todaysLow) {
+            packedLow = _packLow(_currentPrice);
+            emit RecordDailyLow(_pool, _currentPrice);
+        }
 
-        // make sure our reserves are normalized to 18 decimals (looking at you, USDC)
-        reserve0 = (reserve0 * DECIMALS) / decimals0;
-        reserve1 = (reserve1 * DECIMALS) / decimals1;
+        // write everything back in a single store
+        buffer &= ~(SLOT_MASK << shift);
+        buffer |= ((updates << 64) | packedLow) << shift;
+        lowsBuffer[_pool] = buffer;
+
+        // windows longer than our buffer keep the low of their older days, computed on the first update each day
+        uint256 window = windowLows[_pool];
+        uint256 windowDays = window & WINDOW_DAYS_MASK;
+        if (
+            windowDays > BUFFER_DAYS &&
+            ((window >> 8) & WINDOW_DAY_MASK) != day
+        ) {
+            _storeOlderLows(_pool, window, buffer, day, windowDays);
+        }
+
+        // remember what we just priced so reads can skip recomputing it
+        _storeLastPrice(_pool, _currentPrice);
+    }
+
+    function _storeLastPrice(address _pool, uint256 _fairPrice) internal {
+        // if our price won't fit, make reads fall back to live pricing
+        if (_fairPrice > type(uint96).max) {
+            delete lastPrices[_pool];
+            return;
+        }
+
+        lastPrices[_pool] = LastPrice({
+            fairPrice: uint96(_fairPrice),
+            timestamp: uint32(block.timestamp),
+            blockNumber: uint32(block.number),
+            settingsEpoch: uint96(_fairPriceEpoch(_pool))
+        });
+    }
+
+    // cache the lowest low of a pool's window days older than our buffer for _day and the day after, so reads stay
+    //  cheap until the end of tomorrow. today's is normally already cached by yesterday's first update.
+    function _storeOlderLows(
+        address _pool,
+        uint256 _window,
+        uint256 _buffer,
+        uint256 _day,
+        uint256 _windowDays
+    ) internal {
+        (bool cached, uint256 todaysLow) = _getCachedOlderLow(_window, _day);
+        if (!cached) {
+            todaysLow = _packLow(
+                _getOlderLow(_pool, _buffer, _day, _windowDays)
+            );
+        }
+        uint256 tomorrowsLow = _packLow(
+            _getOlderLow(_pool, _buffer, _day + 1, _windowDays)
+        );
+        windowLows[_pool] =
+            (tomorrowsLow << 104) |
+            (todaysLow << 40) |
+            (_day << 8) |
+            _windowDays;
+    }
+
+    function _updatedThisBlock(address _pool) internal view returns (bool) {
+        LastPrice memory lastPrice = lastPrices[_pool];
+        return
+            lastPrice.blockNumber == uint32(block.number) &&
+            lastPrice.settingsEpoch == uint96(_fairPriceEpoch(_pool));
+    }
+
+    // update a pool's pricing without reverting. pricing runs in a call to ourselves so any failure can be caught.
+    //  failures that leave us with less than _gasReserve, or that burned through all the gas we forwarded, are
+    //  flagged as running out of gas instead of being reported, since the pool itself may be fine.
+    function _tryUpdatePrice(
+        address _pool,
+        uint256 _gasReserve
+    ) internal returns (bool updated, bool outOfGas) {
+        if (_updatedThisBlock(_pool)) {
+            return (true, false);
+        }
+
+        uint256 gasBefore = gasleft();
+        try this.getFairReservesPrice(_pool) returns (uint256 currentPrice) {
+            _recordPrice(_pool, currentPrice);
+            return (true, false);
+        } catch (bytes memory reason) {
+            // our call only gets 63/64 of our gas, so running it dry leaves us with at most 1/64
+            uint256 gasAfter = gasleft();
+            if (gasAfter < _gasReserve || gasAfter <= gasBefore / 64) {
+                return (false, true);
+            }
+            emit PriceUpdateFailed(_pool, reason);
+        }
+    }
+
+    // load a pool's buffer stamped with today, archiving and clearing slots for days that fall out of our window
+    function _rollBuffer(
+        address _pool,
+        uint256 _day
+    ) internal returns (uint256 buffer) {
+        buffer = lowsBuffer[_pool];
+        if (buffer != 0) {
+            uint256 lastDay = _getLastBufferDay(buffer, _day);
+            if (lastDay != _day) {
+                for (uint256 i; i < BUFFER_DAYS; ++i) {
+                    uint256 oldDay = lastDay - i;
+                    if (oldDay + BUFFER_DAYS > _day) {
+                        continue;
+                    }
+
+                    uint256 shift = _slotShift(oldDay);
+                    uint256 slot = (buffer >> shift) & SLOT_MASK;
+                    if (slot != 0) {
+                        archivedLows[_pool][oldDay] = slot;
+                        buffer &= ~(SLOT_MASK << shift);
+                    }
+                }
+            }
+        }
+
+        // we only keep 16 bits of the day, plenty since we never look back more than a few days
+        buffer = (buffer & ~DAY_MASK) | (_day & DAY_MASK);
+    }
+
+    /* ========== HELPER VIEW FUNCTIONS ========== */
+
+    // read and sanity check a token's Chainlink feed, not including our sequencer check
+    function _getFeedPrice(
+        address _token
+    ) internal view returns (uint256 currentPrice) {
+        (, int256 price, , uint256 updatedAt, ) = IChainLinkOracle(
+            feeds[_token].feedAddress
+        ).latestRoundData();
+
+        // we always expect 8 decimals for USD pricing
+        if (IChainLinkOracle(feeds[_token].feedAddress).decimals() != 8) {
+            revert("Must be 8 decimals");
+        }
+
+        // you mean we can't have negative prices?
+        if (price <= 0) {
+            revert("Invalid feed price");
+        }
+
+        // if a price is older than our preset heartbeat, we're in trouble
+        if (block.timestamp - updatedAt > feeds[_token].heartbeat) {
+            revert("Price is stale");
+        }
+
+        currentPrice = uint256(price);
+    }
+
+    // same decimals check as _getFeedPrice, but false instead of reverting
+    function _hasUsdDecimals(address _feed) internal view returns (bool) {
+        try IChainLinkOracle(_feed).decimals() returns (uint8 decimals) {
+            return decimals == 8;
+        } catch {
+            return false;
+        }
+    }
+
+    // make sure the sequencer is up
+    function _checkSequencer() internal view {
+        // uint80 roundID int256 sequencerAnswer, uint256 startedAt, uint256 updatedAt, uint80 answeredInRound
+        (, int256 sequencerAnswer, , , ) = sequencerUptimeFeed
+            .latestRoundData();
+
+        // Answer == 0: Sequencer is up
+        // Answer == 1: Sequencer is down
+        if (sequencerAnswer == 1) {
+            revert("L2 sequencer down");
+        }
+    }
+
+    // empty cache with room for _size distinct tokens
+    function _newPriceCache(
+        uint256 _size
+    ) internal pure returns (PriceCache memory cache) {
+        cache.tokens = new address[](_size);
+        cache.prices = new uint256[](_size);
+    }
+
+    // price already pulled into a cache for a given address, if any
+    function _getCachedPrice(
+        PriceCache memory _cache,
+        address _key
+    ) internal pure returns (bool cached, uint256 price) {
+        for (uint256 i; i < _cache.length; ++i) {
+            if (_cache.tokens[i] == _key) {
+                return (true, _cache.prices[i]);
+            }
+        }
+    }
+
+    function _cachePrice(
+        PriceCache memory _cache,
+        address _key,
+        uint256 _price
+    ) internal pure {
+        // only remember what we have room for
+        if (_cache.length < _cache.tokens.length) {
+            _cache.tokens[_cache.length] = _key;
+            _cache.prices[_cache.length] = _price;
+            ++_cache.length;
+        }
+    }
+
+    // same as getChainlinkPrice, but reuses any price (and sequencer check) already pulled into our cache
+    function _getChainlinkPrice(
+        address _token,
+        PriceCache memory _cache
+    ) internal view returns (uint256 currentPrice) {
+        bool cached;
+        (cached, currentPrice) = _getCachedPrice(_cache, _token);
+        if (cached) {
+            return currentPrice;
+        }
+
+        currentPrice = _getFeedPrice(_token);
+        if (!_cache.sequencerChecked) {
+            _checkSequencer();
+            _cache.sequencerChecked = true;
+        }
+        _cachePrice(_cache, _token, currentPrice);
+    }
+
+    // price of a vault's underlying LP, using _poolCache to only price each LP once
+    function _getVaultAssetPrice(
+        address _pool,
+        PriceCache memory _poolCache,
+        PriceCache memory _feedCache
+    ) internal view returns (uint256 currentPrice) {
+        bool cached;
+        (cached, currentPrice) = _getCachedPrice(_poolCache, _pool);
+        if (cached) {
+            return currentPrice;
+        }
 
+        if (useAdjustedPricing) {
+            currentPrice = _getAdjustedPrice(_pool, _feedCache);
+        } else {
+            currentPrice = _getFairReservesPricing(_pool, _feedCache);
+        }
+        _cachePrice(_poolCache, _pool, currentPrice);
+    }
+
+    function _getTokenPrices(
+        PoolSnapshot memory _snapshot,
+        PriceCache memory _cache
+    ) internal view returns (uint256 price0, uint256 price1) {
+        (price0, price1, , ) = _getTokenPricesWithTwap(_snapshot, _cache);
+    }
+
+    // same as _getTokenPrices, but also returns which token (if any) we priced with our TWAP and the raw TWAP quote
+    function _getTokenPricesWithTwap(
+        PoolSnapshot memory _snapshot,
+        PriceCache memory _cache
+    )
+        internal
+        view
+        returns (
+            uint256 price0,
+            uint256 price1,
+            address twapToken,
+            uint256 twapQuote
+        )
+    {
+        address token0 = _snapshot.token0;
+        address token1 = _snapshot.token1;
+        uint256 decimals0 = _snapshot.decimals0;
+        uint256 decimals1 = _snapshot.decimals1;
+
+        // check if we have chainlink feeds or TWAP for each token
+        if (_snapshot.token0HasFeed) {
+            price0 = _getChainlinkPrice(token0, _cache); // returned with 8 decimals
+            if (_snapshot.token1HasFeed) {
+                price1 = _getChainlinkPrice(token1, _cache); // returned with 8 decimals
+            } else {
+                // revert if we are supposed to only use chainlink
+                if (useChainlinkOnly) {
+                    revert("Only Chainlink feeds supported");
+                }
+
+                // get twap price for token1. this is the amount of token1 we would get from 1 token0
+                twapToken = token1;
+                twapQuote = _getTwapPrice(_snapshot, token0, decimals0);
+                price1 = (decimals1 * decimals1) / twapQuote; // returned in decimals1
+                price1 = (price0 * price1) / (decimals1);
+            }
+        } else if (_snapshot.token1HasFeed) {
+            price1 = _getChainlinkPrice(token1, _cache); // returned with 8 decimals
+            // get twap price for token0
+            twapToken = token0;
+            twapQuote = _getTwapPrice(_snapshot, token1, decimals1);
+            price0 = (decimals0 * decimals0) / twapQuote; // returned in decimals0
+            price0 = (price0 * price1) / (decimals0);
+        } else {
+            revert("At least one token must have CL oracle");
+        }
+    }
+
+    // same as getTwapPrice, but reuses our snapshot for cumulative TWAPs
+    function _getTwapPrice(
+        PoolSnapshot memory _snapshot,
+        address _token,
+        uint256 _oneToken
+    ) internal view returns (uint256) {
+        if (useCumulativeTwap[_snapshot.pool]) {
+            return _getCumulativeTwapPrice(_snapshot, _token, _oneToken);
+        }
+        return
+            IVeloPool(_snapshot.pool).quote(
+                _token,
+                _oneToken,
+                _getTwapPoints(_snapshot.pool)
+            );
+    }
+
+    // how far back in time should we look?
+    function _getTwapPoints(address _pool) internal view returns (uint256) {
+        uint256 points = pointsOverride[_pool];
+        if (points == 0) {
+            points = DEFAULT_POINTS;
+        }
+        return points;
+    }
+
+    // swap against the average reserves between the first and last observations of our window. the pool's cumulative
+    //  reserves let us do this with just two observations, no matter how many points our window covers.
+    function _getCumulativeTwapPrice(
+        PoolSnapshot memory _snapshot,
+        address _token,
+        uint256 _oneToken
+    ) internal view returns (uint256) {
+        IVeloPool pool = IVeloPool(_snapshot.pool);
+        uint256 lastIndex = pool.observationLength() - 1;
+        (uint256 startTime, uint256 start0, uint256 start1) = pool
+            .observations(lastIndex - _getTwapPoints(_snapshot.pool));
+        (uint256 endTime, uint256 end0, uint256 end1) = pool.observations(
+            lastIndex
+        );
+
+        uint256 timeElapsed = endTime - startTime;
+        return
+            _getAmountOut(
+                _snapshot,
+                _token,
+                _oneToken,
+                (end0 - start0) / timeElapsed,
+                (end1 - start1) / timeElapsed
+            );
+    }
+
+    // fee-less swap output for given reserves, matching the math velodrome pools use in quote()
+    function _getAmountOut(
+        PoolSnapshot memory _snapshot,
+        address _tokenIn,
+        uint256 _amountIn,
+        uint256 _reserve0,
+        uint256 _reserve1
+    ) internal pure returns (uint256) {
+        bool isToken0 = _tokenIn == _snapshot.token0;
+        if (!_snapshot.stable) {
+            return
+                isToken0
+                    ? (_amountIn * _reserve1) / (_reserve0 + _amountIn)
+                    : (_amountIn * _reserve0) / (_reserve1 + _amountIn);
+        }
+
+        // stable pools solve x^3 * y + y^3 * x = k with everything normalized to 18 decimals
+        _reserve0 = (_reserve0 * DECIMALS) / _snapshot.decimals0;
+        _reserve1 = (_reserve1 * DECIMALS) / _snapshot.decimals1;
+        uint256 xy = _f(_reserve0, _reserve1);
+        (uint256 reserveA, uint256 reserveB) = isToken0
+            ? (_reserve0, _reserve1)
+            : (_reserve1, _reserve0);
+        (uint256 decimalsIn, uint256 decimalsOut) = isToken0
+            ? (_snapshot.decimals0, _snapshot.decimals1)
+            : (_snapshot.decimals1, _snapshot.decimals0);
+
+        _amountIn = (_amountIn * DECIMALS) / decimalsIn;
+        uint256 y = reserveB - _getY(_amountIn + reserveA, xy, reserveB);
+        return (y * decimalsOut) / DECIMALS;
+    }
+
+    // newton's method for the stable invariant, ported from velodrome's Pool.sol
+    function _getY(
+        uint256 x0,
+        uint256 xy,
+        uint256 y
+    ) internal pure returns (uint256) {
+        for (uint256 i; i < 255; ++i) {
+            uint256 k = _f(x0, y);
+            if (k < xy) {
+                uint256 dy = ((xy - k) * 1e18) / _d(x0, y);
+                if (dy == 0) {
+                    // rounding is keeping us from converging, and there's no closer answer than y + 1
+                    if (_f(x0, y + 1) > xy) {
+                        return y + 1;
+                    }
+                    dy = 1;
+                }
+                y = y + dy;
+            } else {
+                uint256 dy = ((k - xy) * 1e18) / _d(x0, y);
+                if (dy == 0) {
+                    // we need f(x0, y) >= xy, so we can't step below that
+                    if (k == xy || _f(x0, y - 1) < xy) {
+                        return y;
+                    }
+                    dy = 1;
+                }
+                y = y - dy;
+            }
+        }
+        revert("!y");
+    }
+
+    function _f(uint256 x0, uint256 y) internal pure returns (uint256) {
+        uint256 _a = (x0 * y) / 1e18;
+        uint256 _b = ((x0 * x0) / 1e18 + (y * y) / 1e18);
+        return (_a * _b) / 1e18;
+    }
+
+    function _d(uint256 x0, uint256 y) internal pure returns (uint256) {
+        return
+            (3 * x0 * ((y * y) / 1e18)) /
+            1e18 +
+            ((((x0 * x0) / 1e18) * x0) / 1e18);
+    }
+
+    // adjust our reported pool price as needed for 48-hour lows and hard upper/lower limits
+    function _getAdjustedPrice(
+        address _pool
+    ) internal view returns (uint256) {
+        return _getAdjustedPrice(_pool, _newPriceCache(2));
+    }
+
+    function _getAdjustedPrice(
+        address _pool,
+        PriceCache memory _cache
+    ) internal view returns (uint256) {
+        // start off with our standard price
+        return _adjustPrice(_pool, _getFairReservesPricing(_pool, _cache));
+    }
+
+    function _adjustPrice(
+        address _pool,
+        uint256 _currentPrice
+    ) internal view returns (uint256 adjustedPrice) {
+        // all of our recent lows live in a single word
+        adjustedPrice = _getWindowLow(
+            _pool,
+            lowsBuffer[_pool],
+            _currentPrice,
+            currentDay()
+        );
+        _checkPriceBounds(_pool, adjustedPrice);
+    }
+
+    // lowest of our current price and the stored lows in our pool's window
+    function _getWindowLow(
+        address _pool,
+        uint256 _buffer,
+        uint256 _currentPrice,
+        uint256 _day
+    ) internal view returns (uint256 windowLow) {
+        uint256 window = windowLows[_pool];
+        uint256 windowDays = _getWindowDays(window);
+
+        // get today's low
+        windowLow = _getBufferLow(_buffer, _day, _day);
+        if (windowLow == 0 || _currentPrice < windowLow) {
+            windowLow = _currentPrice;
+        }
+
+        // compare with the rest of the days in our buffer
+        uint256 bufferDays = windowDays < BUFFER_DAYS
+            ? windowDays
+            : BUFFER_DAYS;
+        for (uint256 i = 1; i < bufferDays; ++i) {
+            uint256 low = _getBufferLow(_buffer, _day, _day - i);
+            windowLow = windowLow > low && low > 0 ? low : windowLow;
+        }
+
+        // older days use the low cached by today's or yesterday's first update, only looking them up if a whole day
+        //  has gone by without one
+        if (windowDays > BUFFER_DAYS) {
+            (bool cached, uint256 olderLow) = _getCachedOlderLow(window, _day);
+            olderLow = cached
+                ? _unpackLow(olderLow)
+                : _getOlderLow(_pool, _buffer, _day, windowDays);
+            windowLow = windowLow > olderLow && olderLow > 0
+                ? olderLow
+                : windowLow;
+        }
+    }
+
+    // packed older low cached in a pool's window settings for _day, if we have one
+    function _getCachedOlderLow(
+        uint256 _window,
+        uint256 _day
+    ) internal pure returns (bool cached, uint256 packedLow) {
+        uint256 windowDay = (_window >> 8) & WINDOW_DAY_MASK;
+        if (windowDay == _day) {
+            return (true, (_window >> 40) & LOW_MASK);
+        } else if (windowDay + 1 == _day) {
+            return (true, (_window >> 104) & LOW_MASK);
+        }
+    }
+
+    // length of a pool's window from its packed settings, falling back to our global window
+    function _getWindowDays(uint256 _window) internal view returns (uint256) {
+        uint256 windowDays = _window & WINDOW_DAYS_MASK;
+        if (windowDays == 0) {
+            return useThreeDayLow ? 3 : 2;
+        }
+        return windowDays;
+    }
+
+    // lowest stored low of the days in a pool's window ending on _day older than our buffer, zero if there are none.
+    //  _day may be up to a day past the current day, those older days are over either way.
+    function _getOlderLow(
+        address _pool,
+        uint256 _buffer,
+        uint256 _day,
+        uint256 _windowDays
+    ) internal view returns (uint256 olderLow) {
+        for (uint256 i = BUFFER_DAYS; i < _windowDays; ++i) {
+            uint256 low = _unpackLow(
+                _getDaySlot(_pool, _buffer, _day, _day - i) & LOW_MASK
+            );
+            olderLow = (olderLow == 0 || low < olderLow) && low > 0
+                ? low
+                : olderLow;
+        }
+    }
+
+    // use a hard cap to protect against oracle pricing errors
+    function _checkPriceBounds(address _pool, uint256 _price) internal view {
+        uint256 upperBound = upperPriceBound[_pool];
+        uint256 lowerBound = lowerPriceBound[_pool];
+
+        if (upperBound > 0 && _price > upperBound) {
+            revert("Price above upper bound");
+        } else if (_price < lowerBound) {
+            revert("Price below lower bound");
+        }
+    }
+
+    function _getCachedPoolPrice(
+        address _pool,
+        uint256 _maxAge
+    ) internal view returns (uint256 price, uint256 updatedAt) {
+        LastPrice memory lastPrice = lastPrices[_pool];
+        updatedAt = lastPrice.timestamp;
+
+        // our stored price only holds as long as the settings it was priced with
+        if (
+            updatedAt == 0 ||
+            block.timestamp - updatedAt > _maxAge ||
+            lastPrice.settingsEpoch != uint96(_fairPriceEpoch(_pool))
+        ) {
+            if (useAdjustedPricing) {
+                price = _getAdjustedPrice(_pool);
+            } else {
+                price = _getFairReservesPricing(_pool);
+            }
+            return (price, block.timestamp);
+        }
+
+        // apply our window and bounds just as we would to a live price
+        price = lastPrice.fairPrice;
+        if (useAdjustedPricing) {
+            price = _adjustPrice(_pool, price);
+        }
+    }
+
+    // same as getCurrentPoolPrice, but memoized in transient storage for the rest of the transaction
+    function _getMemoizedPoolPrice(
+        address _pool,
+        PriceCache memory _cache
+    ) internal returns (uint256 currentPrice) {
+        uint256 slot = _memoSlot(_pool);
+        if (!useAdjustedPricing) {
+            return _getMemoizedFairReservesPricing(_pool, slot, _cache);
+        }
+
+        uint256 adjustedSlot = _adjustedMemoSlot(_pool, slot);
+        uint256 memo = _tload(adjustedSlot);
+        if (memo != 0) {
+            return memo ^ MEMO_FLAG;
+        }
+
+        currentPrice = _adjustPrice(
+            _pool,
+            _getMemoizedFairReservesPricing(_pool, slot, _cache)
+        );
+        _tstore(adjustedSlot, currentPrice | MEMO_FLAG);
+    }
+
+    function _getMemoizedFairReservesPricing(
+        address _pool,
+        uint256 _slot,
+        PriceCache memory _cache
+    ) internal returns (uint256 currentPrice) {
+        uint256 memo = _tload(_slot);
+        if (memo != 0) {
+            return memo ^ MEMO_FLAG;
+        }
+
+        currentPrice = _getFairReservesPricing(_pool, _cache);
+        _tstore(_slot, currentPrice | MEMO_FLAG);
+    }
+
+    // transient memo slot for a pool's fair reserves price. keying on the pool's fair price epoch means only settings
+    //  that change its fair price leave a stale memo behind, without us touching it.
+    function _memoSlot(address _pool) internal view returns (uint256) {
+        return uint256(keccak256(abi.encode(_pool, _fairPriceEpoch(_pool))));
+    }
+
+    // transient memo slot for a pool's adjusted price, which also depends on its lows and our settings applied on read
+    function _adjustedMemoSlot(
+        address _pool,
+        uint256 _fairSlot
+    ) internal view returns (uint256) {
+        return
+            uint256(
+                keccak256(
+                    abi.encode(
+                        _fairSlot,
+                        lowsBuffer[_pool],
+                        _tload(MEMO_RESET_SLOT)
+                    )
+                )
+            );
+    }
+
+    // settings applied on read don't stale stored prices, but our adjusted memos depend on them. memos only last for
+    //  their transaction, so a transient counter is enough.
+    function _resetMemos() internal {
+        _tstore(MEMO_RESET_SLOT, _tload(MEMO_RESET_SLOT) + 1);
+    }
+
+    // bumped whenever a setting affecting a pool's fair price changes. both epochs only ever go up, so their sum
+    //  changes whenever either of them does.
+    function _fairPriceEpoch(address _pool) internal view returns (uint256) {
+        return settingsEpoch + poolSettingsEpochs[_pool];
+    }
+
+    function _tload(uint256 _slot) internal view returns (uint256 value) {
+        assembly {
+            value := tload(_slot)
+        }
+    }
+
+    function _tstore(uint256 _slot, uint256 _value) internal {
+        assembly {
+            tstore(_slot, _value)
+        }
+    }
+
+    // pull a given day's packed slot for a pool, whether it's still in the buffer or has been archived
+    function _getDaySlot(
+        address _pool,
+        uint256 _day
+    ) internal view returns (uint256) {
+        return _getDaySlot(_pool, lowsBuffer[_pool], currentDay(), _day);
+    }
+
+    // same as above, for when we already have the pool's buffer. _today must be on or after the buffer's last day.
+    function _getDaySlot(
+        address _pool,
+        uint256 _buffer,
+        uint256 _today,
+        uint256 _day
+    ) internal view returns (uint256) {
+        if (_buffer != 0 && _day <= _today) {
+            uint256 lastDay = _getLastBufferDay(_buffer, _today);
+            if (_day + BUFFER_DAYS > lastDay) {
+                return
+                    _day > lastDay
+                        ? 0
+                        : (_buffer >> _slotShift(_day)) & SLOT_MASK;
+            }
+        }
+        return archivedLows[_pool][_day];
+    }
+
+    // unpacked low for _day from a buffer, zero if that day isn't held in it. _today must be the current day.
+    function _getBufferLow(
+        uint256 _buffer,
+        uint256 _today,
+        uint256 _day
+    ) internal pure returns (uint256) {
+        if (_buffer == 0) {
+            return 0;
+        }
+        uint256 lastDay = _getLastBufferDay(_buffer, _today);
+        if (_day > lastDay || _day + BUFFER_DAYS <= lastDay) {
+            return 0;
+        }
+        return _unpackLow((_buffer >> _slotShift(_day)) & LOW_MASK);
+    }
+
+    // recover the full day of a buffer's last update from its 16-bit stamp, _today must be on or after that day
+    function _getLastBufferDay(
+        uint256 _buffer,
+        uint256 _today
+    ) internal pure returns (uint256) {
+        unchecked {
+            return _today - ((_today - _buffer) & DAY_MASK);
+        }
+    }
+
+    // bit offset of a given day's slot within a buffer
+    function _slotShift(uint256 _day) internal pure returns (uint256) {
+        return 16 + 80 * (_day % BUFFER_DAYS);
+    }
+
+    // lows are packed into 64 bits. anything under 2**56 (~$720M with 8 decimals) is stored exactly, while larger
+    //  values keep their top 56 bits and store the shift in the top byte. this only ever rounds down (pessimistic).
+    function _packLow(uint256 _price) internal pure returns (uint256) {
+        uint256 shift;
+        while (_price >= 1 << 56) {
+            _price >>= 1;
+            ++shift;
+        }
+        return (shift << 56) | _price;
+    }
+
+    function _unpackLow(uint256 _packed) internal pure returns (uint256) {
+        return (_packed & ((1 << 56) - 1)) << (_packed >> 56);
+    }
+
+    // calculate price based on fair reserves, not spot reserves
+    function _getFairReservesPricing(
+        address _pool
+    ) internal view returns (uint256) {
+        return _getFairReservesPricing(_pool, _newPriceCache(2));
+    }
+
+    function _getFairReservesPricing(
+        address _pool,
+        PriceCache memory _cache
+    ) internal view returns (uint256) {
+        return _getFairReservesPricing(_getPoolSnapshot(_pool), _cache);
+    }
+
+    function _getFairReservesPricing(
+        PoolSnapshot memory _snapshot,
+        PriceCache memory _cache
+    ) internal view returns (uint256) {
         // pull our prices
-        (uint256 price0, uint256 price1) = getTokenPrices(_pool);
+        (uint256 price0, uint256 price1) = _getTokenPrices(_snapshot, _cache);
+        return _getFairReservesPricing(_snapshot, price0, price1);
+    }
 
-        if (pool.stable()) {
+    function _getFairReservesPricing(
+        PoolSnapshot memory _snapshot,
+        uint256 price0,
+        uint256 price1
+    ) internal pure returns (uint256 fairReservesPricing) {
+        // make sure our reserves are normalized to 18 decimals (looking at you, USDC)
+        uint256 reserve0 = (_snapshot.reserve0 * DECIMALS) /
+            _snapshot.decimals0;
+        uint256 reserve1 = (_snapshot.reserve1 * DECIMALS) /
+            _snapshot.decimals1;
+
+        if (_snapshot.stable) {
             fairReservesPricing = _calculate_stable_lp_token_price(
-                pool.totalSupply(),
+                _snapshot.totalSupply,
                 price0,
                 price1,
                 reserve0,
@@ -452,7 +1776,54 @@ contract PessimisticVelodromeLPOracle {
             uint256 p = FixedPointMathLib.sqrt(price0 * 1e16 * price1); // boost this to 1e16 to give us more precision
 
             // we want k and total supply to have same number of decimals so price has decimals of chainlink oracle
-            fairReservesPricing = (2 * p * k) / (1e8 * pool.totalSupply());
+            fairReservesPricing = (2 * p * k) / (1e8 * _snapshot.totalSupply);
+        }
+    }
+
+    // get what we need to calculate our reserves and pricing
+    function _getPoolSnapshot(
+        address _pool
+    ) internal view returns (PoolSnapshot memory snapshot) {
+        IVeloPool pool = IVeloPool(_pool);
+        snapshot.pool = _pool;
+
+        // registered pools only need their reserves and supply, their immutable metadata is cached
+        PoolInfo memory info = poolInfo[_pool];
+        if (info.index != 0) {
+            snapshot.token0 = info.token0;
+            snapshot.token1 = info.token1;
+            snapshot.decimals0 = 10 ** info.decimals0;
+            snapshot.decimals1 = 10 ** info.decimals1;
+            snapshot.stable = info.stable;
+            (snapshot.reserve0, snapshot.reserve1, ) = pool.getReserves();
+        } else {
+            if (pool.decimals() != 18) {
+                revert("Lp token must have 18 decimals");
+            }
+            (
+                snapshot.decimals0,
+                snapshot.decimals1,
+                snapshot.reserve0,
+                snapshot.reserve1,
+                snapshot.stable,
+                snapshot.token0,
+                snapshot.token1
+            ) = pool.metadata();
+        }
+        snapshot.totalSupply = pool.totalSupply();
+
+        // feeds can be added or removed at any time, so always check them live
+        snapshot.token0HasFeed =
+            feeds[snapshot.token0].feedAddress != address(0);
+        snapshot.token1HasFeed =
+            feeds[snapshot.token1].feedAddress != address(0);
+    }
+
+    // number of decimals from a decimals scalar, ie 1e6 => 6
+    function _log10(uint256 _scalar) internal pure returns (uint8 decimals) {
+        while (_scalar > 1) {
+            _scalar /= 10;
+            ++decimals;
         }
     }
 
@@ -517,9 +1888,46 @@ contract PessimisticVelodromeLPOracle {
 
         useAdjustedPricing = _useAdjusted;
         useThreeDayLow = _useThreeDayLow;
+        _resetMemos();
         emit SetUseAdjustedPricing(_useAdjusted, _useThreeDayLow);
     }
 
+    /**
+     * @notice Set how many days of lows a given Velodrome LP's adjusted price looks back over.
+     * @dev This may only be called by operator. Windows longer than three days keep the lowest low of their older
+     *  days up to date as prices are updated, so reading a pool's price costs the same for any window length as long
+     *  as it was updated today or yesterday.
+     * @param _pool LP token to set a custom window for.
+     * @param _windowDays Window length in days, between 2 and MAX_WINDOW_DAYS. Zero to use our global window.
+     */
+    function setWindowDays(
+        address _pool,
+        uint256 _windowDays
+    ) external onlyOperator {
+        require(
+            _windowDays == 0 ||
+                (_windowDays > 1 && _windowDays <= MAX_WINDOW_DAYS),
+            "!window"
+        );
+
+        // compute our older lows right away so reads stay cheap until the pool's next update. anything cached for our
+        //  old window doesn't apply anymore.
+        if (_windowDays > BUFFER_DAYS) {
+            _storeOlderLows(
+                _pool,
+                0,
+                lowsBuffer[_pool],
+                currentDay(),
+                _windowDays
+            );
+        } else {
+            windowLows[_pool] = _windowDays;
+        }
+
+        _resetMemos();
+        emit SetWindowDays(_pool, _windowDays);
+    }
+
     /*
      * @notice Set whether we use only Chainlink for price feeds.
      * @dev This may only be called by operator. Defaults to true.
@@ -527,6 +1935,7 @@ contract PessimisticVelodromeLPOracle {
      */
     function setUseChainlinkOnly(bool _useChainlinkOnly) external onlyOperator {
         useChainlinkOnly = _useChainlinkOnly;
+        ++settingsEpoch;
         emit SetUseChainlinkOnly(_useChainlinkOnly);
     }
 
@@ -542,12 +1951,45 @@ contract PessimisticVelodromeLPOracle {
         uint256 _upperBound,
         uint256 _lowerBound
     ) external onlyOperator {
+        _setManualPriceCaps(_pool, _upperBound, _lowerBound);
+        _resetMemos();
+        emit ManualPriceCapsUpdated(_pool, _upperBound, _lowerBound);
+    }
+
+    /*
+     * @notice Set hard price caps for many Velodrome LPs in one transaction.
+     * @dev This may only be called by operator. Emits a single event for the whole batch.
+     * @param _pools LP tokens whose price caps we want to set.
+     * @param _upperBounds Upper price bounds in USD, 8 decimals.
+     * @param _lowerBounds Lower price bounds in USD, 8 decimals.
+     */
+    function setManyManualPriceCaps(
+        address[] calldata _pools,
+        uint256[] calldata _upperBounds,
+        uint256[] calldata _lowerBounds
+    ) external onlyOperator {
+        require(
+            _pools.length == _upperBounds.length &&
+                _pools.length == _lowerBounds.length,
+            "!length"
+        );
+        for (uint256 i; i < _pools.length; ++i) {
+            _setManualPriceCaps(_pools[i], _upperBounds[i], _lowerBounds[i]);
+        }
+        _resetMemos();
+        emit ManyManualPriceCapsUpdated(_pools, _upperBounds, _lowerBounds);
+    }
+
+    function _setManualPriceCaps(
+        address _pool,
+        uint256 _upperBound,
+        uint256 _lowerBound
+    ) internal {
         if (_lowerBound > _upperBound) {
             revert("Lower bound cannot be higher than upper");
         }
         upperPriceBound[_pool] = _upperBound;
         lowerPriceBound[_pool] = _lowerBound;
-        emit ManualPriceCapsUpdated(_pool, _upperBound, _lowerBound);
     }
 
     /*
@@ -561,9 +2003,43 @@ contract PessimisticVelodromeLPOracle {
         uint256 _points
     ) external onlyOperator {
         pointsOverride[_pool] = _points;
+        ++poolSettingsEpochs[_pool];
         emit UpdatedPointsOverride(_pool, _points);
     }
 
+    /*
+     * @notice Set the number of readings we look in the past for TWAP data for many pools in one transaction.
+     * @dev This may only be called by operator. Emits a single event for the whole batch.
+     * @param _pools LP tokens to set a custom points length for.
+     * @param _points Number of points to use for each pool.
+     */
+    function setManyPointsOverrides(
+        address[] calldata _pools,
+        uint256[] calldata _points
+    ) external onlyOperator {
+        require(_pools.length == _points.length, "!length");
+        for (uint256 i; i < _pools.length; ++i) {
+            pointsOverride[_pools[i]] = _points[i];
+            ++poolSettingsEpochs[_pools[i]];
+        }
+        emit UpdatedManyPointsOverrides(_pools, _points);
+    }
+
+    /*
+     * @notice Set whether a pool's TWAP comes from its cumulative reserves or from pool.quote().
+     * @dev This may only be called by operator. Cumulative TWAPs cost the same no matter how many points we use.
+     * @param _pool LP token to set our TWAP mode for.
+     * @param _useCumulative True to use cumulative reserves, false to use pool.quote().
+     */
+    function setUseCumulativeTwap(
+        address _pool,
+        bool _useCumulative
+    ) external onlyOperator {
+        useCumulativeTwap[_pool] = _useCumulative;
+        ++poolSettingsEpochs[_pool];
+        emit SetUseCumulativeTwap(_pool, _useCumulative);
+    }
+
     /**
      * @notice Sets the price feed of a specific token address.
      * @dev Even though the price feeds implement Chainlink's interface, it's possible to create custom feeds.
@@ -576,11 +2052,95 @@ contract PessimisticVelodromeLPOracle {
         address _feed,
         uint96 _heartbeat
     ) public onlyOperator {
-        feeds[_token].feedAddress = _feed;
-        feeds[_token].heartbeat = _heartbeat;
+        feeds[_token] = FeedInfo(_feed, _heartbeat);
+        ++settingsEpoch;
         emit SetTokenFeed(_token, _feed, _heartbeat);
     }
 
+    /**
+     * @notice Sets the price feeds of many token addresses in one transaction.
+     * @dev This may only be called by operator. Emits a single event for the whole batch.
+     * @param _tokens Addresses of the ERC20 tokens to set feeds for.
+     * @param _feeds The Chainlink feed of each ERC20 token.
+     * @param _heartbeats The heartbeat for each feed (maximum time allowed before refresh).
+     */
+    function setFeeds(
+        address[] calldata _tokens,
+        address[] calldata _feeds,
+        uint96[] calldata _heartbeats
+    ) external onlyOperator {
+        require(
+            _tokens.length == _feeds.length &&
+                _tokens.length == _heartbeats.length,
+            "!length"
+        );
+        for (uint256 i; i < _tokens.length; ++i) {
+            feeds[_tokens[i]] = FeedInfo(_feeds[i], _heartbeats[i]);
+        }
+        ++settingsEpoch;
+        emit SetTokenFeeds(_tokens, _feeds, _heartbeats);
+    }
+
+    /**
+     * @notice Add a pool to our registry, caching its immutable metadata.
+     * @dev This may only be called by operator. Registering a pool again just re-caches its metadata. Which of a pool's
+     *  tokens have feeds is always checked when pricing, so feeds may be changed without re-registering.
+     * @param _pool LP token to register.
+     */
+    function registerPool(address _pool) external onlyOperator {
+        IVeloPool pool = IVeloPool(_pool);
+        if (pool.decimals() != 18) {
+            revert("Lp token must have 18 decimals");
+        }
+        (
+            uint256 decimals0,
+            uint256 decimals1,
+            ,
+            ,
+            bool stable,
+            address token0,
+            address token1
+        ) = pool.metadata();
+
+        PoolInfo storage info = poolInfo[_pool];
+        info.token0 = token0;
+        info.token1 = token1;
+        info.decimals0 = _log10(decimals0);
+        info.decimals1 = _log10(decimals1);
+        info.stable = stable;
+        if (
+            feeds[token0].feedAddress == address(0) &&
+            feeds[token1].feedAddress == address(0)
+        ) {
+            revert("At least one token must have CL oracle");
+        }
+
+        if (info.index == 0) {
+            registeredPools.push(_pool);
+            info.index = uint32(registeredPools.length);
+        }
+        emit PoolRegistered(_pool, info.index - 1);
+    }
+
+    /**
+     * @notice Remove a pool from our registry. It will still be priced, just without any cached metadata.
+     * @dev This may only be called by operator. The last pool in our registry takes the removed pool's index.
+     * @param _pool LP token to unregister.
+     */
+    function unregisterPool(address _pool) external onlyOperator {
+        uint256 index = poolInfo[_pool].index;
+        require(index != 0, "!registered");
+
+        // move our last pool into this pool's spot
+        address lastPool = registeredPools[registeredPools.length - 1];
+        registeredPools[index - 1] = lastPool;
+        poolInfo[lastPool].index = uint32(index);
+        registeredPools.pop();
+
+        delete poolInfo[_pool];
+        emit PoolUnregistered(_pool);
+    }
+
     /**
      * @notice Set the ability of an address to update LP pricing.
      * @dev Throws if caller is not operator.
@@ -0,0 +1,9 @@
+// SPDX-License-Identifier: AGLP-3.0
+pragma solidity ^0.8.19;
+
+interface IPessimisticVelodromeLPOracle {
+    function getCachedPoolPriceWithTimestamp(
+        address _pool,
+        uint256 _maxAge
+    ) external view returns (uint256 price, uint256 updatedAt);
+}
@@ -23,6 +23,28 @@ interface IVeloPool is IERC20 {
             address t1
         );
 
+    function observations(
+        uint256 index
+    )
+        external
+        view
+        returns (
+            uint256 timestamp,
+            uint256 reserve0Cumulative,
+            uint256 reserve1Cumulative
+        );
+
+    function observationLength() external view returns (uint256);
+
+    function getReserves()
+        external
+        view
+        returns (
+            uint256 reserve0,
+            uint256 reserve1,
+            uint256 blockTimestampLast
+        );
+
     function decimals() external view returns (uint8);
 
     function stable() external view returns (bool);
@@ -0,0 +1,22 @@
+"""
+Off-chain models of PessimisticVelodromeLPOracle, for risk analysis over many scenarios without a chain.
+"""
+
+from .fixed_point import Panic, Revert
+from .oracle import (
+    BUFFER_DAYS,
+    DECIMALS,
+    MAX_WINDOW_DAYS,
+    PRICE_DECIMALS,
+    DailyLows,
+    PoolSnapshot,
+    adjusted_price,
+    calculate_stable_lp_token_price,
+    check_price_bounds,
+    fair_reserves_price,
+    get_amount_out,
+    get_cumulative_twap_price,
+    get_k,
+    token_prices,
+    window_low,
+)
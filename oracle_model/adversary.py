@@ -0,0 +1,557 @@
+"""
+Search for the cheapest way to lift the pessimistic price of a TWAP-priced pool, for auditing pools before listing.
+
+An attack is a few pushes, each holding the spot price of the pool's TWAP-priced token some way above its true price for
+a while, and a time to read (borrow against) our pessimistic price. Attacks play out on an in-memory pool alongside a
+keeper updating our lows, arbitrageurs pulling the pool back to its true price, and background activity checkpointing
+its TWAP. Each costs whatever its swaps lose at true prices. We search over push timing (around the UTC day boundary
+and the pool's 30-minute observations), size and read time with a simple evolutionary search, running independent
+searches on each of our cores.
+
+    python -m oracle_model.adversary --pool "vAMM 18/6 token0 TWAP" --lift 0.05 --keeper-interval 86400
+"""
+
+import argparse
+import heapq
+import itertools
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, Iterator, Optional, Sequence, Tuple
+
+from .fixed_point import Revert
+from .oracle import DECIMALS, PRICE_DECIMALS
+from .simulator import (
+    DEFAULT_POINTS,
+    ONE_DAY,
+    PERIOD_SIZE,
+    SimulatedOracle,
+)
+from .sweep import DEFAULT_TVL, POOL_CONFIGS, PoolConfig
+
+DEFAULT_ITERATIONS = 100
+DEFAULT_OFFSPRING = 8
+DEFAULT_MAX_PUSHES = 3
+
+# attacks start at midnight UTC, with our lows from earlier days already recorded at true prices
+ATTACK_START = 20_000 * ONE_DAY
+
+# event order within a single second: arbitrageurs first, then our attacker, then everyone reading the pool
+_ARB, _PUSH_END, _PUSH_START, _ACTIVITY, _KEEPER, _READ = range(6)
+
+# how precisely we solve for the swap that moves our pool to a given price, in bits
+_PRECISION_BITS = 20
+
+
+@dataclass(frozen=True)
+class Market:
+    """
+    A TWAP-priced pool and everyone else trading against or reading it.
+
+    Our keeper calls updatePrice every keeper_interval seconds, starting over keeper_offset seconds after each midnight
+    (so its schedule is the same every day, even if keeper_interval doesn't divide a day), and arbitrageurs restore the
+    pool's true price arb_interval seconds after it's pushed (never, if zero). Other traders checkpoint the pool's TWAP
+    every activity_interval seconds.
+    """
+
+    config: PoolConfig
+    tvl: int = DEFAULT_TVL
+    points: int = DEFAULT_POINTS
+    window_days: int = 2
+    keeper_interval: int = 3600
+    keeper_offset: int = 0
+    arb_interval: int = 300
+    activity_interval: int = 900
+    use_cumulative_twap: bool = False
+
+    def __post_init__(self):
+        if self.config.twap_token is None:
+            raise ValueError(f"{self.config.name} has no TWAP-priced token")
+        if not 0 <= self.keeper_offset < ONE_DAY:
+            raise ValueError("keeper_offset must fall within a day")
+
+    def keeper_times(self, end: int) -> Iterator[int]:
+        """Seconds after ATTACK_START our keeper updates at, before end."""
+        return itertools.chain.from_iterable(
+            range(
+                day + self.keeper_offset, min(day + ONE_DAY, end), self.keeper_interval
+            )
+            for day in range(0, end, ONE_DAY)
+        )
+
+    @property
+    def horizon(self) -> int:
+        """Seconds after ATTACK_START an attack may run for, enough to cover a full window and then some."""
+        return (self.window_days + 1) * ONE_DAY
+
+
+@dataclass(frozen=True)
+class Push:
+    """Hold our TWAP-priced token's spot price lift (0.1 for 10%) over its true price for duration seconds from start."""
+
+    start: int
+    duration: int
+    lift: float
+
+    @property
+    def end(self) -> int:
+        return self.start + self.duration
+
+
+@dataclass(frozen=True)
+class AttackPlan:
+    pushes: Tuple[Push, ...]
+    read_at: int
+
+
+@dataclass(frozen=True)
+class AttackResult:
+    """
+    How a plan played out. cost is in dollars at true prices, and lift is how far our pessimistic price was above its
+    starting point when read. Plans the oracle (or pool) reverted on have error set, an infinite cost and no lift.
+
+    window holds the lift of every price our pessimistic price was the lowest of: our fair price when read, then that of
+    each update in our window (including those from before our attack).
+    """
+
+    plan: AttackPlan
+    cost: float
+    lift: float
+    swaps: int
+    window: Tuple[float, ...] = ()
+    error: str = ""
+
+
+class _Attack:
+    # a single run of a plan against a fresh pool
+
+    def __init__(self, market: Market):
+        config = market.config
+        self.market = market
+        self.pool = config.pool(
+            market.tvl,
+            timestamp=ATTACK_START - (market.points + 1) * (PERIOD_SIZE + 1),
+        )
+        self.pool.seed_observations(market.points + 1)
+        self.oracle = SimulatedOracle(
+            self.pool,
+            *config.feed_prices(),
+            points=market.points,
+            use_cumulative_twap=market.use_cumulative_twap,
+            window_days=market.window_days,
+        )
+
+        # we push by selling our feed-priced token for our TWAP-priced one
+        if config.twap_token == "token0":
+            self.twap_token, self.feed_token = "token0", "token1"
+            self.twap_decimals, self.feed_decimals = DECIMALS, config.decimals1
+            self.twap_price, self.feed_price = config.price0, config.price1
+        else:
+            self.twap_token, self.feed_token = "token1", "token0"
+            self.twap_decimals, self.feed_decimals = config.decimals1, DECIMALS
+            self.twap_price, self.feed_price = config.price1, config.price0
+        self.true_quote = self._spot_quote()
+
+        self.baseline = self.oracle.fair_price()
+        self.updates = []
+        for days_ago in range(1, market.window_days):
+            self.oracle.lows.record(self.pool.day - days_ago, self.baseline)
+            self.updates.append((self.pool.day - days_ago, 0.0))
+
+        # we usually make the same swaps over and over as arbitrageurs undo them
+        self.last_amounts = {}
+
+        self.twap_balance = 0
+        self.feed_balance = 0
+        self.swaps = 0
+
+    def run(self, plan: AttackPlan) -> Tuple[float, Tuple[float, ...]]:
+        """Play out plan, returning our pessimistic price's lift at plan.read_at and its window (see AttackResult)."""
+        market = self.market
+        events = []
+        # breaks ties between events at the same time and of the same kind, so we never compare payloads
+        order = itertools.count()
+
+        def schedule(time: int, kind: int, payload=None) -> None:
+            heapq.heappush(events, (time, kind, next(order), payload))
+
+        for push in plan.pushes:
+            schedule(push.start, _PUSH_START, push)
+            schedule(push.end, _PUSH_END, push)
+        for time in range(
+            market.activity_interval, plan.read_at, market.activity_interval
+        ):
+            schedule(time, _ACTIVITY)
+        for time in market.keeper_times(plan.read_at):
+            schedule(time, _KEEPER)
+        schedule(plan.read_at, _READ)
+
+        active = []
+        arb_pending = False
+        while True:
+            time, kind, _, push = heapq.heappop(events)
+            self.pool.sleep(ATTACK_START + time - self.pool.timestamp)
+
+            if kind == _READ:
+                lift = self.oracle.adjusted_price() / self.baseline - 1
+                window = [self._lift(self.oracle.fair_price())]
+                window += [
+                    update_lift
+                    for day, update_lift in self.updates
+                    if day > self.pool.day - market.window_days
+                ]
+                return lift, tuple(window)
+            elif kind == _KEEPER:
+                # our keeper's updatePrice
+                price = self.oracle.fair_price()
+                self.oracle.lows.record(self.pool.day, price)
+                self.updates.append((self.pool.day, self._lift(price)))
+            elif kind == _ACTIVITY:
+                self.pool.sync()
+            elif kind == _ARB:
+                arb_pending = False
+                self._swap_to_lift(0, attacker=False)
+
+            if kind == _PUSH_START:
+                active.append(push)
+            elif kind == _PUSH_END:
+                active.remove(push)
+            if kind in (_ARB, _PUSH_START, _PUSH_END):
+                # we hold our highest active push, and unwind ourselves once we're done
+                self._swap_to_lift(max([push.lift for push in active], default=0))
+                if self._spot_quote() < self.true_quote and not arb_pending:
+                    if market.arb_interval > 0:
+                        schedule(time + market.arb_interval, _ARB)
+                        arb_pending = True
+
+    def cost(self) -> float:
+        """Dollars our swaps lost, valuing everything at true prices."""
+        value = (
+            self.twap_balance * self.twap_price / self.twap_decimals
+            + self.feed_balance * self.feed_price / self.feed_decimals
+        )
+        return -value / 10**PRICE_DECIMALS
+
+    def _lift(self, price: int) -> float:
+        return price / self.baseline - 1
+
+    def _reserve(self, token: str) -> int:
+        return self.pool.reserve0 if token == "token0" else self.pool.reserve1
+
+    def _spot_quote(self, reserves: Optional[Tuple[int, int]] = None) -> int:
+        return self.pool.spot_quote(self.feed_token, self.feed_decimals, reserves)
+
+    def _swap_to_lift(self, lift: float, attacker: bool = True) -> None:
+        # move our pool so our TWAP-priced token's spot price is lift above its true price
+        target = int(self.true_quote / (1 + lift))
+        current = self._spot_quote()
+        if current > target:
+            token_in, token_out = self.feed_token, self.twap_token
+            reached = lambda quote: quote <= target  # noqa: E731
+        elif current < target:
+            token_in, token_out = self.twap_token, self.feed_token
+            reached = lambda quote: quote >= target  # noqa: E731
+        else:
+            return
+
+        amount_in = _smallest(
+            lambda amount: reached(
+                self._spot_quote(self.pool.reserves_after_swap(token_in, amount))
+            ),
+            self.last_amounts.get(token_in) or 1 + (self._reserve(token_in) >> 10),
+        )
+        self.last_amounts[token_in] = amount_in
+        if self.pool.get_amount_out(amount_in, token_in) == 0:
+            # we're as close as the pool's rounding lets us get
+            return
+        amount_out = self.pool.swap(token_in, amount_in)
+        if attacker:
+            self.swaps += 1
+            balances = {token_in: -amount_in, token_out: amount_out}
+            self.twap_balance += balances[self.twap_token]
+            self.feed_balance += balances[self.feed_token]
+
+
+def _smallest(reached: Callable[[int], bool], guess: int) -> int:
+    # the smallest amount (to within our precision) for which reached holds, treating reverts as overshooting
+    def check(amount: int) -> bool:
+        try:
+            return reached(amount)
+        except Revert:
+            return True
+
+    # gallop out from our guess, which is usually close, to bracket our amount
+    step = max(1, guess >> 8)
+    if check(guess):
+        low, high = guess - step, guess
+        while low > 0 and check(low):
+            high, low, step = low, low - 2 * step, 2 * step
+        low = max(low, 0)
+    else:
+        low, high = guess, guess + step
+        while not check(high):
+            low, high, step = high, high + 2 * step, 2 * step
+    while high - low > max(1, high >> _PRECISION_BITS):
+        middle = (low + high) // 2
+        if check(middle):
+            high = middle
+        else:
+            low = middle
+    return high
+
+
+def simulate(market: Market, plan: AttackPlan) -> AttackResult:
+    """Play out plan against a fresh pool in market."""
+    attack = _Attack(market)
+    try:
+        lift, window = attack.run(plan)
+    except Revert as revert:
+        return AttackResult(plan, math.inf, -math.inf, attack.swaps, error=str(revert))
+    return AttackResult(plan, attack.cost(), lift, attack.swaps, window)
+
+
+################################################## SEARCH ##################################################
+
+
+def _score(result: AttackResult, target_lift: float) -> tuple:
+    # anything reaching our target beats everything that doesn't, then cheaper is better. our pessimistic price only
+    #  moves once every price in its window does, so until then we reward getting more of them closer to our target.
+    if result.lift >= target_lift:
+        return (0, result.cost)
+    if not result.window:
+        return (2, result.cost)
+    progress = sum(min(lift, target_lift) for lift in result.window)
+    return (1, -progress / len(result.window), result.cost)
+
+
+def _random_push(rng: random.Random, market: Market, target_lift: float) -> Push:
+    return Push(
+        start=rng.randrange(market.horizon),
+        duration=int(
+            math.exp(rng.uniform(math.log(PERIOD_SIZE), math.log(market.horizon)))
+        ),
+        # volatile pools need roughly twice our target, as LP prices follow the square root of token prices
+        lift=rng.uniform(0, 4 * target_lift + 0.02),
+    )
+
+
+def random_plan(
+    rng: random.Random,
+    market: Market,
+    target_lift: float,
+    max_pushes: int = DEFAULT_MAX_PUSHES,
+) -> AttackPlan:
+    return AttackPlan(
+        pushes=tuple(
+            _random_push(rng, market, target_lift)
+            for _ in range(rng.randint(1, max_pushes))
+        ),
+        read_at=rng.randrange(market.horizon + 1),
+    )
+
+
+def _aligned_push(
+    rng: random.Random, market: Market, plan: AttackPlan, push: Push
+) -> Push:
+    # hold push over the observations our TWAP averages for a keeper update, or our read
+    if rng.random() < 0.5:
+        moment = plan.read_at
+    else:
+        moment = rng.choice(list(market.keeper_times(market.horizon + 1)))
+    start = max(0, moment - market.points * PERIOD_SIZE - rng.randrange(PERIOD_SIZE))
+    return replace(push, start=start, duration=moment - start + 1 + rng.randrange(120))
+
+
+def _nudge(rng: random.Random, market: Market, time: int) -> int:
+    # small and large moves, or a snap to just after the nearest day boundary or observation
+    choice = rng.random()
+    if choice < 0.25:
+        grid = ONE_DAY if rng.random() < 0.5 else PERIOD_SIZE
+        time = round(time / grid) * grid + rng.randrange(120)
+    else:
+        scale = rng.choice([60, PERIOD_SIZE, 6 * 3600])
+        time += int(rng.gauss(0, scale))
+    return min(max(time, 0), market.horizon)
+
+
+def mutate(
+    rng: random.Random,
+    market: Market,
+    plan: AttackPlan,
+    target_lift: float,
+    max_pushes: int = DEFAULT_MAX_PUSHES,
+) -> AttackPlan:
+    """
+    A small random change to plan: moving its read or one of its pushes, resizing a push, lining a push up with a
+    keeper update or our read, or adding/dropping one.
+    """
+    pushes = list(plan.pushes)
+    choice = rng.random()
+    if choice < 0.15:
+        return replace(plan, read_at=_nudge(rng, market, plan.read_at))
+    if choice < 0.25 and len(pushes) < max_pushes:
+        push = _random_push(rng, market, target_lift)
+        if rng.random() < 0.5:
+            push = _aligned_push(rng, market, plan, push)
+        pushes.append(push)
+    elif choice < 0.35 and len(pushes) > 1:
+        pushes.pop(rng.randrange(len(pushes)))
+    else:
+        i = rng.randrange(len(pushes))
+        push = pushes[i]
+        if choice < 0.55:
+            pushes[i] = replace(push, lift=push.lift * math.exp(rng.gauss(0, 0.3)))
+        elif choice < 0.7:
+            pushes[i] = _aligned_push(rng, market, plan, push)
+        elif choice < 0.85:
+            start = _nudge(rng, market, push.start)
+            pushes[i] = replace(push, start=start, duration=max(1, push.end - start))
+        else:
+            end = _nudge(rng, market, push.end)
+            pushes[i] = replace(push, duration=max(1, end - push.start))
+    return replace(plan, pushes=tuple(pushes))
+
+
+def search(
+    market: Market,
+    target_lift: float,
+    iterations: int = DEFAULT_ITERATIONS,
+    seed: int = 0,
+    max_pushes: int = DEFAULT_MAX_PUSHES,
+    offspring: int = DEFAULT_OFFSPRING,
+) -> AttackResult:
+    """
+    Our cheapest attack lifting market's pessimistic price by target_lift (0.05 for 5%), or the one that came closest.
+
+    Each iteration tries offspring variations of our best plan so far (and the odd fresh one), keeping any improvement.
+    """
+    rng = random.Random(seed)
+    best = simulate(market, random_plan(rng, market, target_lift, max_pushes))
+    for _ in range(iterations):
+        for _ in range(offspring):
+            if rng.random() < 0.1:
+                plan = random_plan(rng, market, target_lift, max_pushes)
+            else:
+                plan = mutate(rng, market, best.plan, target_lift, max_pushes)
+            result = simulate(market, plan)
+            if _score(result, target_lift) < _score(best, target_lift):
+                best = result
+    return best
+
+
+def _search(args) -> AttackResult:
+    return search(*args)
+
+
+def find_cheapest_attack(
+    market: Market,
+    target_lift: float,
+    searches: Optional[int] = None,
+    workers: Optional[int] = None,
+    iterations: int = DEFAULT_ITERATIONS,
+    seed: int = 0,
+    max_pushes: int = DEFAULT_MAX_PUSHES,
+) -> AttackResult:
+    """Run independent searches (one per core by default) on workers processes, returning the best attack found."""
+    workers = workers or os.cpu_count() or 1
+    jobs = [
+        (market, target_lift, iterations, seed + i, max_pushes)
+        for i in range(searches or workers)
+    ]
+    if workers == 1:
+        results = list(map(_search, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_search, jobs))
+    return min(results, key=lambda result: _score(result, target_lift))
+
+
+################################################## REPORTING ##################################################
+
+
+def _format_time(seconds: int) -> str:
+    days, seconds = divmod(seconds, ONE_DAY)
+    hours, seconds = divmod(seconds, 3600)
+    return f"day {days} {hours:02}:{seconds // 60:02}:{seconds % 60:02}"
+
+
+def format_attack(result: AttackResult, target_lift: float) -> str:
+    """A readable summary of result, with times in UTC from the midnight our attack starts."""
+    if result.error:
+        headline = f"best attack reverted: {result.error}"
+    else:
+        reached = "reached" if result.lift >= target_lift else "fell short of"
+        headline = (
+            f"best attack {reached} {target_lift:+.2%}: {result.lift:+.4%} pessimistic lift for "
+            f"${result.cost:,.2f} ({result.swaps} swaps)"
+        )
+    lines = [headline]
+    read_at = result.plan.read_at
+    for push in sorted(result.plan.pushes, key=lambda push: push.start):
+        # nothing after our read matters
+        if push.start <= read_at:
+            lines.append(
+                f"  push {push.lift:+.2%} from {_format_time(push.start)} to "
+                f"{_format_time(min(push.end, read_at))}"
+            )
+    lines.append(f"  read at {_format_time(read_at)}")
+    return "\n".join(lines)
+
+
+################################################## CLI ##################################################
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    twap_pools = [config.name for config in POOL_CONFIGS if config.twap_token]
+    parser = argparse.ArgumentParser(
+        prog="python -m oracle_model.adversary",
+        description="Search for the cheapest attack lifting a TWAP-priced pool's pessimistic price.",
+    )
+    parser.add_argument("--pool", choices=twap_pools, default=twap_pools[0])
+    parser.add_argument(
+        "--lift", type=float, required=True, help="target lift, eg 0.05 for 5%%"
+    )
+    parser.add_argument("--tvl", type=int, default=DEFAULT_TVL, help="in dollars")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS)
+    parser.add_argument("--window-days", type=int, choices=[2, 3], default=2)
+    parser.add_argument("--keeper-interval", type=int, default=3600)
+    parser.add_argument("--keeper-offset", type=int, default=0)
+    parser.add_argument(
+        "--arb-interval", type=int, default=300, help="zero for no arbitrage"
+    )
+    parser.add_argument("--activity-interval", type=int, default=900)
+    parser.add_argument("--cumulative", action="store_true", help="cumulative TWAPs")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--max-pushes", type=int, default=DEFAULT_MAX_PUSHES)
+    parser.add_argument("--searches", type=int, help="defaults to one per worker")
+    parser.add_argument("--workers", type=int, help="defaults to all of our cores")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    market = Market(
+        config=next(config for config in POOL_CONFIGS if config.name == args.pool),
+        tvl=args.tvl,
+        points=args.points,
+        window_days=args.window_days,
+        keeper_interval=args.keeper_interval,
+        keeper_offset=args.keeper_offset,
+        arb_interval=args.arb_interval,
+        activity_interval=args.activity_interval,
+        use_cumulative_twap=args.cumulative,
+    )
+    result = find_cheapest_attack(
+        market,
+        args.lift,
+        searches=args.searches,
+        workers=args.workers,
+        iterations=args.iterations,
+        seed=args.seed,
+        max_pushes=args.max_pushes,
+    )
+    print(format_attack(result, args.lift))
+
+
+if __name__ == "__main__":
+    main()
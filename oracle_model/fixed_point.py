@@ -0,0 +1,143 @@
+"""
+Integer ports of solmate's FixedPointMathLib and of solidity's checked arithmetic.
+
+Everything here works on python ints, and matches the EVM bit-for-bit, including reverts. Assembly in
+FixedPointMathLib wraps on overflow and divides by zero to zero, while regular solidity (>=0.8) arithmetic panics.
+"""
+
+UINT256_MAX = 2**256 - 1
+WAD = 10**18
+
+# solidity panic codes
+PANIC_OVERFLOW = 0x11
+PANIC_DIVISION_BY_ZERO = 0x12
+
+
+class Revert(Exception):
+    """A call that would revert on chain. reason matches the contract's revert string (empty for bare reverts)."""
+
+    def __init__(self, reason: str = ""):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Panic(Revert):
+    """A solidity panic, ie checked arithmetic overflowing or dividing by zero."""
+
+    def __init__(self, code: int):
+        super().__init__(f"Panic(0x{code:02x})")
+        self.code = code
+
+
+################################################## CHECKED SOLIDITY MATH ##################################################
+
+
+def add(*values: int) -> int:
+    """Checked uint256 addition, left to right."""
+    total = 0
+    for value in values:
+        total += value
+        if total > UINT256_MAX:
+            raise Panic(PANIC_OVERFLOW)
+    return total
+
+
+def sub(x: int, y: int) -> int:
+    """Checked uint256 subtraction."""
+    if y > x:
+        raise Panic(PANIC_OVERFLOW)
+    return x - y
+
+
+def mul(*values: int) -> int:
+    """Checked uint256 multiplication, left to right so we overflow at the same step solidity would."""
+    product = 1
+    for value in values:
+        product *= value
+        if product > UINT256_MAX:
+            raise Panic(PANIC_OVERFLOW)
+    return product
+
+
+def div(x: int, y: int) -> int:
+    """Checked uint256 division, rounding down."""
+    if y == 0:
+        raise Panic(PANIC_DIVISION_BY_ZERO)
+    return x // y
+
+
+################################################## FIXED POINT MATH LIB ##################################################
+
+
+def _evm_div(x: int, y: int) -> int:
+    # assembly div returns zero instead of reverting
+    return 0 if y == 0 else x // y
+
+
+def mul_div_down(x: int, y: int, denominator: int) -> int:
+    """FixedPointMathLib.mulDivDown, which reverts (without a reason) on overflow or a zero denominator."""
+    if denominator == 0 or (y != 0 and x > UINT256_MAX // y):
+        raise Revert()
+    return (x * y) // denominator
+
+
+def mul_wad_down(x: int, y: int) -> int:
+    """FixedPointMathLib.mulWadDown, (x * y) / 1e18 rounded down."""
+    return mul_div_down(x, y, WAD)
+
+
+def rpow(x: int, n: int, scalar: int) -> int:
+    """FixedPointMathLib.rpow, x ** n in fixed point with rounding to the nearest at each step."""
+    if x == 0:
+        return scalar if n == 0 else 0
+
+    z = scalar if n % 2 == 0 else x
+    half = scalar >> 1
+    n >>= 1
+    while n:
+        # revert immediately if x ** 2 would overflow
+        if x >> 128:
+            raise Revert()
+        xx = x * x
+        xx_round = xx + half
+        if xx_round > UINT256_MAX:
+            raise Revert()
+        x = xx_round // scalar
+
+        if n % 2:
+            zx = z * x
+            if zx > UINT256_MAX:
+                raise Revert()
+            zx_round = zx + half
+            if zx_round > UINT256_MAX:
+                raise Revert()
+            z = zx_round // scalar
+        n >>= 1
+    return z
+
+
+def sqrt(x: int) -> int:
+    """FixedPointMathLib.sqrt, floor(sqrt(x)) via a bit-length estimate and seven babylonian steps."""
+    y = x
+    z = 181
+    if y >= 0x10000000000000000000000000000000000:
+        y >>= 128
+        z <<= 64
+    if y >= 0x1000000000000000000:
+        y >>= 64
+        z <<= 32
+    if y >= 0x10000000000:
+        y >>= 32
+        z <<= 16
+    if y >= 0x1000000:
+        y >>= 16
+        z <<= 8
+
+    z = (z * (y + 65536)) >> 18
+    for _ in range(7):
+        z = (z + _evm_div(x, z)) >> 1
+
+    # round down if we landed on ceil(sqrt(x))
+    if _evm_div(x, z) < z:
+        z -= 1
+    return z
@@ -0,0 +1,325 @@
+"""
+Reference model of PessimisticVelodromeLPOracle's pricing math.
+
+Each function mirrors the contract function named in its docstring, step for step, so results (and reverts) match
+the deployed oracle exactly. Anything the contract reads from chain (feeds, TWAP quotes, stored lows) is passed in.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+from .fixed_point import (
+    Revert,
+    add,
+    div,
+    mul,
+    mul_wad_down,
+    rpow,
+    sqrt,
+    sub,
+)
+
+# our pool/LP token decimals
+DECIMALS = 10**18
+
+# chainlink USD feeds (and so our prices) use 8 decimals
+PRICE_DECIMALS = 8
+
+# number of days of lows held in each pool's ring buffer, and the longest window a pool may use
+BUFFER_DAYS = 3
+MAX_WINDOW_DAYS = 7
+
+# lows under 2**56 are stored exactly, see pack_low
+_LOW_BITS = 56
+
+
+@dataclass(frozen=True)
+class PoolSnapshot:
+    """Everything we need from a pool to price it. Note that decimals are scalars, ie 10**18 rather than 18."""
+
+    decimals0: int
+    decimals1: int
+    reserve0: int
+    reserve1: int
+    total_supply: int
+    stable: bool
+    token0: str = "token0"
+    token1: str = "token1"
+
+
+################################################## FAIR RESERVES ##################################################
+
+
+def get_k(x: int, y: int) -> int:
+    """_getK, the stable invariant x^3 * y + y^3 * x in 18 decimals."""
+    new_x = mul_wad_down(rpow(x, 3, DECIMALS), y)
+    new_y = mul_wad_down(rpow(y, 3, DECIMALS), x)
+    return add(new_x, new_y)
+
+
+def calculate_stable_lp_token_price(
+    total_supply: int,
+    price0: int,
+    price1: int,
+    reserve0: int,
+    reserve1: int,
+    price_decimals: int = PRICE_DECIMALS,
+) -> int:
+    """_calculate_stable_lp_token_price, fair reserves pricing for x^3 * y + y^3 * x = k pools."""
+    k = get_k(reserve0, reserve1)
+
+    # convert our prices to 18 decimals
+    price0 = mul(price0, DECIMALS // 10**price_decimals)
+    price1 = mul(price1, DECIMALS // 10**price_decimals)
+    a = rpow(price0, 3, DECIMALS)
+    b = rpow(price1, 3, DECIMALS)
+    c = rpow(price0, 2, DECIMALS)
+    d = rpow(price1, 2, DECIMALS)
+
+    p0 = mul(k, mul_wad_down(a, b))
+    fair = div(p0, add(c, d))
+
+    # each sqrt halves our decimals, so top them back up in between
+    frth_fair = sqrt(mul(sqrt(mul(fair, DECIMALS)), DECIMALS))
+    return mul(2, div(mul(frth_fair, 10**price_decimals), total_supply))
+
+
+def fair_reserves_price(snapshot: PoolSnapshot, price0: int, price1: int) -> int:
+    """_getFairReservesPricing, the price of one LP token given both token prices (8 decimals)."""
+    # normalize our reserves to 18 decimals
+    reserve0 = div(mul(snapshot.reserve0, DECIMALS), snapshot.decimals0)
+    reserve1 = div(mul(snapshot.reserve1, DECIMALS), snapshot.decimals1)
+
+    if snapshot.stable:
+        return calculate_stable_lp_token_price(
+            snapshot.total_supply, price0, price1, reserve0, reserve1, PRICE_DECIMALS
+        )
+
+    k = sqrt(mul(reserve0, reserve1))
+    p = sqrt(mul(price0, 10**16, price1))
+    return div(mul(2, p, k), mul(10**8, snapshot.total_supply))
+
+
+################################################## TOKEN PRICES ##################################################
+
+
+def token_prices(
+    snapshot: PoolSnapshot,
+    feed_price0: Optional[int],
+    feed_price1: Optional[int],
+    twap_quote: Optional[int] = None,
+    use_chainlink_only: bool = False,
+) -> Tuple[int, int]:
+    """
+    getTokenPrices, both token prices in 8 decimals.
+
+    Pass None for a token without a feed. The other token's price then comes from twap_quote, the amount of the
+    TWAP-priced token we get for one of the feed-priced token (as from pool.quote() or get_cumulative_twap_price).
+    """
+    if feed_price0 is not None:
+        price0 = feed_price0
+        if feed_price1 is not None:
+            return price0, feed_price1
+        if use_chainlink_only:
+            raise Revert("Only Chainlink feeds supported")
+        price1 = div(
+            mul(snapshot.decimals1, snapshot.decimals1), _require_quote(twap_quote)
+        )
+        return price0, div(mul(price0, price1), snapshot.decimals1)
+
+    if feed_price1 is not None:
+        price1 = feed_price1
+        price0 = div(
+            mul(snapshot.decimals0, snapshot.decimals0), _require_quote(twap_quote)
+        )
+        return div(mul(price0, price1), snapshot.decimals0), price1
+
+    raise Revert("At least one token must have CL oracle")
+
+
+def _require_quote(twap_quote: Optional[int]) -> int:
+    if twap_quote is None:
+        raise ValueError("twap_quote is needed to price a token without a feed")
+    return twap_quote
+
+
+def get_amount_out(
+    snapshot: PoolSnapshot,
+    token_in: str,
+    amount_in: int,
+    reserve0: int,
+    reserve1: int,
+) -> int:
+    """_getAmountOut, a fee-less swap against the given reserves, as used for cumulative TWAPs."""
+    is_token0 = token_in == snapshot.token0
+    if not snapshot.stable:
+        if is_token0:
+            return div(mul(amount_in, reserve1), add(reserve0, amount_in))
+        return div(mul(amount_in, reserve0), add(reserve1, amount_in))
+
+    # stable pools solve x^3 * y + y^3 * x = k with everything normalized to 18 decimals
+    reserve0 = div(mul(reserve0, DECIMALS), snapshot.decimals0)
+    reserve1 = div(mul(reserve1, DECIMALS), snapshot.decimals1)
+    xy = f(reserve0, reserve1)
+    reserve_a, reserve_b = (reserve0, reserve1) if is_token0 else (reserve1, reserve0)
+    decimals_in, decimals_out = (
+        (snapshot.decimals0, snapshot.decimals1)
+        if is_token0
+        else (snapshot.decimals1, snapshot.decimals0)
+    )
+
+    amount_in = div(mul(amount_in, DECIMALS), decimals_in)
+    y = sub(reserve_b, get_y(add(amount_in, reserve_a), xy, reserve_b))
+    return div(mul(y, decimals_out), DECIMALS)
+
+
+def get_cumulative_twap_price(
+    snapshot: PoolSnapshot,
+    token: str,
+    one_token: int,
+    start: Tuple[int, int, int],
+    end: Tuple[int, int, int],
+) -> int:
+    """
+    _getCumulativeTwapPrice, swapping against the average reserves between two observations.
+
+    start and end are (timestamp, reserve0Cumulative, reserve1Cumulative), as returned by pool.observations().
+    """
+    time_elapsed = sub(end[0], start[0])
+    return get_amount_out(
+        snapshot,
+        token,
+        one_token,
+        div(sub(end[1], start[1]), time_elapsed),
+        div(sub(end[2], start[2]), time_elapsed),
+    )
+
+
+def get_y(x0: int, xy: int, y: int) -> int:
+    """_getY, newton's method for the stable invariant."""
+    for _ in range(255):
+        k = f(x0, y)
+        if k < xy:
+            dy = div(mul(sub(xy, k), DECIMALS), d(x0, y))
+            if dy == 0:
+                # rounding is keeping us from converging, and there's no closer answer than y + 1
+                if f(x0, add(y, 1)) > xy:
+                    return add(y, 1)
+                dy = 1
+            y = add(y, dy)
+        else:
+            dy = div(mul(sub(k, xy), DECIMALS), d(x0, y))
+            if dy == 0:
+                # we need f(x0, y) >= xy, so we can't step below that
+                if k == xy or f(x0, sub(y, 1)) < xy:
+                    return y
+                dy = 1
+            y = sub(y, dy)
+    raise Revert("!y")
+
+
+def f(x0: int, y: int) -> int:
+    """_f, x0 * y * (x0^2 + y^2) in 18 decimals."""
+    a = div(mul(x0, y), DECIMALS)
+    b = add(div(mul(x0, x0), DECIMALS), div(mul(y, y), DECIMALS))
+    return div(mul(a, b), DECIMALS)
+
+
+def d(x0: int, y: int) -> int:
+    """_d, the derivative of f with respect to y."""
+    return add(
+        div(mul(3, x0, div(mul(y, y), DECIMALS)), DECIMALS),
+        div(mul(div(mul(x0, x0), DECIMALS), x0), DECIMALS),
+    )
+
+
+################################################## PESSIMISTIC PRICING ##################################################
+
+
+def pack_low(price: int) -> int:
+    """_packLow, lows over 2**56 keep their top 56 bits and store the shift in the top byte, rounding down."""
+    shift = 0
+    while price >= 1 << _LOW_BITS:
+        price >>= 1
+        shift += 1
+    return (shift << _LOW_BITS) | price
+
+
+def unpack_low(packed: int) -> int:
+    """_unpackLow."""
+    return (packed & ((1 << _LOW_BITS) - 1)) << (packed >> _LOW_BITS)
+
+
+def window_low(current_price: int, lows: Sequence[int], window_days: int) -> int:
+    """
+    _getWindowLow, the lowest of our current price and the stored lows in our window.
+
+    lows[i] is the (unpacked) stored low from i days ago, starting with today, and zero for days without updates.
+    """
+    low = current_price
+    for stored_low in lows[:window_days]:
+        if 0 < stored_low < low:
+            low = stored_low
+    return low
+
+
+def check_price_bounds(price: int, upper_bound: int = 0, lower_bound: int = 0) -> None:
+    """_checkPriceBounds, an upper bound of zero means we don't have one."""
+    if upper_bound > 0 and price > upper_bound:
+        raise Revert("Price above upper bound")
+    if price < lower_bound:
+        raise Revert("Price below lower bound")
+
+
+def adjusted_price(
+    current_price: int,
+    lows: Sequence[int],
+    window_days: int = 2,
+    upper_bound: int = 0,
+    lower_bound: int = 0,
+) -> int:
+    """_adjustPrice, our pessimistic price given a fresh fair reserves price. See window_low for lows."""
+    price = window_low(current_price, lows, window_days)
+    check_price_bounds(price, upper_bound, lower_bound)
+    return price
+
+
+class DailyLows:
+    """A pool's stored daily lows, recorded the same way (and with the same rounding) as the oracle's updatePrice."""
+
+    def __init__(self) -> None:
+        self._packed: Dict[int, int] = {}
+        self.updates: Dict[int, int] = {}
+
+    def record(self, day: int, price: int) -> int:
+        """Record a fair reserves price seen on day, returning our stored low for that day."""
+        self.updates[day] = min(self.updates.get(day, 0) + 1, 2**16 - 1)
+        todays_low = self.low(day)
+        if todays_low == 0 or price < todays_low:
+            self._packed[day] = pack_low(price)
+        return self.low(day)
+
+    def low(self, day: int) -> int:
+        """Stored low for day, zero if it was never updated."""
+        return unpack_low(self._packed.get(day, 0))
+
+    def lows(self, day: int, num_days: int = MAX_WINDOW_DAYS) -> list:
+        """Stored lows for day and the num_days - 1 days before it, most recent first."""
+        return [self.low(day - i) for i in range(num_days)]
+
+    def adjusted_price(
+        self,
+        day: int,
+        current_price: int,
+        window_days: int = 2,
+        upper_bound: int = 0,
+        lower_bound: int = 0,
+    ) -> int:
+        """Our pessimistic price on day for a fresh fair reserves price, as getCurrentPoolPrice would return it."""
+        return adjusted_price(
+            current_price,
+            self.lows(day, window_days),
+            window_days,
+            upper_bound,
+            lower_bound,
+        )
@@ -0,0 +1,367 @@
+"""
+In-memory Velodrome V2 pool (vAMM and sAMM) and a pessimistic oracle pricing it, for manipulation studies.
+
+SimulatedPool follows Pool.sol: swaps pay their fee out of the pool, reserves accumulate every second, and an
+observation is recorded whenever more than 30 minutes have passed since the last one. quote() averages fee-less swaps
+against each completed observation window, just like the pool. SimulatedOracle prices the pool with our integer
+oracle model, so scenarios that take minutes on a fork replay in milliseconds.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .fixed_point import Revert, add, div, mul, sub
+from .oracle import (
+    DECIMALS,
+    DailyLows,
+    PoolSnapshot,
+    d,
+    f,
+    fair_reserves_price,
+    get_cumulative_twap_price,
+    token_prices,
+)
+
+# pools record a new observation once more than this many seconds have passed since their last one
+PERIOD_SIZE = 1800
+
+# velodrome's default swap fees, in basis points
+FEE_DENOMINATOR = 10_000
+DEFAULT_VOLATILE_FEE = 30
+DEFAULT_STABLE_FEE = 5
+
+# the oracle's default number of TWAP points (2 hours)
+DEFAULT_POINTS = 4
+
+ONE_DAY = 86400
+
+
+@dataclass(frozen=True)
+class Observation:
+    timestamp: int
+    reserve0_cumulative: int
+    reserve1_cumulative: int
+
+
+class SimulatedPool:
+    """
+    A Velodrome V2 pool holding reserve0 of token0 and reserve1 of token1, starting at timestamp.
+
+    Decimals are scalars (10**6 for USDC), as in pool.metadata(). The pool starts with a single observation, so use
+    seed_observations() before quoting.
+    """
+
+    def __init__(
+        self,
+        reserve0: int,
+        reserve1: int,
+        decimals0: int = DECIMALS,
+        decimals1: int = DECIMALS,
+        stable: bool = False,
+        total_supply: int = DECIMALS,
+        fee: Optional[int] = None,
+        timestamp: int = 0,
+        token0: str = "token0",
+        token1: str = "token1",
+    ):
+        self.reserve0 = reserve0
+        self.reserve1 = reserve1
+        self.decimals0 = decimals0
+        self.decimals1 = decimals1
+        self.stable = stable
+        self.total_supply = total_supply
+        if fee is None:
+            fee = DEFAULT_STABLE_FEE if stable else DEFAULT_VOLATILE_FEE
+        self.fee = fee
+        self.token0 = token0
+        self.token1 = token1
+
+        self.timestamp = timestamp
+        self.block_timestamp_last = timestamp
+        self.reserve0_cumulative_last = 0
+        self.reserve1_cumulative_last = 0
+        self.observations: List[Observation] = [Observation(timestamp, 0, 0)]
+
+    ################################################## TIME ##################################################
+
+    def sleep(self, seconds: int) -> None:
+        """Move our clock forward, like chain.sleep(). Nothing is recorded until the pool's next swap or sync."""
+        self.timestamp += seconds
+
+    def seed_observations(self, count: int, period: int = PERIOD_SIZE + 1) -> None:
+        """Sync every period seconds, count times, so our TWAP starts out at our current reserves."""
+        for _ in range(count):
+            self.sleep(period)
+            self.sync()
+
+    @property
+    def day(self) -> int:
+        return self.timestamp // ONE_DAY
+
+    ################################################## POOL ##################################################
+
+    def sync(self) -> None:
+        """Pool.sync(), accruing our reserves and recording an observation if one is due."""
+        self._update(self.reserve0, self.reserve1)
+
+    def swap(self, token_in: str, amount_in: int, amount_out_min: int = 0) -> int:
+        """Swap amount_in of token_in through the router, returning the amount of the other token we receive."""
+        amount_out = self.get_amount_out(amount_in, token_in)
+        if amount_out == 0 or amount_out < amount_out_min:
+            raise Revert("InsufficientOutputAmount")
+
+        balance0, balance1 = self._balances_after(token_in, amount_in, amount_out)
+        if self._k(balance0, balance1) < self._k(self.reserve0, self.reserve1):
+            raise Revert("K")
+        self._update(balance0, balance1)
+        return amount_out
+
+    def get_amount_out(self, amount_in: int, token_in: str) -> int:
+        """Pool.getAmountOut(), net of our swap fee."""
+        amount_in = sub(amount_in, amount_in * self.fee // FEE_DENOMINATOR)
+        return self._get_amount_out(amount_in, token_in, self.reserve0, self.reserve1)
+
+    def reserves_after_swap(self, token_in: str, amount_in: int) -> Tuple[int, int]:
+        """Our reserves if we swapped amount_in of token_in, without swapping."""
+        return self._balances_after(
+            token_in, amount_in, self.get_amount_out(amount_in, token_in)
+        )
+
+    def spot_quote(
+        self,
+        token_in: str,
+        amount_in: int,
+        reserves: Optional[Tuple[int, int]] = None,
+    ) -> int:
+        """A fee-less swap against our current reserves (or the given ones), as quote() would see them."""
+        reserve0, reserve1 = reserves or (self.reserve0, self.reserve1)
+        return self._get_amount_out(amount_in, token_in, reserve0, reserve1)
+
+    def quote(self, token_in: str, amount_in: int, granularity: int) -> int:
+        """Pool.quote(), the average fee-less swap over our last granularity observation windows."""
+        return sum(self.sample(token_in, amount_in, granularity, 1)) // granularity
+
+    def sample(
+        self, token_in: str, amount_in: int, points: int, window: int = 1
+    ) -> List[int]:
+        """Pool.sample(), a fee-less swap against the average reserves of each observation window."""
+        length = len(self.observations) - 1
+        start = sub(length, points * window)
+        prices = []
+        for i in range(start, length, window):
+            reserve0, reserve1 = self._average_reserves(
+                self.observations[i], self.observations[i + window]
+            )
+            prices.append(self._get_amount_out(amount_in, token_in, reserve0, reserve1))
+        return prices
+
+    @property
+    def last_observation(self) -> Observation:
+        return self.observations[-1]
+
+    def snapshot(self) -> PoolSnapshot:
+        """Our current state, as our oracle model sees it."""
+        return PoolSnapshot(
+            decimals0=self.decimals0,
+            decimals1=self.decimals1,
+            reserve0=self.reserve0,
+            reserve1=self.reserve1,
+            total_supply=self.total_supply,
+            stable=self.stable,
+            token0=self.token0,
+            token1=self.token1,
+        )
+
+    def spot_price(self, price0: int, price1: int) -> int:
+        """Value of one LP token at our current reserves, in 8 decimals given token prices in 8 decimals."""
+        value = (
+            self.reserve0 * price0 * DECIMALS // self.decimals0
+            + self.reserve1 * price1 * DECIMALS // self.decimals1
+        )
+        return value // self.total_supply
+
+    ################################################## INTERNALS ##################################################
+
+    def _update(self, balance0: int, balance1: int) -> None:
+        time_elapsed = self.timestamp - self.block_timestamp_last
+        if time_elapsed > 0 and self.reserve0 != 0 and self.reserve1 != 0:
+            self.reserve0_cumulative_last += self.reserve0 * time_elapsed
+            self.reserve1_cumulative_last += self.reserve1 * time_elapsed
+
+        if self.timestamp - self.last_observation.timestamp > PERIOD_SIZE:
+            self.observations.append(
+                Observation(
+                    self.timestamp,
+                    self.reserve0_cumulative_last,
+                    self.reserve1_cumulative_last,
+                )
+            )
+
+        self.reserve0 = balance0
+        self.reserve1 = balance1
+        self.block_timestamp_last = self.timestamp
+
+    def _balances_after(
+        self, token_in: str, amount_in: int, amount_out: int
+    ) -> Tuple[int, int]:
+        # our fee leaves the pool
+        amount_in = sub(amount_in, amount_in * self.fee // FEE_DENOMINATOR)
+        if token_in == self.token0:
+            return add(self.reserve0, amount_in), sub(self.reserve1, amount_out)
+        return sub(self.reserve0, amount_out), add(self.reserve1, amount_in)
+
+    def _average_reserves(
+        self, start: Observation, end: Observation
+    ) -> Tuple[int, int]:
+        time_elapsed = end.timestamp - start.timestamp
+        return (
+            div(end.reserve0_cumulative - start.reserve0_cumulative, time_elapsed),
+            div(end.reserve1_cumulative - start.reserve1_cumulative, time_elapsed),
+        )
+
+    def _get_amount_out(
+        self, amount_in: int, token_in: str, reserve0: int, reserve1: int
+    ) -> int:
+        is_token0 = token_in == self.token0
+        if not self.stable:
+            reserve_a, reserve_b = (
+                (reserve0, reserve1) if is_token0 else (reserve1, reserve0)
+            )
+            return div(mul(amount_in, reserve_b), add(reserve_a, amount_in))
+
+        xy = self._k(reserve0, reserve1)
+        reserve0 = div(mul(reserve0, DECIMALS), self.decimals0)
+        reserve1 = div(mul(reserve1, DECIMALS), self.decimals1)
+        reserve_a, reserve_b = (
+            (reserve0, reserve1) if is_token0 else (reserve1, reserve0)
+        )
+        decimals_in, decimals_out = (
+            (self.decimals0, self.decimals1)
+            if is_token0
+            else (self.decimals1, self.decimals0)
+        )
+        amount_in = div(mul(amount_in, DECIMALS), decimals_in)
+        y = sub(reserve_b, self._get_y(add(amount_in, reserve_a), xy, reserve_b))
+        return div(mul(y, decimals_out), DECIMALS)
+
+    def _k(self, x: int, y: int) -> int:
+        if not self.stable:
+            return mul(x, y)
+        x = div(mul(x, DECIMALS), self.decimals0)
+        y = div(mul(y, DECIMALS), self.decimals1)
+        return f(x, y)
+
+    def _get_y(self, x0: int, xy: int, y: int) -> int:
+        # same as our oracle's get_y, except Pool.sol checks y + 1 with _k, which normalizes by decimals again
+        for _ in range(255):
+            k = f(x0, y)
+            if k < xy:
+                dy = div(mul(sub(xy, k), DECIMALS), d(x0, y))
+                if dy == 0:
+                    if self._k(x0, add(y, 1)) > xy:
+                        return add(y, 1)
+                    dy = 1
+                y = add(y, dy)
+            else:
+                dy = div(mul(sub(k, xy), DECIMALS), d(x0, y))
+                if dy == 0:
+                    if k == xy or f(x0, sub(y, 1)) < xy:
+                        return y
+                    dy = 1
+                y = sub(y, dy)
+        raise Revert("!y")
+
+
+class SimulatedOracle:
+    """
+    Our pessimistic oracle pricing a single SimulatedPool.
+
+    Pass a Chainlink price (8 decimals) for each token with a feed and None for the other, which is then priced with
+    our TWAP. Days follow the pool's clock.
+    """
+
+    def __init__(
+        self,
+        pool: SimulatedPool,
+        feed_price0: Optional[int],
+        feed_price1: Optional[int],
+        points: int = DEFAULT_POINTS,
+        use_cumulative_twap: bool = False,
+        use_adjusted_pricing: bool = True,
+        window_days: int = 2,
+        upper_bound: int = 0,
+        lower_bound: int = 0,
+    ):
+        self.pool = pool
+        self.feed_price0 = feed_price0
+        self.feed_price1 = feed_price1
+        self.points = points
+        self.use_cumulative_twap = use_cumulative_twap
+        self.use_adjusted_pricing = use_adjusted_pricing
+        self.window_days = window_days
+        self.upper_bound = upper_bound
+        self.lower_bound = lower_bound
+        self.lows = DailyLows()
+
+    def twap_quote(self) -> Optional[int]:
+        """Amount of our TWAP-priced token we get for one of our feed-priced token, None if both have feeds."""
+        pool = self.pool
+        if self.feed_price0 is not None and self.feed_price1 is not None:
+            return None
+        token, one_token = (
+            (pool.token0, pool.decimals0)
+            if self.feed_price0 is not None
+            else (pool.token1, pool.decimals1)
+        )
+        if self.use_cumulative_twap:
+            observations = pool.observations
+            return get_cumulative_twap_price(
+                pool.snapshot(),
+                token,
+                one_token,
+                _as_tuple(observations[-1 - self.points]),
+                _as_tuple(observations[-1]),
+            )
+        return pool.quote(token, one_token, self.points)
+
+    def token_prices(self) -> Tuple[int, int]:
+        """getTokenPrices(), in 8 decimals."""
+        return token_prices(
+            self.pool.snapshot(), self.feed_price0, self.feed_price1, self.twap_quote()
+        )
+
+    def fair_price(self) -> int:
+        """getFairReservesPrice()."""
+        return fair_reserves_price(self.pool.snapshot(), *self.token_prices())
+
+    def adjusted_price(self) -> int:
+        """Our pessimistic price, whether or not we're using adjusted pricing."""
+        return self.lows.adjusted_price(
+            self.pool.day,
+            self.fair_price(),
+            self.window_days,
+            self.upper_bound,
+            self.lower_bound,
+        )
+
+    def current_price(self) -> int:
+        """getCurrentPoolPrice()."""
+        if self.use_adjusted_pricing:
+            return self.adjusted_price()
+        return self.fair_price()
+
+    def update_price(self) -> int:
+        """updatePrice(), returning our stored low for today."""
+        return self.lows.record(self.pool.day, self.fair_price())
+
+    def spot_price(self) -> int:
+        """LP value at the pool's current reserves, using our token prices (including any TWAP-priced token)."""
+        return self.pool.spot_price(*self.token_prices())
+
+
+def _as_tuple(observation: Observation) -> Tuple[int, int, int]:
+    return (
+        observation.timestamp,
+        observation.reserve0_cumulative,
+        observation.reserve1_cumulative,
+    )
@@ -0,0 +1,424 @@
+"""
+Sweep manipulation scenarios across every pool configuration, using all of our cores.
+
+Each scenario is one of our fork tests' manipulations: fix the TWAP with a fresh observation, swap a multiple of the
+pool's TVL into it, then checkpoint the pool (with a keeper updating our lows) every cadence seconds. We track how far
+the fair reserves price, the TWAP-priced token and the pessimistic price stray from spot (the pool's current reserves at
+true token prices), and report the largest deviation of each as a table, and optionally a CSV and a heatmap.
+
+    python -m oracle_model.sweep --ratios 0.1,1,3 --points 4,24 --heatmap sweep.png
+
+Heatmaps need matplotlib.
+"""
+
+import argparse
+import csv
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .fixed_point import Revert
+from .oracle import DECIMALS, PRICE_DECIMALS
+from .simulator import ONE_DAY, PERIOD_SIZE, SimulatedOracle, SimulatedPool
+
+# defaults, covering what our fork tests probe one at a time
+DEFAULT_TVL = 2_500_000
+DEFAULT_RATIOS = (0.01, 0.1, 0.5, 1, 3)
+DEFAULT_CADENCES = (1, 900, 1800, 3600)
+DEFAULT_POINTS = (2, 4, 8, 24)
+DEFAULT_CHECKPOINTS = 5
+
+METRICS = ("fair", "twap", "pessimistic")
+
+# our scenarios start at noon UTC, well clear of a day boundary
+_START = 20_000 * ONE_DAY + ONE_DAY // 2
+
+# LP supply doesn't change deviations, this just keeps LP prices sensible
+_TOTAL_SUPPLY = 1_000 * DECIMALS
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """
+    A kind of pool to sweep. twap_token is the token priced with our TWAP (None if both have feeds), and price0 and
+    price1 are true token prices (8 decimals).
+    """
+
+    name: str
+    stable: bool
+    decimals1: int
+    twap_token: Optional[str]
+    price0: int
+    price1: int
+
+    def pool(self, tvl: int, timestamp: int = _START) -> SimulatedPool:
+        """A fresh pool holding tvl dollars, split evenly at our true prices."""
+        half = tvl * 10**PRICE_DECIMALS // 2
+        return SimulatedPool(
+            half * DECIMALS // self.price0,
+            half * self.decimals1 // self.price1,
+            decimals1=self.decimals1,
+            stable=self.stable,
+            total_supply=_TOTAL_SUPPLY,
+            timestamp=timestamp,
+        )
+
+    def feed_prices(self) -> Tuple[Optional[int], Optional[int]]:
+        return (
+            None if self.twap_token == "token0" else self.price0,
+            None if self.twap_token == "token1" else self.price1,
+        )
+
+
+def _pool_configs() -> List[PoolConfig]:
+    configs = []
+    for stable in [False, True]:
+        for decimals1 in [10**18, 10**6]:
+            for twap_token in ["token0", "token1", None]:
+                configs.append(
+                    PoolConfig(
+                        name="{} 18/{} {}".format(
+                            "sAMM" if stable else "vAMM",
+                            len(str(decimals1)) - 1,
+                            f"{twap_token} TWAP" if twap_token else "chainlink",
+                        ),
+                        stable=stable,
+                        decimals1=decimals1,
+                        twap_token=twap_token,
+                        # think WETH-USDC for volatile pools and DAI-USDC for stable ones
+                        price0=10**PRICE_DECIMALS if stable else 3_000 * 10**8,
+                        price1=10**PRICE_DECIMALS,
+                    )
+                )
+    return configs
+
+
+POOL_CONFIGS = _pool_configs()
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One manipulation, priced with each of points. sell is the token we swap into the pool."""
+
+    config: PoolConfig
+    sell: str
+    swap_ratio: float
+    cadence: int
+    points: Tuple[int, ...]
+    checkpoints: int = DEFAULT_CHECKPOINTS
+    tvl: int = DEFAULT_TVL
+    use_cumulative_twap: bool = False
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    """
+    Largest (signed) relative deviation from spot of each of our prices over a scenario, eg 0.05 for 5% over spot.
+
+    Deviations are nan when the oracle (or the swap) reverted, with error saying why. twap is the deviation of our
+    TWAP-priced token from its true price, zero when both tokens have feeds.
+    """
+
+    pool: str
+    sell: str
+    swap_ratio: float
+    cadence: int
+    points: int
+    fair: float
+    twap: float
+    pessimistic: float
+    error: str = ""
+
+
+def run_scenario(scenario: Scenario) -> List[SweepResult]:
+    """Play out scenario, returning a result for each of its points."""
+    config = scenario.config
+    pool = config.pool(scenario.tvl)
+    pool.seed_observations(max(scenario.points) + 1)
+    feed_price0, feed_price1 = config.feed_prices()
+    oracles = [
+        SimulatedOracle(
+            pool,
+            feed_price0,
+            feed_price1,
+            points=points,
+            use_cumulative_twap=scenario.use_cumulative_twap,
+        )
+        for points in scenario.points
+    ]
+    worst = [dict.fromkeys(METRICS, 0.0) for _ in oracles]
+    errors = [""] * len(oracles)
+
+    def observe(update: bool) -> None:
+        spot = pool.spot_price(config.price0, config.price1)
+        for i, oracle in enumerate(oracles):
+            if errors[i]:
+                continue
+            try:
+                if update:
+                    oracle.update_price()
+                deviations = _deviations(config, oracle, spot)
+            except Revert as revert:
+                errors[i] = str(revert)
+                continue
+            for metric, deviation in deviations.items():
+                if abs(deviation) > abs(worst[i][metric]):
+                    worst[i][metric] = deviation
+
+    # fix our TWAP with a fresh observation, as our keeper records today's lows
+    pool.sleep(PERIOD_SIZE + 1)
+    pool.sync()
+    observe(update=True)
+
+    price_in = config.price0 if scenario.sell == "token0" else config.price1
+    decimals_in = DECIMALS if scenario.sell == "token0" else config.decimals1
+    amount_in = (
+        round(scenario.swap_ratio * scenario.tvl * 10**PRICE_DECIMALS)
+        * decimals_in
+        // price_in
+    )
+    try:
+        pool.sleep(1)
+        pool.swap(scenario.sell, amount_in)
+    except Revert as revert:
+        errors = [f"swap: {revert}"] * len(oracles)
+    else:
+        observe(update=False)
+        for _ in range(scenario.checkpoints):
+            pool.sleep(scenario.cadence)
+            pool.sync()
+            observe(update=True)
+
+    return [
+        SweepResult(
+            pool=config.name,
+            sell=scenario.sell,
+            swap_ratio=scenario.swap_ratio,
+            cadence=scenario.cadence,
+            points=points,
+            **(dict.fromkeys(METRICS, math.nan) if error else deviations),
+            error=error,
+        )
+        for points, deviations, error in zip(scenario.points, worst, errors)
+    ]
+
+
+def _deviations(config: PoolConfig, oracle: SimulatedOracle, spot: int) -> dict:
+    fair = oracle.fair_price()
+    twap = 0.0
+    if config.twap_token is not None:
+        prices = oracle.token_prices()
+        if config.twap_token == "token0":
+            twap = prices[0] / config.price0 - 1
+        else:
+            twap = prices[1] / config.price1 - 1
+    return {
+        "fair": fair / spot - 1,
+        "twap": twap,
+        "pessimistic": oracle.adjusted_price() / spot - 1,
+    }
+
+
+def scenarios(
+    configs: Iterable[PoolConfig] = POOL_CONFIGS,
+    ratios: Sequence[float] = DEFAULT_RATIOS,
+    cadences: Sequence[int] = DEFAULT_CADENCES,
+    points: Sequence[int] = DEFAULT_POINTS,
+    sells: Sequence[str] = ("token0", "token1"),
+    **kwargs,
+) -> List[Scenario]:
+    """Every combination of our parameters. Any kwargs (checkpoints, tvl, use_cumulative_twap) apply to them all."""
+    return [
+        Scenario(config, sell, ratio, cadence, tuple(points), **kwargs)
+        for config in configs
+        for sell in sells
+        for ratio in ratios
+        for cadence in cadences
+    ]
+
+
+def run_sweep(
+    scenarios: Sequence[Scenario], workers: Optional[int] = None
+) -> List[SweepResult]:
+    """Run our scenarios on workers processes (all of our cores by default), keeping their order."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        batches = map(run_scenario, scenarios)
+        return [result for batch in batches for result in batch]
+
+    chunksize = max(1, len(scenarios) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batches = executor.map(run_scenario, scenarios, chunksize=chunksize)
+        return [result for batch in batches for result in batch]
+
+
+################################################## REPORTING ##################################################
+
+
+def format_table(results: Sequence[SweepResult]) -> str:
+    """Our results as an aligned plain-text table, with deviations in percent."""
+    headers = ["pool", "sell", "swap/TVL", "cadence", "points", *METRICS, "error"]
+    rows = [
+        [
+            result.pool,
+            result.sell,
+            f"{result.swap_ratio:g}x",
+            f"{result.cadence}s",
+            str(result.points),
+            *[_format_deviation(getattr(result, metric)) for metric in METRICS],
+            result.error,
+        ]
+        for result in results
+    ]
+    widths = [max(len(row[i]) for row in [headers] + rows) for i in range(len(headers))]
+    lines = [
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in [headers] + rows
+    ]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def _format_deviation(deviation: float) -> str:
+    return "-" if math.isnan(deviation) else f"{deviation:+.4%}"
+
+
+def write_csv(results: Sequence[SweepResult], path: str) -> None:
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(
+            file, fieldnames=[field.name for field in fields(SweepResult)]
+        )
+        writer.writeheader()
+        writer.writerows(asdict(result) for result in results)
+
+
+def plot_heatmap(
+    results: Sequence[SweepResult], path: str, metric: str = "pessimistic"
+) -> None:
+    """
+    Save a heatmap of metric for each pool, by swap size and TWAP points.
+
+    Each cell shows the largest deviation over our cadences and swap directions.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    pools = list(dict.fromkeys(result.pool for result in results))
+    ratios = sorted({result.swap_ratio for result in results})
+    points = sorted({result.points for result in results})
+
+    grids = {pool: np.zeros((len(ratios), len(points))) for pool in pools}
+    for result in results:
+        row, column = ratios.index(result.swap_ratio), points.index(result.points)
+        deviation = getattr(result, metric)
+        grid = grids[result.pool]
+        if math.isnan(deviation) or abs(deviation) > abs(grid[row, column]):
+            grid[row, column] = deviation
+
+    # one colour scale for every pool, centered on spot
+    finite = [abs(value) for grid in grids.values() for value in grid.flat]
+    finite = [value for value in finite if math.isfinite(value)]
+    scale = max(finite + [1e-6]) * 100
+
+    columns = min(3, len(pools))
+    rows = math.ceil(len(pools) / columns)
+    figure, axes = plt.subplots(
+        rows,
+        columns,
+        figsize=(4 * columns, 3.2 * rows),
+        squeeze=False,
+        layout="constrained",
+    )
+    for axis in axes.flat[len(pools) :]:
+        axis.set_visible(False)
+    for axis, pool in zip(axes.flat, pools):
+        image = axis.imshow(
+            grids[pool] * 100,
+            cmap="RdBu_r",
+            vmin=-scale,
+            vmax=scale,
+            aspect="auto",
+            origin="lower",
+        )
+        axis.set_title(pool, fontsize=9)
+        axis.set_xticks(range(len(points)), [str(value) for value in points])
+        axis.set_yticks(range(len(ratios)), [f"{value:g}x" for value in ratios])
+        axis.set_xlabel("TWAP points")
+        axis.set_ylabel("swap/TVL")
+    figure.colorbar(image, ax=axes, label=f"{metric} deviation from spot (%)")
+    figure.savefig(path, dpi=120)
+    plt.close(figure)
+
+
+################################################## CLI ##################################################
+
+
+def _list_of(cast):
+    return lambda value: [cast(item) for item in value.split(",") if item]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m oracle_model.sweep",
+        description="Sweep manipulation scenarios against our oracle model.",
+    )
+    parser.add_argument("--ratios", type=_list_of(float), default=DEFAULT_RATIOS)
+    parser.add_argument(
+        "--cadences",
+        type=_list_of(int),
+        default=DEFAULT_CADENCES,
+        help="seconds between checkpoints after our swap",
+    )
+    parser.add_argument("--points", type=_list_of(int), default=DEFAULT_POINTS)
+    parser.add_argument("--checkpoints", type=int, default=DEFAULT_CHECKPOINTS)
+    parser.add_argument("--tvl", type=int, default=DEFAULT_TVL, help="in dollars")
+    parser.add_argument(
+        "--pools",
+        type=_list_of(str),
+        help="only sweep pools whose names contain one of these, eg sAMM,18/6",
+    )
+    parser.add_argument("--cumulative", action="store_true", help="cumulative TWAPs")
+    parser.add_argument("--workers", type=int, help="defaults to all of our cores")
+    parser.add_argument("--csv", help="also write our results here")
+    parser.add_argument("--heatmap", help="save a heatmap (png) here")
+    parser.add_argument("--metric", choices=METRICS, default="pessimistic")
+    args = parser.parse_args(argv)
+
+    if args.heatmap:
+        try:
+            import matplotlib  # noqa: F401
+        except ImportError:
+            parser.error("--heatmap needs matplotlib")
+
+    configs = [
+        config
+        for config in POOL_CONFIGS
+        if not args.pools or any(name in config.name for name in args.pools)
+    ]
+    results = run_sweep(
+        scenarios(
+            configs,
+            args.ratios,
+            args.cadences,
+            args.points,
+            checkpoints=args.checkpoints,
+            tvl=args.tvl,
+            use_cumulative_twap=args.cumulative,
+        ),
+        args.workers,
+    )
+
+    print(format_table(results))
+    if args.csv:
+        write_csv(results, args.csv)
+    if args.heatmap:
+        plot_heatmap(results, args.heatmap, args.metric)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+NumPy engine for pricing large batches of pool scenarios at once.
+
+Prices come from float64 versions of the oracle's fair reserves formulas, which agree with the contract to within
+a few units of the last (8th) decimal. Comparisons against a threshold, where those last units matter, fall back to
+our exact integer model for any scenario too close to call.
+"""
+
+import operator
+from typing import Optional
+
+import numpy as np
+
+from .fixed_point import Revert
+from .oracle import DECIMALS, PRICE_DECIMALS, PoolSnapshot, fair_reserves_price
+
+# how close (relative and absolute, in 8 decimals) a float price must be to a threshold before we check it exactly,
+#  on top of the error bound from relative_errors()
+DEFAULT_RTOL = 1e-12
+DEFAULT_ATOL = 4
+
+# safety factor on our error bounds, and how large an intermediate value may get before we worry about overflow
+_ERROR_MARGIN = 4
+_OVERFLOW = 2.0**250
+
+
+class ScenarioBatch:
+    """
+    A batch of (reserve0, reserve1, price0, price1, total_supply) scenarios for one pool, or many pools of one type.
+
+    Inputs use the oracle's raw units (token decimals for reserves, 8 decimals for prices, 18 for supply) and
+    broadcast against each other, so scalars may be mixed with arrays. Use object arrays of python ints for values too
+    large for int64; floats are fine too, and are rounded to integers when checked exactly.
+    """
+
+    def __init__(
+        self,
+        reserve0,
+        reserve1,
+        price0,
+        price1,
+        total_supply,
+        stable: bool,
+        decimals0: int = DECIMALS,
+        decimals1: int = DECIMALS,
+    ):
+        self.reserve0, self.reserve1, self.price0, self.price1, self.total_supply = (
+            np.broadcast_arrays(
+                *[
+                    np.asarray(value)
+                    for value in [reserve0, reserve1, price0, price1, total_supply]
+                ]
+            )
+        )
+        self.stable = stable
+        self.decimals0 = decimals0
+        self.decimals1 = decimals1
+
+    def __len__(self) -> int:
+        return self.reserve0.size
+
+    def fair_prices(self) -> np.ndarray:
+        """Fair reserves price of one LP token for every scenario, in 8 decimals as float64."""
+        x, y, p0, p1, supply = self._float_inputs()
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            if self.stable:
+                # fair reserves for x^3 * y + y^3 * x = k
+                k = x * y * (x * x + y * y)
+                fair = k * (p0 * p1) ** 3 / (p0 * p0 + p1 * p1)
+                prices = 2 * np.sqrt(np.sqrt(fair)) / supply
+            else:
+                prices = 2 * np.sqrt(x) * np.sqrt(y) * np.sqrt(p0 * p1) / supply
+        return prices * 10**PRICE_DECIMALS
+
+    def relative_errors(self) -> np.ndarray:
+        """
+        Upper bound on how far (relatively) each float price may be from the oracle's, on top of a few units lost to
+        its final rounding. This is inf where the oracle may overflow.
+
+        The oracle truncates each of its intermediate values to an integer, so the error each adds is one over its
+        size. This is negligible for typical pools, but not for dust reserves or very cheap tokens.
+        """
+        x, y, p0, p1, supply = self._float_inputs()
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            if self.stable:
+                # k, our cubed and squared prices, and their product, all in 18 decimals
+                k = x * y * (x * x + y * y) * 1e18
+                a = p0**3 * 1e18
+                b = p1**3 * 1e18
+                ab = a * b / 1e18
+                cd = (p0 * p0 + p1 * p1) * 1e18
+                # each rpow is off by up to one plus half its input (in whole units), which mulWadDown then scales
+                errors = (
+                    (x + y + 2 * x * y + 2) / k
+                    + (1 + p0) / a
+                    + (1 + p1) / b
+                    + 1 / ab
+                    + 2 / cd
+                    + cd / (k * ab)
+                )
+                # rpow's cubes and the products we take before dividing
+                cubed = np.maximum(x, y) ** 3 * 1e54
+                largest = np.maximum.reduce(
+                    [
+                        cubed,
+                        cubed * np.minimum(x, y) / 1e18,
+                        a * b,
+                        k * ab,
+                        k * ab / cd * 1e18,
+                    ]
+                )
+            else:
+                # sqrt(k) in 18 decimals and sqrt(p0 * p1) in 16
+                k = np.sqrt(x * y) * 1e18
+                p = np.sqrt(p0 * p1) * 1e16
+                errors = 1 / k + 1 / p
+                largest = np.maximum.reduce([k * k, p * p, 2 * p * k, supply * 1e26])
+
+            # normalizing our reserves to 18 decimals
+            largest = np.maximum.reduce(
+                [largest, x * self.decimals0 * 1e18, y * self.decimals1 * 1e18]
+            )
+            errors = _ERROR_MARGIN * errors + 4 * np.finfo(np.float64).eps
+        return np.where(np.isfinite(errors) & (largest < _OVERFLOW), errors, np.inf)
+
+    def _float_inputs(self):
+        # work in whole tokens and dollars. round first, as the oracle only sees integers.
+        return (
+            _as_rounded_float(self.reserve0) / self.decimals0,
+            _as_rounded_float(self.reserve1) / self.decimals1,
+            _as_rounded_float(self.price0) / 10**PRICE_DECIMALS,
+            _as_rounded_float(self.price1) / 10**PRICE_DECIMALS,
+            _as_rounded_float(self.total_supply) / DECIMALS,
+        )
+
+    def exact_fair_prices(self, indices=None) -> np.ndarray:
+        """
+        Fair reserves prices exactly as the oracle computes them, as an object array of python ints.
+
+        Scenarios where the oracle would revert are None. Pass indices to only price some of our scenarios.
+        """
+        flat = [
+            values.reshape(-1)
+            for values in [
+                self.reserve0,
+                self.reserve1,
+                self.price0,
+                self.price1,
+                self.total_supply,
+            ]
+        ]
+        if indices is None:
+            indices = range(len(self))
+
+        prices = []
+        for i in indices:
+            reserve0, reserve1, price0, price1, total_supply = [
+                _as_int(values[i]) for values in flat
+            ]
+            snapshot = PoolSnapshot(
+                decimals0=self.decimals0,
+                decimals1=self.decimals1,
+                reserve0=reserve0,
+                reserve1=reserve1,
+                total_supply=total_supply,
+                stable=self.stable,
+            )
+            try:
+                prices.append(fair_reserves_price(snapshot, price0, price1))
+            except Revert:
+                prices.append(None)
+
+        result = np.empty(len(prices), dtype=object)
+        result[:] = prices
+        return result
+
+    def below(
+        self,
+        threshold,
+        prices: Optional[np.ndarray] = None,
+        rtol: float = DEFAULT_RTOL,
+        atol: float = DEFAULT_ATOL,
+    ) -> np.ndarray:
+        """
+        Whether the oracle's fair price for each scenario is strictly below threshold (8 decimals).
+
+        Float prices decide every scenario that is clear of threshold by more than rtol/atol plus our error bound (see
+        relative_errors), and the rest are priced exactly.
+        Scenarios where the oracle would revert are never below. Pass prices if fair_prices() was already called.
+        """
+        return self._compare(threshold, prices, rtol, atol, operator.lt)
+
+    def above(
+        self,
+        threshold,
+        prices: Optional[np.ndarray] = None,
+        rtol: float = DEFAULT_RTOL,
+        atol: float = DEFAULT_ATOL,
+    ) -> np.ndarray:
+        """Whether the oracle's fair price for each scenario is strictly above threshold, see below."""
+        return self._compare(threshold, prices, rtol, atol, operator.gt)
+
+    def _compare(self, threshold, prices, rtol, atol, compare) -> np.ndarray:
+        if prices is None:
+            prices = self.fair_prices()
+        flat_prices = prices.reshape(-1)
+        thresholds = np.broadcast_to(
+            np.asarray(threshold, dtype=object), prices.shape
+        ).reshape(-1)
+        float_thresholds = _as_float(thresholds)
+        result = compare(flat_prices, float_thresholds)
+
+        # anything near our threshold (or that didn't price cleanly) gets checked with integers
+        with np.errstate(invalid="ignore"):
+            tolerance = (
+                atol
+                + rtol * np.abs(float_thresholds)
+                + self.relative_errors().reshape(-1) * np.abs(flat_prices)
+            )
+            close = ~(np.abs(flat_prices - float_thresholds) > tolerance)
+        indices = np.flatnonzero(close)
+        for i, price in zip(indices, self.exact_fair_prices(indices)):
+            result[i] = price is not None and compare(price, _as_int(thresholds[i]))
+        return result.reshape(prices.shape)
+
+
+def _as_float(values: np.ndarray) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _as_rounded_float(values: np.ndarray) -> np.ndarray:
+    return np.rint(_as_float(values))
+
+
+def _as_int(value) -> int:
+    # round floats to the nearest integer, python ints pass straight through
+    if isinstance(value, (float, np.floating)):
+        return int(round(value))
+    return int(value)
@@ -0,0 +1,112 @@
+import math
+import random
+
+import pytest
+
+import oracle_model
+from oracle_model import fixed_point
+from oracle_model.fixed_point import Panic, Revert, UINT256_MAX
+
+# NOTE: these only check our model against python and don't need a chain, see test_model_oracle.py for tests
+#  comparing it against a freshly deployed oracle on our fork
+
+
+def test_model_sqrt():
+    values = [0, 1, 2, 3, 4, 255, 256, 257, 2**128, 2**128 - 1, UINT256_MAX]
+    values += [n * n + delta for n in [3, 2**64, 2**100 + 7] for delta in [-1, 0, 1]]
+    rng = random.Random(0)
+    values += [rng.getrandbits(rng.randint(1, 256)) for _ in range(5_000)]
+
+    for value in values:
+        assert fixed_point.sqrt(value) == math.isqrt(value)
+
+
+def test_model_rpow():
+    rng = random.Random(1)
+    wad = 10**18
+    for _ in range(5_000):
+        x = rng.getrandbits(rng.randint(1, 100))
+        squared = (x * x + wad // 2) // wad
+        assert fixed_point.rpow(x, 2, wad) == squared
+        assert fixed_point.rpow(x, 3, wad) == (x * squared + wad // 2) // wad
+
+    assert fixed_point.rpow(0, 0, wad) == wad
+    assert fixed_point.rpow(0, 3, wad) == 0
+    assert fixed_point.rpow(5 * wad, 0, wad) == wad
+
+    # bare reverts, same as the library's assembly
+    with pytest.raises(Revert) as revert:
+        fixed_point.rpow(2**128, 2, wad)
+    assert revert.value.reason == ""
+    with pytest.raises(Revert):
+        fixed_point.mul_wad_down(2**200, 2**100)
+
+
+def test_model_checked():
+    with pytest.raises(Panic) as panic:
+        fixed_point.mul(2**128, 2**128)
+    assert panic.value.code == fixed_point.PANIC_OVERFLOW
+    with pytest.raises(Panic) as panic:
+        fixed_point.div(1, 0)
+    assert panic.value.code == fixed_point.PANIC_DIVISION_BY_ZERO
+    with pytest.raises(Panic):
+        fixed_point.sub(0, 1)
+    assert fixed_point.add(UINT256_MAX - 1, 1) == UINT256_MAX
+
+
+def test_model_pricing():
+    snapshot = oracle_model.PoolSnapshot(
+        decimals0=10**18,
+        decimals1=10**6,
+        reserve0=1_000 * 10**18,
+        reserve1=3_000_000 * 10**6,
+        total_supply=50_000 * 10**18,
+        stable=False,
+    )
+    # volatile pools at their spot price are worth exactly their reserves
+    price = oracle_model.fair_reserves_price(snapshot, 3_000 * 10**8, 10**8)
+    assert abs(price - 6_000_000 * 10**8 // 50_000) <= 1
+
+    # stable pools at a 1:1 peg as well
+    stable = oracle_model.PoolSnapshot(
+        decimals0=10**18,
+        decimals1=10**6,
+        reserve0=1_000_000 * 10**18,
+        reserve1=1_000_000 * 10**6,
+        total_supply=1_000 * 10**18,
+        stable=True,
+    )
+    price = oracle_model.fair_reserves_price(stable, 10**8, 10**8)
+    assert abs(price - 2_000 * 10**8) <= 2_000
+
+    # token1 priced with our TWAP. note that we lose precision inverting quotes into low-decimal tokens.
+    price0, price1 = oracle_model.token_prices(
+        snapshot, 3_000 * 10**8, None, 3_000 * 10**6
+    )
+    assert (price0, price1) == (3_000 * 10**8, 99_900_000)
+    with pytest.raises(Revert, match="Only Chainlink feeds supported"):
+        oracle_model.token_prices(
+            snapshot, 3_000 * 10**8, None, 1, use_chainlink_only=True
+        )
+    with pytest.raises(Revert, match="At least one token must have CL oracle"):
+        oracle_model.token_prices(snapshot, None, None)
+
+
+def test_model_lows():
+    lows = oracle_model.DailyLows()
+    for day, price in [(10, 105), (10, 100), (10, 110), (11, 120), (13, 130)]:
+        lows.record(day, price)
+    assert lows.low(10) == 100
+    assert lows.updates[10] == 3
+    assert lows.lows(13, 4) == [130, 0, 120, 100]
+
+    assert lows.adjusted_price(13, 140) == 130
+    assert lows.adjusted_price(13, 125) == 125
+    assert lows.adjusted_price(13, 125, window_days=3) == 120
+    assert lows.adjusted_price(13, 140, window_days=4) == 100
+    with pytest.raises(Revert, match="Price below lower bound"):
+        lows.adjusted_price(13, 140, window_days=4, lower_bound=101)
+
+    # large lows round down when packed
+    lows.record(14, 2**60 + 2**10 - 1)
+    assert lows.low(14) == 2**60 + 2**10 - 2**5
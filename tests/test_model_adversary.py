@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from oracle_model import adversary
+from oracle_model.adversary import AttackPlan, Market, Push
+from oracle_model.simulator import ONE_DAY, PERIOD_SIZE
+from oracle_model.sweep import POOL_CONFIGS
+
+VAMM_TWAP = next(
+    config for config in POOL_CONFIGS if config.name == "vAMM 18/6 token0 TWAP"
+)
+HOUR = 3600
+
+# a keeper updating our lows once a day, at noon
+DAILY_KEEPER = Market(VAMM_TWAP, keeper_interval=ONE_DAY, keeper_offset=12 * HOUR)
+
+# hold our TWAP up for our keeper's noon update, then again just after midnight to read. with syncs every 15 minutes,
+#  the pool only records an observation every 45, so our 4 points need three hours.
+DAY_BOUNDARY_PLAN = AttackPlan(
+    (
+        Push(8 * HOUR + PERIOD_SIZE, 4 * HOUR, 0.12),
+        Push(20 * HOUR + PERIOD_SIZE, 4 * HOUR, 0.12),
+    ),
+    read_at=ONE_DAY + 60,
+)
+
+
+def test_adversary_simulate():
+    # without pushes, nothing moves
+    result = adversary.simulate(DAILY_KEEPER, AttackPlan((), read_at=ONE_DAY + 60))
+    assert (result.cost, result.lift, result.swaps) == (0, 0, 0)
+    assert result.window == (0, 0)
+
+    # today's low doesn't count until our keeper updates it, so one update and our read is all we need to push
+    result = adversary.simulate(DAILY_KEEPER, DAY_BOUNDARY_PLAN)
+    assert not result.error
+    assert result.lift > 0.05
+    assert min(result.window) == pytest.approx(result.lift)
+    assert 0 < result.cost < 0.2 * DAILY_KEEPER.tvl
+
+    # but our TWAP has to be up when we read too
+    plan = AttackPlan(DAY_BOUNDARY_PLAN.pushes[:1], DAY_BOUNDARY_PLAN.read_at)
+    assert adversary.simulate(DAILY_KEEPER, plan).lift == pytest.approx(0, abs=1e-8)
+
+    # holding our push over the whole day costs a lot more
+    plan = AttackPlan((Push(8 * HOUR, 16 * HOUR + 120, 0.12),), ONE_DAY + 60)
+    result = adversary.simulate(DAILY_KEEPER, plan)
+    assert result.lift > 0.05
+    assert result.cost > 2 * adversary.simulate(DAILY_KEEPER, DAY_BOUNDARY_PLAN).cost
+
+    # as does a keeper updating every hour, which pushes must hold through for our whole window
+    hourly = Market(VAMM_TWAP, keeper_interval=HOUR)
+    assert adversary.simulate(hourly, DAY_BOUNDARY_PLAN).lift < 0.05
+
+    # and arbitrageurs make holding a push expensive
+    no_arbs = Market(
+        VAMM_TWAP, keeper_interval=ONE_DAY, keeper_offset=12 * HOUR, arb_interval=0
+    )
+    result = adversary.simulate(no_arbs, DAY_BOUNDARY_PLAN)
+    assert result.lift > 0.05
+    # in, out, and back in for our read
+    assert result.swaps == 3
+    assert result.cost < adversary.simulate(DAILY_KEEPER, DAY_BOUNDARY_PLAN).cost / 5
+
+    with pytest.raises(ValueError, match="no TWAP-priced token"):
+        Market(next(config for config in POOL_CONFIGS if not config.twap_token))
+
+
+def test_adversary_mutations():
+    rng = random.Random(0)
+    plan = adversary.random_plan(rng, DAILY_KEEPER, 0.05)
+    for _ in range(2_000):
+        plan = adversary.mutate(rng, DAILY_KEEPER, plan, 0.05)
+        assert 1 <= len(plan.pushes) <= adversary.DEFAULT_MAX_PUSHES
+        assert 0 <= plan.read_at <= DAILY_KEEPER.horizon
+        for push in plan.pushes:
+            assert 0 <= push.start <= DAILY_KEEPER.horizon
+            assert push.duration >= 1
+            assert push.lift >= 0
+
+
+def test_adversary_search():
+    # our search finds its own way around the day boundary, cheaper than ours
+    result = adversary.search(DAILY_KEEPER, 0.05, iterations=30, seed=1)
+    assert result.lift >= 0.05
+    assert result.cost < adversary.simulate(DAILY_KEEPER, DAY_BOUNDARY_PLAN).cost
+    assert result.plan.read_at % ONE_DAY < 12 * HOUR
+
+    # running searches in parallel just keeps the best of them
+    best = adversary.find_cheapest_attack(
+        DAILY_KEEPER, 0.05, searches=2, workers=2, iterations=2, seed=3
+    )
+    results = [
+        adversary.search(DAILY_KEEPER, 0.05, iterations=2, seed=seed) for seed in [3, 4]
+    ]
+    assert best in results
+    assert all(
+        adversary._score(best, 0.05) <= adversary._score(result, 0.05)
+        for result in results
+    )
+
+
+def test_adversary_cli(capsys):
+    adversary.main(
+        [
+            "--pool",
+            "vAMM 18/6 token0 TWAP",
+            "--lift",
+            "0.05",
+            "--keeper-interval",
+            str(ONE_DAY),
+            "--iterations",
+            "1",
+            "--workers",
+            "1",
+        ]
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("best attack")
+    assert lines[-1].startswith("  read at day ")
+
+
+def test_adversary_keeper_schedule():
+    # our keeper's schedule starts over each midnight, even when its interval doesn't divide a day
+    market = Market(VAMM_TWAP, keeper_interval=7 * HOUR, keeper_offset=HOUR)
+    times = list(market.keeper_times(2 * ONE_DAY))
+    assert [time / HOUR for time in times] == [1, 8, 15, 22, 25, 32, 39, 46]
+    assert list(DAILY_KEEPER.keeper_times(3 * ONE_DAY)) == [
+        day * ONE_DAY + 12 * HOUR for day in range(3)
+    ]
+    assert list(market.keeper_times(ONE_DAY + HOUR)) == times[:4]
+
+    with pytest.raises(ValueError, match="keeper_offset"):
+        Market(VAMM_TWAP, keeper_offset=ONE_DAY)
@@ -0,0 +1,125 @@
+from brownie import chain, interface, ZERO_ADDRESS
+
+import oracle_model
+from oracle_model import fixed_point
+
+# differential tests: our off-chain model should match the deployed oracle exactly
+
+
+def _model_snapshot(pool):
+    decimals0, decimals1, reserve0, reserve1, stable, token0, token1 = pool.metadata()
+    return oracle_model.PoolSnapshot(
+        decimals0=decimals0,
+        decimals1=decimals1,
+        reserve0=reserve0,
+        reserve1=reserve1,
+        total_supply=pool.totalSupply(),
+        stable=stable,
+        token0=token0,
+        token1=token1,
+    )
+
+
+def _model_fair_price(oracle, pool):
+    snapshot = _model_snapshot(pool)
+    feed_prices = [
+        (
+            oracle.getChainlinkPrice(token)
+            if oracle.feeds(token)[0] != ZERO_ADDRESS
+            else None
+        )
+        for token in [snapshot.token0, snapshot.token1]
+    ]
+
+    # the token with a feed is the one we swap in for our TWAP
+    twap_quote = None
+    if feed_prices[1] is None:
+        twap_quote = oracle.getTwapPrice(pool, snapshot.token0, snapshot.decimals0)
+    elif feed_prices[0] is None:
+        twap_quote = oracle.getTwapPrice(pool, snapshot.token1, snapshot.decimals1)
+
+    prices = oracle_model.token_prices(snapshot, *feed_prices, twap_quote)
+    return snapshot, prices, oracle_model.fair_reserves_price(snapshot, *prices)
+
+
+def test_model_matches_oracle(
+    gov,
+    oracle,
+):
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",  # OP-USDC (vAMM, both chainlink)
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",  # OP-WETH (vAMM, both chainlink)
+        "0xadBB23Bcc3C1B9810491897cb0690Cf645B858b1",  # tBTC-WETH (vAMM, tBTC is TWAP)
+        "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",  # alETH-WETH (sAMM, alETH is TWAP)
+        "0xB720FBC32d60BB6dcc955Be86b98D8fD3c4bA645",  # DOLA-USDC (sAMM, DOLA is TWAP)
+        "0xf04458f7B21265b80FC340dE7Ee598e24485c5bB",  # LUSD-USDC (sAMM, both chainlink)
+        "0x2B47C794c3789f499D8A54Ec12f949EeCCE8bA16",  # USDT-USDC (sAMM, both chainlink)
+    ]
+
+    for use_cumulative in [False, True]:
+        for address in pools:
+            oracle.setUseCumulativeTwap(address, use_cumulative, {"from": gov})
+            pool = interface.IVeloPoolV2(address)
+            snapshot, prices, fair_price = _model_fair_price(oracle, pool)
+            assert prices == oracle.getTokenPrices(pool)
+            assert fair_price == oracle.getFairReservesPrice(pool)
+
+            # check our intermediate values too
+            breakdown = oracle.getPriceBreakdown(pool)
+            reserve0 = snapshot.reserve0 * 10**18 // snapshot.decimals0
+            reserve1 = snapshot.reserve1 * 10**18 // snapshot.decimals1
+            if snapshot.stable:
+                assert breakdown["k"] == oracle_model.get_k(reserve0, reserve1)
+            else:
+                assert breakdown["k"] == fixed_point.sqrt(reserve0 * reserve1)
+
+    # cumulative TWAPs, straight from our pool's observations
+    for address in pools[2:5]:
+        pool = interface.IVeloPoolV2(address)
+        snapshot = _model_snapshot(pool)
+        last_index = pool.observationLength() - 1
+        start = pool.observations(last_index - oracle.DEFAULT_POINTS())
+        end = pool.observations(last_index)
+        for token, one_token in [
+            (snapshot.token0, snapshot.decimals0),
+            (snapshot.token1, snapshot.decimals1),
+        ]:
+            assert oracle.getTwapPrice(pool, token, one_token) == (
+                oracle_model.get_cumulative_twap_price(
+                    snapshot, token, one_token, start, end
+                )
+            )
+
+
+def test_model_matches_pessimistic_price(
+    gov,
+    oracle,
+):
+    # OP-USDC, using a window longer than our ring buffer
+    pool = interface.IVeloPoolV2("0x0df083de449F75691fc5A36477a6f3284C269108")
+    op = "0x4200000000000000000000000000000000000042"
+    usdc = "0x7F5c764cBc14f9669B88837ca1490cCa17c31607"
+    oracle.setFeeds(
+        [op, usdc],
+        [oracle.feeds(op)[0], oracle.feeds(usdc)[0]],
+        [86400 * 100] * 2,
+        {"from": gov},
+    )
+    oracle.setUseAdjustedPrice(True, False, {"from": gov})
+    oracle.setWindowDays(pool, 5, {"from": gov})
+
+    lows = oracle_model.DailyLows()
+    for i in range(8):
+        day = oracle.currentDay()
+        if i != 3:
+            oracle.updatePrice(pool, {"from": gov})
+            lows.record(day, oracle.getFairReservesPrice(pool))
+            assert oracle.dailyLows(pool, day) == lows.low(day)
+
+        fair_price = _model_fair_price(oracle, pool)[2]
+        assert oracle.getCurrentPoolPrice(pool) == lows.adjusted_price(
+            day, fair_price, 5
+        )
+
+        chain.sleep(86400)
+        chain.mine(1)
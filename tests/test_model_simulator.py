@@ -0,0 +1,155 @@
+import pytest
+
+from oracle_model import fair_reserves_price
+from oracle_model.fixed_point import Revert
+from oracle_model.simulator import PERIOD_SIZE, SimulatedOracle, SimulatedPool
+
+# 2025-10-04 00:00 UTC
+START = 20_365 * 86400
+
+
+def test_simulator_swaps():
+    # volatile pools charge 0.3% and keep x * y constant, with the fee leaving the pool
+    pool = SimulatedPool(1_000 * 10**18, 3_000_000 * 10**6, decimals1=10**6)
+    amount_in = 10 * 10**18
+    net = amount_in - amount_in * 30 // 10_000
+    expected = net * pool.reserve1 // (pool.reserve0 + net)
+    assert pool.get_amount_out(amount_in, "token0") == expected
+    assert pool.swap("token0", amount_in) == expected
+    assert pool.reserve0 == 1_000 * 10**18 + net
+    assert pool.reserve1 == 3_000_000 * 10**6 - expected
+
+    with pytest.raises(Revert, match="InsufficientOutputAmount"):
+        pool.swap("token1", 10**6, amount_out_min=10**18)
+
+    # stable pools, with mismatched decimals, never lose k in either direction
+    pool = SimulatedPool(
+        1_000_000 * 10**18, 900_000 * 10**6, decimals1=10**6, stable=True
+    )
+    assert pool.fee == 5
+    for token, amount_in in [("token0", 10**22), ("token1", 10**10)]:
+        k = pool._k(pool.reserve0, pool.reserve1)
+        amount_out = pool.swap(token, amount_in)
+        assert pool._k(pool.reserve0, pool.reserve1) >= k
+        # close to 1:1, less fees and a little slippage
+        scale = 10**12 if token == "token0" else 10**-12
+        assert 0.99 < amount_out * scale / amount_in < 1
+
+
+def test_simulator_observations():
+    pool = SimulatedPool(100 * 10**18, 200 * 10**18, timestamp=START)
+
+    # nothing is recorded until more than 30 minutes have passed since our last observation
+    pool.sleep(PERIOD_SIZE)
+    pool.sync()
+    assert len(pool.observations) == 1
+    pool.sleep(1)
+    pool.swap("token0", 10**18)
+    assert len(pool.observations) == 2
+    assert pool.last_observation.timestamp == START + PERIOD_SIZE + 1
+    assert pool.last_observation.reserve0_cumulative == 100 * 10**18 * 1801
+
+    # quotes average each completed window, ignoring anything since our last observation
+    pool.seed_observations(2)
+    reserve0, reserve1 = pool.reserve0, pool.reserve1
+    quote = pool.quote("token0", 10**18, 2)
+    assert quote == 10**18 * reserve1 // (reserve0 + 10**18)
+    pool.swap("token1", 50 * 10**18)
+    assert pool.quote("token0", 10**18, 2) == quote
+    with pytest.raises(Revert):
+        pool.quote("token0", 10**18, 5)
+
+    # the first window after our swap only sees the new reserves for part of its time
+    pool.sleep(PERIOD_SIZE + 1)
+    pool.sync()
+    new_reserve0, new_reserve1 = pool.reserve0, pool.reserve1
+    assert pool.sample("token1", 10**18, 1) == [
+        10**18 * new_reserve0 // (new_reserve1 + 10**18)
+    ]
+
+
+def test_simulator_oracle_pricing():
+    pool = SimulatedPool(
+        1_000 * 10**18,
+        3_000_000 * 10**6,
+        decimals1=10**6,
+        total_supply=50_000 * 10**18,
+        timestamp=START,
+    )
+    pool.seed_observations(4)
+
+    # a TWAP-priced token at its spot price is valued like its feed-priced partner
+    oracle = SimulatedOracle(pool, None, 10**8)
+    price0, price1 = oracle.token_prices()
+    assert price1 == 10**8
+    assert price0 == pytest.approx(3_000 * 10**8, rel=0.004)
+    assert oracle.fair_price() == fair_reserves_price(pool.snapshot(), price0, price1)
+    assert oracle.fair_price() == pytest.approx(oracle.spot_price(), rel=1e-6)
+
+    # cumulative TWAPs over the same observations match our quote
+    cumulative = SimulatedOracle(pool, None, 10**8, use_cumulative_twap=True)
+    assert cumulative.twap_quote() == pool.quote("token1", 10**6, 4)
+
+    # lows stick around for the rest of our window, following the pool's clock
+    oracle.update_price()
+    low = oracle.fair_price()
+    pool.swap("token1", 30_000 * 10**6)
+    pool.seed_observations(4)
+    assert oracle.fair_price() > low
+    assert oracle.current_price() == low
+    oracle.update_price()
+    pool.sleep(86400)
+    assert oracle.lows.low(pool.day - 1) == low
+    assert oracle.current_price() == low
+    pool.sleep(86400)
+    assert oracle.current_price() == oracle.fair_price()
+
+
+def test_simulator_replays_aleth_only():
+    # test_aleth_only on an alETH-WETH (alETH TWAP-priced, stable) pool of roughly the same size, replayed off-chain
+    pool = SimulatedPool(
+        400 * 10**18,
+        300 * 10**18,
+        stable=True,
+        total_supply=350 * 10**18,
+        timestamp=START + 3600,
+        token0="alETH",
+        token1="WETH",
+    )
+    pool.seed_observations(30)
+    oracle = SimulatedOracle(pool, None, 1_800 * 10**8, use_adjusted_pricing=False)
+
+    # fix our TWAP with a tiny swap, so nothing else gets into an observation for the next 30 minutes
+    pool.sleep(1801)
+    pool.swap("alETH", 10**18)
+    price = oracle.current_price()
+    twap_quote = oracle.twap_quote()
+
+    # 4,000 WETH drains the pool's alETH, but our price doesn't move
+    pool.sleep(1)
+    pool.swap("WETH", 4_000 * 10**18)
+    assert pool.reserve0 < 10**18
+    assert oracle.spot_price() > 5 * price
+    assert oracle.current_price() == price
+
+    # nor do small swaps within the same period
+    for _ in range(5):
+        pool.sleep(1)
+        pool.swap("alETH", 10**18)
+    assert oracle.twap_quote() == twap_quote
+    assert oracle.current_price() == price
+
+    # checkpointing a few times brings our manipulated reserves into our TWAP
+    for _ in range(5):
+        pool.sleep(1800)
+        pool.swap("alETH", 10**12)
+    swap_manipulation_price = oracle.current_price()
+    assert swap_manipulation_price != pytest.approx(price, rel=0.0001)
+
+    # which more points dilutes
+    oracle.points = 24
+    window_swap_manipulation_price = oracle.current_price()
+    assert window_swap_manipulation_price != pytest.approx(price, rel=0.001)
+    assert abs(swap_manipulation_price - price) > abs(
+        window_swap_manipulation_price - price
+    )
@@ -0,0 +1,111 @@
+import csv
+import math
+
+import pytest
+
+from oracle_model import sweep
+
+SAMM_TWAP = next(
+    config for config in sweep.POOL_CONFIGS if config.name == "sAMM 18/6 token0 TWAP"
+)
+VAMM_CHAINLINK = next(
+    config for config in sweep.POOL_CONFIGS if config.name == "vAMM 18/18 chainlink"
+)
+
+
+def test_sweep_scenarios():
+    assert len(sweep.POOL_CONFIGS) == 12
+    scenarios = sweep.scenarios(
+        [SAMM_TWAP, VAMM_CHAINLINK], [0.1, 1], [1, 1800], [4, 24], checkpoints=3
+    )
+    assert len(scenarios) == 2 * 2 * 2 * 2
+    results = sweep.run_sweep(scenarios, workers=1)
+    assert len(results) == 2 * len(scenarios)
+
+    # our processes give exactly the same results, in the same order
+    assert sweep.run_sweep(scenarios, workers=2) == results
+
+    by_key = {
+        (result.pool, result.sell, result.swap_ratio, result.cadence, result.points): (
+            result
+        )
+        for result in results
+    }
+    for result in results:
+        assert not result.error
+        # pessimistic prices never beat our fair price
+        assert result.pessimistic <= result.fair + 1e-12
+        if result.pool == VAMM_CHAINLINK.name:
+            assert result.twap == 0
+
+    # nothing reaches our TWAP within a single observation window
+    quick = by_key[(SAMM_TWAP.name, "token1", 1, 1, 4)]
+    assert abs(quick.twap) < 1e-6
+
+    # but checkpointing does, which more points dilutes
+    slow = by_key[(SAMM_TWAP.name, "token1", 1, 1800, 4)]
+    diluted = by_key[(SAMM_TWAP.name, "token1", 1, 1800, 24)]
+    assert slow.twap > 0.5
+    assert 0 < diluted.twap < slow.twap
+
+
+def test_sweep_reverts():
+    # dumping 20,000x TVL into a stable pool drains it, and our oracle can't price the result
+    [result] = sweep.run_scenario(
+        sweep.Scenario(SAMM_TWAP, "token1", 20_000, 1800, (2,))
+    )
+    assert result.error
+    assert all(math.isnan(getattr(result, metric)) for metric in sweep.METRICS)
+    assert "-" in sweep.format_table([result]).splitlines()[-1]
+
+
+def test_sweep_cli(tmp_path, capsys):
+    path = tmp_path / "sweep.csv"
+    sweep.main(
+        [
+            "--ratios",
+            "0.5",
+            "--cadences",
+            "1800",
+            "--points",
+            "4",
+            "--pools",
+            "vAMM 18/18",
+            "--workers",
+            "1",
+            "--csv",
+            str(path),
+        ]
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == [
+        "pool",
+        "sell",
+        "swap/TVL",
+        "cadence",
+        "points",
+        "fair",
+        "twap",
+        "pessimistic",
+        "error",
+    ]
+    # three vAMM 18/18 pools, selling either token
+    assert len(lines) == 2 + 6
+    assert "%" in lines[2]
+
+    with open(path) as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 6
+    assert rows[0]["pool"] == "vAMM 18/18 token0 TWAP"
+    assert float(rows[0]["swap_ratio"]) == 0.5
+
+
+def test_sweep_heatmap(tmp_path):
+    pytest.importorskip("matplotlib")
+    results = sweep.run_sweep(
+        sweep.scenarios([SAMM_TWAP, VAMM_CHAINLINK], [0.1, 1], [1800], [4, 24]),
+        workers=1,
+    )
+    path = tmp_path / "sweep.png"
+    sweep.plot_heatmap(results, str(path), metric="twap")
+    assert path.read_bytes()[:8] == b"\x89PNG\r\n\x1a\n"
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from oracle_model.vectorized import ScenarioBatch
+
+
+def _random_batch(rng, stable, n, decimals1=10**6):
+    # anything from dust to huge pools, with token prices from fractions of a cent to millions of dollars
+    price0 = np.rint(10 ** rng.uniform(0, 15, n))
+    price1 = (
+        np.rint(price0 * 10 ** rng.uniform(-1, 1, n))
+        if stable
+        else np.rint(10 ** rng.uniform(0, 15, n))
+    )
+    return ScenarioBatch(
+        np.rint(10 ** rng.uniform(10, 36, n)),
+        np.rint(10 ** rng.uniform(-6, 15, n) * decimals1),
+        price0,
+        price1,
+        np.rint(10 ** rng.uniform(10, 36, n)),
+        stable=stable,
+        decimals1=decimals1,
+    )
+
+
+@pytest.mark.parametrize("stable", [False, True], ids=["vAMM", "sAMM"])
+def test_vectorized_prices_within_error_bounds(stable):
+    batch = _random_batch(np.random.default_rng(0), stable, 5_000)
+    prices = batch.fair_prices()
+    errors = batch.relative_errors()
+    exact = batch.exact_fair_prices()
+
+    for price, error, exact_price in zip(prices, errors, exact):
+        if exact_price is None:
+            # anything that could revert on chain is flagged
+            assert error == np.inf
+        elif np.isfinite(error):
+            assert abs(price - exact_price) <= 4 + error * price
+
+
+@pytest.mark.parametrize("stable", [False, True], ids=["vAMM", "sAMM"])
+def test_vectorized_comparisons_are_exact(stable):
+    rng = np.random.default_rng(1)
+    batch = _random_batch(rng, stable, 5_000)
+    exact = batch.exact_fair_prices()
+
+    # put our thresholds right on top of the oracle's prices, where float rounding matters most
+    thresholds = np.array(
+        [
+            (price or 0) + int(offset)
+            for price, offset in zip(exact, rng.integers(-3, 4, len(exact)))
+        ],
+        dtype=object,
+    )
+    below = batch.below(thresholds)
+    above = batch.above(thresholds)
+    for price, threshold, is_below, is_above in zip(exact, thresholds, below, above):
+        assert is_below == (price is not None and price < threshold)
+        assert is_above == (price is not None and price > threshold)
+
+
+def test_vectorized_realistic_pools():
+    rng = np.random.default_rng(2)
+    n = 100_000
+
+    # ~$6M WETH-USDC vAMM, perturbing reserves and prices by up to 10%
+    volatile = ScenarioBatch(
+        np.rint(1_000e18 * rng.uniform(0.9, 1.1, n)),
+        np.rint(3_000_000e6 * rng.uniform(0.9, 1.1, n)),
+        np.rint(3_000e8 * rng.uniform(0.9, 1.1, n)),
+        10**8,
+        50_000 * 10**18,
+        stable=False,
+        decimals1=10**6,
+    )
+    # ~$2M DAI-USDC sAMM
+    stable = ScenarioBatch(
+        np.rint(1_000_000e18 * rng.uniform(0.5, 1.5, n)),
+        np.rint(1_000_000e6 * rng.uniform(0.5, 1.5, n)),
+        np.rint(1e8 * rng.uniform(0.98, 1.02, n)),
+        10**8,
+        1_000 * 10**18,
+        stable=True,
+        decimals1=10**6,
+    )
+
+    for batch in [volatile, stable]:
+        prices = batch.fair_prices()
+        assert np.all(batch.relative_errors() < 1e-12)
+
+        sample = rng.choice(n, 500, replace=False)
+        exact = batch.exact_fair_prices(sample).astype(float)
+        assert np.all(np.abs(prices[sample] - exact) <= 4)
+
+
+def test_vectorized_broadcasting_and_reverts():
+    # one reserve array against scalar prices and supply
+    batch = ScenarioBatch(
+        [10**18, 10**20, 10**59], 10**18, 10**8, 10**8, 10**18, stable=True
+    )
+    assert len(batch) == 3
+    prices = batch.fair_prices()
+    assert prices.shape == (3,)
+    assert prices[0] == pytest.approx(2e8)
+
+    # huge reserves overflow on chain, so they're never below or above anything
+    exact = batch.exact_fair_prices()
+    assert exact[0] == 2 * 10**8
+    assert exact[2] is None
+    assert list(batch.below(10**30)) == [True, True, False]
+    assert list(batch.above(0)) == [True, True, False]
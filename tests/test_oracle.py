@@ -1,9 +1,11 @@
 import pytest
-from brownie import accounts, Contract, chain, interface, ZERO_ADDRESS
+import brownie
+from brownie import accounts, Contract, chain, interface, web3, ZERO_ADDRESS
 import time
+import math
 
-# NOTE: Make sure to run these tests in ganache (with an older version of brownie, like 1.19.2) as anvil crashes out
-#  when simulating >75 or so transactions in a fork
+# NOTE: Make sure to run these tests on a fork node that supports the Cancun hardfork, like anvil, as our oracle
+#  memoizes prices in transient storage. Older ganache versions can't run our bytecode at all.
 
 # test under normal circumstances
 def test_normal_oracle(
@@ -191,6 +193,160 @@ def test_normal_oracle_single(
     print("rETH/WETH LP Price:", "${:,.2f}".format(price / 1e8), "\n")
 
 
+# check pricing vAMM and sAMM pools, now that each pool is read once per pricing
+def test_pricing_gas(
+    gov,
+    oracle,
+    PessimisticVeloSingleOracle,
+):
+    # OP-USDC (vAMM) and USDC-DAI (sAMM), both chainlink
+    usdc_feed = "0x16a9FA2FDa030272Ce99B29CF780dFA30361E0f3"
+    pools = [
+        (
+            "0x0df083de449F75691fc5A36477a6f3284C269108",
+            "0x0D276FC14719f9292D5C1eA2198673d1f4269246",
+            usdc_feed,
+        ),
+        (
+            "0x19715771E30c93915A5bbDa134d782b81A820076",
+            usdc_feed,
+            "0x8dba75e83da73cc766a7e5a0ee71f656bab470d6",
+        ),
+    ]
+
+    def pool_calls(tx, pool):
+        return [call for call in tx.subcalls if str(call["to"]).lower() == pool.lower()]
+
+    for pool, feed0, feed1 in pools:
+        # make sure our feeds line up with token ordering in the pool
+        token0 = interface.IVeloPoolV2(pool).token0()
+        if oracle.feeds(token0)["feedAddress"].lower() != feed0.lower():
+            feed0, feed1 = feed1, feed0
+
+        single_oracle = gov.deploy(
+            PessimisticVeloSingleOracle,
+            pool,
+            True,
+            feed0,
+            feed1,
+            864000,
+            864000,
+            4,
+            gov,
+        )
+        single_oracle.setOperator(gov, True, {"from": gov})
+
+        # with both chainlink feeds, every one of our getters (and our single oracle) should agree exactly
+        fair_price = oracle.getFairReservesPrice(pool)
+        assert fair_price > 0
+        assert oracle.getManyPoolPrices([pool], False) == [fair_price]
+        assert oracle.getPriceBreakdown(pool)["fairPrice"] == fair_price
+        assert single_oracle.getCurrentPoolPrice(False) == fair_price
+
+        # each pricing only reads our pool three times: decimals, metadata and supply
+        tx = oracle.getFairReservesPrice.transact(pool, {"from": gov})
+        assert tx.return_value == fair_price
+        assert len(pool_calls(tx, pool)) == 3
+
+        # and updates price it once more, recording exactly what we priced
+        tx = oracle.updatePrice(pool, {"from": gov})
+        assert len(pool_calls(tx, pool)) == 3
+        assert oracle.dailyLows(pool, oracle.currentDay()) == fair_price
+        update_gas = tx.gas_used
+        single_update_gas = single_oracle.updatePrice({"from": gov}).gas_used
+
+        # stay within a fixed budget, and never cost more than twice what our single oracle does
+        pricing_gas = oracle.getManyPoolPrices.estimate_gas([pool], False)
+        single_pricing_gas = single_oracle.getCurrentPoolPrice.estimate_gas(False)
+        assert pricing_gas < 150_000
+        assert update_gas < 200_000
+        assert pricing_gas < 2 * single_pricing_gas
+        assert update_gas < 2 * single_update_gas
+
+
+# single oracles price their non-chainlink token with a TWAP through their pool, make sure it's swapped the right way
+def test_single_oracle_twap_pricing(
+    gov,
+    oracle,
+    PessimisticVeloSingleOracle,
+):
+    weth_feed = "0x13e3Ee699D1909E989722E753853AE30b17e08c5"
+
+    # tBTC-WETH (vAMM), WETH is token0 so we swap it in to price tBTC
+    pool = interface.IVeloPoolV2("0xadBB23Bcc3C1B9810491897cb0690Cf645B858b1")
+    token0, token1 = pool.token0(), pool.token1()
+    assert oracle.feeds(token0)["feedAddress"] == weth_feed
+    assert oracle.feeds(token1)["feedAddress"] == ZERO_ADDRESS
+    single_oracle = gov.deploy(
+        PessimisticVeloSingleOracle,
+        pool,
+        False,
+        weth_feed,
+        ZERO_ADDRESS,
+        864000,
+        864000,
+        4,
+        gov,
+    )
+    assert (single_oracle.token0(), single_oracle.token1()) == (token0, token1)
+
+    # our TWAP should be a quote of token0 in, and agree with our main oracle's pricing
+    assert single_oracle.getTwapPrice(token0, 10**16) == pool.quote(token0, 10**16, 4)
+    assert single_oracle.getTokenPrices() == oracle.getTokenPrices(pool)
+    assert single_oracle.getCurrentPoolPrice(False) == oracle.getFairReservesPrice(pool)
+
+    # alETH-WETH (sAMM), only token1 has a feed. this used to revert on deployment.
+    pool = interface.IVeloPoolV2("0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a")
+    token0, token1 = pool.token0(), pool.token1()
+    assert oracle.feeds(token0)["feedAddress"] == ZERO_ADDRESS
+    assert oracle.feeds(token1)["feedAddress"] == weth_feed
+    single_oracle = gov.deploy(
+        PessimisticVeloSingleOracle,
+        pool,
+        False,
+        ZERO_ADDRESS,
+        weth_feed,
+        864000,
+        864000,
+        4,
+        gov,
+    )
+    assert (single_oracle.token0(), single_oracle.token1()) == (token0, token1)
+    assert single_oracle.token0Feed() == ZERO_ADDRESS
+    assert single_oracle.token1Feed() == weth_feed
+
+    # now we swap in token1 to price token0
+    assert single_oracle.getTwapPrice(token1, 10**16) == pool.quote(token1, 10**16, 4)
+    assert single_oracle.getTokenPrices() == oracle.getTokenPrices(pool)
+    assert single_oracle.getCurrentPoolPrice(False) == oracle.getFairReservesPrice(pool)
+
+    # but we still need at least one feed, and both if we're chainlink only
+    with brownie.reverts("At least one token must have CL oracle"):
+        gov.deploy(
+            PessimisticVeloSingleOracle,
+            pool,
+            False,
+            ZERO_ADDRESS,
+            ZERO_ADDRESS,
+            864000,
+            864000,
+            4,
+            gov,
+        )
+    with brownie.reverts("Only Chainlink feeds supported"):
+        gov.deploy(
+            PessimisticVeloSingleOracle,
+            pool,
+            True,
+            ZERO_ADDRESS,
+            weth_feed,
+            864000,
+            864000,
+            4,
+            gov,
+        )
+
+
 def test_oracle_price_manipulation(
     gov,
     oracle,
@@ -2469,6 +2625,1095 @@ def test_price_update(
     print("alETH-WETH LP Price:", "${:,.2f}".format(price / 1e8), "\n")
 
 
+def test_daily_lows_buffer(
+    gov,
+    oracle,
+):
+    # OP-USDC
+    pool = "0x0df083de449F75691fc5A36477a6f3284C269108"
+    start_day = oracle.currentDay()
+
+    # update a few times per day for five days so older days roll out of our buffer and into the archive
+    for i in range(5):
+        for _ in range(i + 1):
+            tx = oracle.updatePrice(pool, {"from": gov})
+        print("Update gas used, day", i, ":", tx.gas_used)
+        chain.sleep(86400)
+        chain.mine(1)
+
+    # skip a day entirely, then update again
+    chain.sleep(86400)
+    chain.mine(1)
+    oracle.updatePrice(pool, {"from": gov})
+    today = oracle.currentDay()
+    assert today == start_day + 6
+
+    # every day should still be queryable, whether it's in our buffer or archived
+    for i in range(5):
+        day = start_day + i
+        low = oracle.dailyLows(pool, day)
+        print("Day", i, "low:", "${:,.2f}".format(low / 1e8))
+        assert low > 0
+        assert oracle.dailyUpdates(pool, day) == i + 1
+
+    # our skipped day should be empty
+    assert oracle.dailyLows(pool, start_day + 5) == 0
+    assert oracle.dailyUpdates(pool, start_day + 5) == 0
+    assert oracle.dailyUpdates(pool, today) == 1
+
+    # pessimistic pricing should never be above today's low
+    if oracle.useAdjustedPricing():
+        price = oracle.getCurrentPoolPrice(pool)
+        assert price <= oracle.dailyLows(pool, today)
+
+
+def test_many_pool_prices(
+    gov,
+    oracle,
+):
+    # OP-USDC, OP-WETH, WETH-alETH, SNX-USDC, WETH-rETH; lots of shared tokens
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",
+        "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",
+        "0x71d53B5B7141E1ec9A3Fc9Cc48b4766102d14A4A",
+        "0x7e0F65FAB1524dA9E2E5711D160541cf1199912E",
+    ]
+    oracle.updateManyPrices(pools, {"from": gov})
+
+    # batch view should match our single pool views exactly
+    for use_pessimistic in [True, False]:
+        prices = oracle.getManyPoolPrices(pools, use_pessimistic)
+        assert len(prices) == len(pools)
+        for pool, price in zip(pools, prices):
+            if use_pessimistic == oracle.useAdjustedPricing():
+                assert price == oracle.getCurrentPoolPrice(pool)
+            print("LP Price:", "${:,.2f}".format(price / 1e8))
+
+    # each shared feed (and our sequencer) should only be read once for the whole batch, its price and its decimals
+    feeds = {oracle.sequencerUptimeFeed().lower(): 1}
+    for pool in pools:
+        velo_pool = interface.IVeloPoolV2(pool)
+        for token in [velo_pool.token0(), velo_pool.token1()]:
+            feed = oracle.feeds(token)["feedAddress"]
+            if feed != ZERO_ADDRESS:
+                feeds[feed.lower()] = 2
+    assert len(feeds) < 2 * len(pools)
+    tx = oracle.getManyPoolPrices.transact(pools, True, {"from": gov})
+    for feed, reads in feeds.items():
+        calls = [
+            call
+            for call in tx.subcalls
+            if str(call["from"]).lower() == oracle.address.lower()
+            and str(call["to"]).lower() == feed
+        ]
+        assert len(calls) == reads
+
+    # so one batched call should be cheaper than pricing each pool on its own
+    batch_gas = oracle.getManyPoolPrices.estimate_gas(pools, True)
+    single_gas = sum(oracle.getCurrentPoolPrice.estimate_gas(pool) for pool in pools)
+    assert batch_gas < single_gas
+
+
+def test_update_many_prices_gas(
+    gov,
+    oracle,
+):
+    # these all share WETH, USDC or OP, so feed reads should be shared across the batch
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",
+        "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",
+        "0x71d53B5B7141E1ec9A3Fc9Cc48b4766102d14A4A",
+        "0x7e0F65FAB1524dA9E2E5711D160541cf1199912E",
+    ]
+
+    # warm up our storage so we're only comparing the cost of pricing
+    oracle.updateManyPrices(pools, {"from": gov})
+
+    single_gas = 0
+    for pool in pools:
+        tx = oracle.updatePrice(pool, {"from": gov})
+        single_gas += tx.gas_used - 21_000
+
+    # shared feed reads mean keeper cost per pool should fall as batches grow
+    tx = oracle.updateManyPrices(pools, {"from": gov})
+    batch_gas = tx.gas_used - 21_000
+    print("Gas per pool, batched:", batch_gas / len(pools))
+    print("Gas per pool, individual:", single_gas / len(pools))
+    assert batch_gas < single_gas
+
+
+def test_pool_registry(
+    gov,
+    oracle,
+):
+    # OP-USDC (vAMM, both chainlink), alETH-WETH (sAMM, TWAP), USDC-DOLA (sAMM, TWAP, different decimals)
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",
+        "0xB720FBC32d60BB6dcc955Be86b98D8fD3c4bA645",
+    ]
+    unregistered_prices = oracle.getManyPoolPrices(pools, False)
+    unregistered_gas = oracle.getManyPoolPrices.estimate_gas(pools, False)
+
+    # only our operator can register
+    with brownie.reverts():
+        oracle.registerPool(pools[0], {"from": accounts[0]})
+
+    for pool in pools:
+        oracle.registerPool(pool, {"from": gov})
+    assert oracle.registeredPoolsLength() == 3
+    assert oracle.registeredPools(1) == pools[1]
+    info = oracle.poolInfo(pools[2])
+    assert info["index"] == 3
+    assert info["stable"]
+
+    # cached metadata should give us the exact same prices, just cheaper
+    registered_prices = oracle.getManyPoolPrices(pools, False)
+    registered_gas = oracle.getManyPoolPrices.estimate_gas(pools, False)
+    print("Gas unregistered:", unregistered_gas, "registered:", registered_gas)
+    assert registered_prices == unregistered_prices
+    assert registered_gas < unregistered_gas
+
+    # feeds are checked live, so a feed added after registering prices our TWAP token right away
+    usdc = "0x7F5c764cBc14f9669B88837ca1490cCa17c31607"
+    dola = "0x8aE125E8653821E851F12A49F7765db9a9ce7384"
+    usdc_feed = oracle.feeds(usdc)[0]
+    twap_prices = oracle.getTokenPrices(pools[2])
+    oracle.setFeed(dola, usdc_feed, 864000, {"from": gov})
+    usdc_price = oracle.getChainlinkPrice(usdc)
+    assert oracle.getTokenPrices(pools[2]) == (usdc_price, usdc_price)
+    assert oracle.getFairReservesPrice(pools[2]) != registered_prices[2]
+
+    # and removing it puts us back on our TWAP, without reverting
+    oracle.setFeed(dola, ZERO_ADDRESS, 0, {"from": gov})
+    assert oracle.getTokenPrices(pools[2]) == twap_prices
+    assert oracle.getManyPoolPrices(pools, False) == registered_prices
+
+    # removing a pool's only feed stops pricing it
+    oracle.setFeed(usdc, ZERO_ADDRESS, 0, {"from": gov})
+    with brownie.reverts("At least one token must have CL oracle"):
+        oracle.getFairReservesPrice(pools[2])
+    oracle.setFeed(usdc, usdc_feed, 864000, {"from": gov})
+
+    # registering again just refreshes, doesn't add a new entry
+    oracle.registerPool(pools[0], {"from": gov})
+    assert oracle.registeredPoolsLength() == 3
+
+    # our last pool takes the removed pool's index
+    oracle.unregisterPool(pools[0], {"from": gov})
+    assert oracle.registeredPoolsLength() == 2
+    assert oracle.registeredPools(0) == pools[2]
+    assert oracle.poolInfo(pools[2])["index"] == 1
+    assert oracle.poolInfo(pools[0])["index"] == 0
+    with brownie.reverts("!registered"):
+        oracle.unregisterPool(pools[0], {"from": gov})
+
+    # unregistered pools are still priced as before
+    assert oracle.getManyPoolPrices(pools, False) == unregistered_prices
+
+
+def test_cumulative_twap(
+    gov,
+    oracle,
+):
+    # tBTC-WETH (vAMM, tBTC is TWAP) and alETH-WETH (sAMM, alETH is TWAP)
+    pools = {
+        "tBTC-WETH": (
+            "0xadBB23Bcc3C1B9810491897cb0690Cf645B858b1",
+            "0x6c84a8f1c29108F47a79964b5Fe888D4f4D0dE40",
+        ),
+        "alETH-WETH": (
+            "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",
+            "0x3E29D3A9316dAB217754d13b28646B76607c5f04",
+        ),
+    }
+
+    for name, (pool, token) in pools.items():
+        for points in [4, 24, 48]:
+            oracle.setPointsOverride(pool, points, {"from": gov})
+            oracle.setUseCumulativeTwap(pool, False, {"from": gov})
+            quote_price = oracle.getTwapPrice(pool, token, 1e18)
+            quote_gas = oracle.getTwapPrice.estimate_gas(pool, token, 1e18)
+
+            oracle.setUseCumulativeTwap(pool, True, {"from": gov})
+            cumulative_price = oracle.getTwapPrice(pool, token, 1e18)
+            cumulative_gas = oracle.getTwapPrice.estimate_gas(pool, token, 1e18)
+
+            print(name, points, "points")
+            print("Quote TWAP:", quote_price / 1e18, "gas:", quote_gas)
+            print("Cumulative TWAP:", cumulative_price / 1e18, "gas:", cumulative_gas)
+
+            # averaging reserves vs averaging swaps should land very close together
+            assert abs(cumulative_price - quote_price) / quote_price < 0.02
+
+            # our full LP pricing should work with either mode
+            assert oracle.getManyPoolPrices([pool], False)[0] > 0
+
+        # a 24-hour window should cost roughly the same as a 2-hour one
+        oracle.setPointsOverride(pool, 4, {"from": gov})
+        short_gas = oracle.getTwapPrice.estimate_gas(pool, token, 1e18)
+        assert cumulative_gas < short_gas * 1.1
+
+
+def test_try_update_many_prices(
+    gov,
+    oracle,
+):
+    # OP-USDC, WETH-rETH and OP-WETH; drop our WETH heartbeat so any pool priced with WETH reverts as stale
+    op_usdc = "0x0df083de449F75691fc5A36477a6f3284C269108"
+    weth_reth = "0x7e0F65FAB1524dA9E2E5711D160541cf1199912E"
+    op_weth = "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3"
+    pools = [op_usdc, weth_reth, op_weth]
+    weth = "0x4200000000000000000000000000000000000006"
+    weth_feed = "0x13e3Ee699D1909E989722E753853AE30b17e08c5"
+    oracle.setFeed(weth, weth_feed, 1, {"from": gov})
+
+    # the regular batch reverts entirely
+    with brownie.reverts("Price is stale"):
+        oracle.updateManyPrices(pools, {"from": gov})
+
+    # only updatooors can update
+    with brownie.reverts("unauthorized"):
+        oracle.tryUpdateManyPrices(pools, {"from": accounts[0]})
+
+    # our isolated batch keeps going, and tells us which pools failed
+    updated = oracle.tryUpdateManyPrices.call(pools, {"from": gov})
+    tx = oracle.tryUpdateManyPrices(pools, {"from": gov})
+    assert updated == [True, False, False]
+    assert len(tx.events["PriceUpdateFailed"]) == 2
+    assert tx.events["PriceUpdateFailed"][0]["pool"] == weth_reth
+
+    # only OP-USDC should have been recorded
+    day = oracle.currentDay()
+    assert oracle.dailyUpdates(op_usdc, day) == 1
+    assert oracle.dailyUpdates(weth_reth, day) == 0
+    assert oracle.dailyUpdates(op_weth, day) == 0
+
+    # fix our feed and everything goes through
+    oracle.setFeed(weth, weth_feed, 864000, {"from": gov})
+    tx = oracle.tryUpdateManyPrices(pools, {"from": gov})
+    assert tx.return_value == [True, True, True]
+    assert "PriceUpdateFailed" not in tx.events
+
+
+def test_update_all(
+    gov,
+    oracle,
+):
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",
+        "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",
+        "0x71d53B5B7141E1ec9A3Fc9Cc48b4766102d14A4A",
+        "0x7e0F65FAB1524dA9E2E5711D160541cf1199912E",
+    ]
+    for pool in pools:
+        oracle.registerPool(pool, {"from": gov})
+
+    with brownie.reverts("unauthorized"):
+        oracle.updateAll(0, 0, {"from": accounts[0]})
+
+    # plenty of gas, we should make it through everything in one go
+    tx = oracle.updateAll(0, 0, {"from": gov})
+    assert tx.return_value == 0
+    day = oracle.currentDay()
+    for pool in pools:
+        assert oracle.dailyUpdates(pool, day) == 1
+    print("Gas to update all registered pools:", tx.gas_used)
+
+    # now stop once we've burned through half of our gas, and sweep our pools over multiple calls
+    gas_limit = tx.gas_used
+    min_gas_left = gas_limit // 2
+    cursor = 0
+    calls = 0
+    while True:
+        tx = oracle.updateAll(
+            cursor, min_gas_left, {"from": gov, "gas_limit": gas_limit}
+        )
+        cursor = tx.return_value
+        calls += 1
+        if cursor == 0:
+            break
+        assert calls < len(pools)
+
+    # every pool should have been hit again, just over more than one call
+    assert calls > 1
+    for pool in pools:
+        assert oracle.dailyUpdates(pool, day) == 2
+
+    # a pool that runs out of gas isn't a failure, we just stop there so it's retried first next time
+    tx = oracle.updateAll(1, 30_000, {"from": gov, "gas_limit": 80_000})
+    assert tx.return_value == 1
+    assert "PriceUpdateFailed" not in tx.events
+    assert oracle.dailyUpdates(pools[1], day) == 2
+
+    # tryUpdateManyPrices has no cursor to hand back, so it reverts instead
+    with brownie.reverts("!gas"):
+        oracle.tryUpdateManyPrices(pools[:1], {"from": gov, "gas_limit": 80_000})
+
+
+def test_update_prices_packed(
+    gov,
+    oracle,
+):
+    # register the first 257 factory pools we can price. batches never repeat a pool (repeats in a block are
+    #  skipped), and our last pool needs a two-byte index.
+    def pack(width, indices):
+        return "0x{:02x}".format(width) + "".join(
+            "{:0{}x}".format(index, width * 2) for index in indices
+        )
+
+    # indices past the end of our registry should revert at either width
+    assert oracle.registeredPoolsLength() == 0
+    with brownie.reverts("!index"):
+        oracle.updatePricesPacked(pack(1, [0]), {"from": gov})
+
+    factory = Contract("0xF1046053aa5682b4F9a81b5481394DA16BE5FF5a")
+    pools = []
+    for i in range(factory.allPoolsLength()):
+        pool = factory.allPools(i)
+        try:
+            oracle.getFairReservesPrice(pool)
+        except brownie.exceptions.VirtualMachineError:
+            continue
+        oracle.registerPool(pool, {"from": gov})
+        pools.append(pool)
+        if len(pools) == 257:
+            break
+    assert oracle.registeredPoolsLength() == 257
+
+    # every pool we pass should be updated exactly once, in our transaction, and no others
+    day = oracle.currentDay()
+    updates = [0] * len(pools)
+
+    def check_updated(tx, indices):
+        for index in indices:
+            updates[index] += 1
+            assert oracle.lastPrices(pools[index])[2] == tx.block_number
+        assert oracle.getDailyLowsRange(pools, day, 1)[1] == updates
+
+    with brownie.reverts("unauthorized"):
+        oracle.updatePricesPacked(pack(1, [0]), {"from": accounts[0]})
+    with brownie.reverts("!indices"):
+        oracle.updatePricesPacked("0x", {"from": gov})
+    with brownie.reverts("!width"):
+        oracle.updatePricesPacked("0x0300", {"from": gov})
+
+    # our payload must hold a whole number of indices of our width
+    with brownie.reverts("!length"):
+        oracle.updatePricesPacked("0x02000100", {"from": gov})
+    with brownie.reverts("!length"):
+        oracle.updatePricesPacked(pack(2, [0, 1])[:-2], {"from": gov})
+
+    # both widths should hit the same pools, but only two bytes can reach our last pool
+    tx = oracle.updatePricesPacked(pack(1, [0, 3, 255]), {"from": gov})
+    check_updated(tx, [0, 3, 255])
+    tx = oracle.updatePricesPacked(pack(2, [0, 3, 255, 256]), {"from": gov})
+    check_updated(tx, [0, 3, 255, 256])
+    with brownie.reverts("!index"):
+        oracle.updatePricesPacked(pack(2, [257]), {"from": gov})
+    with brownie.reverts("!index"):
+        oracle.updatePricesPacked(pack(2, [0, 65535]), {"from": gov})
+
+    # compare calldata size and gas vs a standard address array, with every pool in a batch doing a real update
+    for size in [10, 50, 200]:
+        indices = list(range(size))
+        addresses = [pools[i] for i in indices]
+        packed = pack(1, indices)
+
+        array_calldata = (len(oracle.updateManyPrices.encode_input(addresses)) - 2) // 2
+        packed_calldata = (len(oracle.updatePricesPacked.encode_input(packed)) - 2) // 2
+        tx = oracle.updateManyPrices(addresses, {"from": gov})
+        check_updated(tx, indices)
+        array_gas = tx.gas_used
+        tx = oracle.updatePricesPacked(packed, {"from": gov})
+        check_updated(tx, indices)
+        packed_gas = tx.gas_used
+
+        print("Batch of", size)
+        print(
+            "Calldata bytes, address array:", array_calldata, "packed:", packed_calldata
+        )
+        print("Gas, address array:", array_gas, "packed:", packed_gas)
+        assert packed_calldata < array_calldata
+
+    # big batches should be more than 10x smaller
+    assert array_calldata > packed_calldata * 10
+
+
+def test_needs_update(
+    gov,
+    oracle,
+):
+    # OP-USDC, OP-WETH, alETH-WETH
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",
+        "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",
+    ]
+
+    # nothing updated yet today, so everything needs an update
+    assert oracle.needsUpdate(pools) == [0b111]
+
+    # once updated, prices haven't moved so there's no new low to record
+    oracle.updateManyPrices(pools[:2], {"from": gov})
+    assert oracle.needsUpdate(pools) == [0b100]
+    oracle.updatePrice(pools[2], {"from": gov})
+    assert oracle.needsUpdate(pools) == [0]
+
+    # a new day means everything needs an update again
+    chain.sleep(86400)
+    chain.mine(1)
+    assert oracle.needsUpdate(pools) == [0b111]
+
+    # pools we can't price are skipped rather than reverting our whole check
+    op = "0x4200000000000000000000000000000000000042"
+    assert oracle.needsUpdate([pools[0], op, pools[2]]) == [0b101]
+    assert oracle.needsUpdate([op]) == [0]
+
+    # large lists should spill into more words
+    many_pools = pools * 100
+    bitmap = oracle.needsUpdate(many_pools)
+    assert len(bitmap) == 2
+    assert bitmap[0] == 2**256 - 1
+    assert bitmap[1] == 2 ** (len(many_pools) - 256) - 1
+
+
+def test_many_vault_prices(
+    gov,
+    oracle,
+):
+    # OP-WETH V2 vault, along with fresh V2 and V3 vaults for OP-USDC and alETH-WETH
+    op_weth_vault = Contract("0xDdDCAeE873f2D9Df0E18a80709ef2B396d4a6EA5")
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",
+    ]
+    v2_vaults = [op_weth_vault.address]
+    for pool in pools:
+        # minimal proxy to our OP-WETH vault's code, so it gets its own storage
+        tx = gov.transfer(
+            data="0x3d602d80600a3d3981f3363d3d373d3d3d363d73"
+            + op_weth_vault.address[2:]
+            + "5af43d82803e903d91602b57fd5bf3"
+        )
+        vault = Contract.from_abi("Vault", tx.contract_address, op_weth_vault.abi)
+        vault.initialize(pool, gov, gov, "", "", {"from": gov})
+        assert vault.token() == pool
+        v2_vaults.append(vault.address)
+
+    v3_factory = Contract("0x444045c5C13C246e117eD36437303cac8E250aB0")
+    v3_vaults = []
+    for pool in pools + [op_weth_vault.token()]:
+        tx = v3_factory.deploy_new_vault(
+            pool, "Velodrome LP Vault", "yvLP", gov, 86400 * 7, {"from": gov}
+        )
+        v3_vaults.append(tx.return_value)
+
+    assert oracle.getManyVaultPricesV2([]) == []
+    assert oracle.getManyVaultPricesV3([]) == []
+
+    # each vault should match its single pricing, with or without pessimistic pricing
+    for use_adjusted in [True, False]:
+        oracle.setUseAdjustedPrice(use_adjusted, False, {"from": gov})
+        batch = v2_vaults + v2_vaults[::-1]
+        assert oracle.getManyVaultPricesV2(batch) == [
+            oracle.getCurrentVaultPriceV2(vault) for vault in batch
+        ]
+        batch = v3_vaults + v3_vaults[::-1]
+        assert oracle.getManyVaultPricesV3(batch) == [
+            oracle.getCurrentVaultPriceV3(vault) for vault in batch
+        ]
+
+    # repeat vaults are just a cache lookup
+    single_gas = oracle.getManyVaultPricesV2.estimate_gas(v2_vaults)
+    repeat_gas = oracle.getManyVaultPricesV2.estimate_gas(v2_vaults * 2)
+    assert repeat_gas - single_gas < single_gas / 10
+    single_gas = oracle.getManyVaultPricesV3.estimate_gas(v3_vaults)
+    repeat_gas = oracle.getManyVaultPricesV3.estimate_gas(v3_vaults * 2)
+    assert repeat_gas - single_gas < single_gas / 10
+
+
+def test_memoized_prices(
+    gov,
+    oracle,
+):
+    # OP-USDC
+    pool = "0x0df083de449F75691fc5A36477a6f3284C269108"
+    oracle.updatePrice(pool, {"from": gov})
+
+    # memoized prices should match our views
+    assert oracle.getMemoizedPoolPrice.call(pool) == oracle.getCurrentPoolPrice(pool)
+    assert oracle.getMemoizedFairReservesPrice.call(
+        pool
+    ) == oracle.getFairReservesPrice(pool)
+
+    # first read prices the pool, each repeat within the same transaction is just a TLOAD
+    repeats = 10
+    first_read = oracle.getManyMemoizedPoolPrices([pool], {"from": gov})
+    many_reads = oracle.getManyMemoizedPoolPrices([pool] * (repeats + 1), {"from": gov})
+    repeat_gas = (many_reads.gas_used - first_read.gas_used) / repeats
+    print("First read gas:", first_read.gas_used)
+    print("Repeat read gas:", repeat_gas)
+    assert repeat_gas < first_read.gas_used / 10
+    assert many_reads.return_value == [first_read.return_value[0]] * (repeats + 1)
+
+    # memos don't outlive their transaction
+    oracle.setUseAdjustedPrice(False, False, {"from": gov})
+    assert oracle.getMemoizedPoolPrice.call(pool) == oracle.getFairReservesPrice(pool)
+
+
+def test_cached_pool_price(
+    gov,
+    oracle,
+):
+    # OP-USDC
+    pool = "0x0df083de449F75691fc5A36477a6f3284C269108"
+
+    # nothing stored yet, so we price live
+    assert oracle.getCachedPoolPrice(pool, 3600) == oracle.getCurrentPoolPrice(pool)
+
+    oracle.updatePrice(pool, {"from": gov})
+    fair_price, timestamp, block_number, _ = oracle.lastPrices(pool)
+    assert fair_price == oracle.getFairReservesPrice(pool)
+    assert timestamp == chain[-1].timestamp
+    assert block_number == chain[-1].number
+    adjusted_price = oracle.getCurrentPoolPrice(pool)
+    assert oracle.getCachedPoolPrice(pool, 3600) == adjusted_price
+
+    # reading our stored price should be much cheaper than pricing live
+    cached_gas = oracle.getCachedPoolPrice.estimate_gas(pool, 3600)
+    live_gas = oracle.getCurrentPoolPrice.estimate_gas(pool)
+    print("Cached read gas:", cached_gas, "Live read gas:", live_gas)
+    assert cached_gas < live_gas
+
+    # too old, so we price live again
+    chain.sleep(1)
+    chain.mine(1)
+    assert oracle.getCachedPoolPrice(pool, 0) == oracle.getCurrentPoolPrice(pool)
+
+    # price bounds still apply to stored prices
+    oracle.setManualPriceCaps(pool, adjusted_price - 1, 0, {"from": gov})
+    with brownie.reverts("Price above upper bound"):
+        oracle.getCachedPoolPrice(pool, 3600)
+    oracle.setManualPriceCaps(pool, 0, 0, {"from": gov})
+
+    # our window is applied on read, so our stored price is still good after midnight
+    chain.sleep(86400 - chain.time() % 86400 - 60)
+    oracle.updatePrice(pool, {"from": gov})
+    timestamp = chain[-1].timestamp
+    chain.sleep(120)
+    chain.mine(1)
+    assert oracle.getCachedPoolPriceWithTimestamp(pool, 3600) == (
+        oracle.getCurrentPoolPrice(pool),
+        timestamp,
+    )
+
+    # but any pricing settings change means we price live until our next update. alETH-WETH, alETH is TWAP.
+    aleth_pool = "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a"
+    oracle.updatePrice(aleth_pool, {"from": gov})
+    oracle.setUseChainlinkOnly(True, {"from": gov})
+    with brownie.reverts("Only Chainlink feeds supported"):
+        oracle.getCachedPoolPrice(aleth_pool, 3600)
+    oracle.setUseChainlinkOnly(False, {"from": gov})
+    chain.sleep(10)
+    chain.mine(1)
+    price, updated_at = oracle.getCachedPoolPriceWithTimestamp(aleth_pool, 3600)
+    assert price == oracle.getCurrentPoolPrice(aleth_pool)
+    assert updated_at > oracle.lastPrices(aleth_pool)[1]
+
+    # settings applied on read, or that only change another pool's fair price, leave our stored price alone
+    oracle.updatePrice(aleth_pool, {"from": gov})
+    stored_at = oracle.lastPrices(aleth_pool)[1]
+    oracle.setManualPriceCaps(aleth_pool, 0, 0, {"from": gov})
+    oracle.setWindowDays(aleth_pool, 5, {"from": gov})
+    oracle.setUseAdjustedPrice(
+        oracle.useAdjustedPricing(), oracle.useThreeDayLow(), {"from": gov}
+    )
+    oracle.setPointsOverride(pool, 6, {"from": gov})
+    oracle.setUseCumulativeTwap(pool, True, {"from": gov})
+    chain.sleep(10)
+    chain.mine(1)
+    assert oracle.getCachedPoolPriceWithTimestamp(aleth_pool, 3600)[1] == stored_at
+
+    # but changing our pool's own TWAP settings does
+    oracle.setPointsOverride(aleth_pool, 6, {"from": gov})
+    chain.sleep(10)
+    chain.mine(1)
+    assert oracle.getCachedPoolPriceWithTimestamp(aleth_pool, 3600)[1] > stored_at
+    oracle.updatePrice(aleth_pool, {"from": gov})
+    stored_at = oracle.lastPrices(aleth_pool)[1]
+    oracle.setUseCumulativeTwap(aleth_pool, True, {"from": gov})
+    chain.sleep(10)
+    chain.mine(1)
+    assert oracle.getCachedPoolPriceWithTimestamp(aleth_pool, 3600)[1] > stored_at
+    oracle.setUseCumulativeTwap(aleth_pool, False, {"from": gov})
+    oracle.setPointsOverride(aleth_pool, 0, {"from": gov})
+    oracle.setWindowDays(aleth_pool, 0, {"from": gov})
+
+    # a second update in the same block is skipped, and isn't counted in our daily updates
+    day = oracle.currentDay()
+    updates = oracle.dailyUpdates(pool, day)
+    oracle.updateManyPrices([pool, pool], {"from": gov})
+    assert oracle.dailyUpdates(pool, day) == updates + 1
+
+
+# only a pool's first update in a block is recorded, even if its price moves before the next one
+def test_same_block_updates(
+    gov,
+    oracle,
+):
+    # OP-WETH, we'll swap a lot of OP in between two updates
+    pool = "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3"
+    op = Contract("0x4200000000000000000000000000000000000042")
+    weth = "0x4200000000000000000000000000000000000006"
+    whale = accounts.at("0x2A82Ae142b2e62Cb7D10b55E323ACB1Cab663a26", force=True)
+    router = Contract("0xa062aE8A9c5e11aaA026fc2670B0D65cCc8B2858")
+    op.approve(router, 2**256 - 1, {"from": whale})
+    route = [[op.address, weth, False, "0xF1046053aa5682b4F9a81b5481394DA16BE5FF5a"]]
+    day = oracle.currentDay()
+    price_before = oracle.getFairReservesPrice(pool)
+
+    # queue everything up, then mine it all in one block
+    pending = {"gas_limit": 2_000_000, "required_confs": 0}
+    web3.provider.make_request("evm_setAutomine", [False])
+    try:
+        txs = [
+            oracle.updatePrice(pool, {"from": gov, **pending}),
+            router.swapExactTokensForTokens(
+                200e24, 0, route, whale, 2**256 - 1, {"from": whale, **pending}
+            ),
+            oracle.updatePrice(pool, {"from": gov, **pending}),
+        ]
+        chain.mine(1)
+    finally:
+        web3.provider.make_request("evm_setAutomine", [True])
+    for tx in txs:
+        tx.wait(1)
+        assert tx.status == 1
+    assert len({tx.block_number for tx in txs}) == 1
+
+    # our swap moved the pool's price, but we keep what our first update saw and only count it once
+    price_after = oracle.getFairReservesPrice(pool)
+    assert price_after != price_before
+    assert oracle.lastPrices(pool)[0] == price_before
+    assert oracle.dailyLows(pool, day) == price_before
+    assert oracle.dailyUpdates(pool, day) == 1
+
+    # our next update in a later block picks it up
+    oracle.updatePrice(pool, {"from": gov})
+    assert oracle.lastPrices(pool)[0] == price_after
+    assert oracle.dailyLows(pool, day) == min(price_before, price_after)
+    assert oracle.dailyUpdates(pool, day) == 2
+
+
+def test_aggregator_adapters(
+    gov,
+    oracle,
+    PessimisticLPAggregator,
+    PessimisticLPAggregatorFactory,
+):
+    # OP-USDC, OP-WETH, alETH-WETH
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",
+        "0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a",
+    ]
+    max_age = 3600
+    factory = gov.deploy(PessimisticLPAggregatorFactory, oracle)
+    predicted = factory.predictAggregatorAddress(pools[0], max_age)
+
+    # clones should be much cheaper to deploy than a full aggregator
+    tx = factory.createAggregators(pools, max_age, {"from": gov})
+    assert tx.return_value[0] == predicted
+    assert len(tx.events["AggregatorCreated"]) == len(pools)
+    full_deploy = gov.deploy(PessimisticLPAggregator, oracle)
+    clone_gas = tx.gas_used / len(pools)
+    print("Gas per clone:", clone_gas, "Full deploy:", full_deploy.tx.gas_used)
+    assert clone_gas < full_deploy.tx.gas_used / 2
+
+    with brownie.reverts("Aggregator already exists"):
+        factory.createAggregator(pools[0], max_age, {"from": gov})
+
+    # each clone gets its own pool, but shares our oracle
+    aggregator = PessimisticLPAggregator.at(predicted)
+    assert factory.aggregators(pools[0], max_age) == aggregator
+    assert aggregator.pool() == pools[0]
+    assert aggregator.maxAge() == max_age
+    assert aggregator.oracle() == oracle
+    assert aggregator.decimals() == 8
+    print("Description:", aggregator.description())
+    assert PessimisticLPAggregator.at(tx.return_value[1]).pool() == pools[1]
+
+    # nothing stored yet, so we price live as of this block
+    round_id, answer, started_at, updated_at, answered_in_round = (
+        aggregator.latestRoundData()
+    )
+    assert answer == oracle.getCurrentPoolPrice(pools[0])
+    assert round_id == started_at == updated_at == answered_in_round
+    assert updated_at >= chain[-1].timestamp
+
+    # once updated, we should serve our stored price
+    oracle.updatePrice(pools[0], {"from": gov})
+    round_id, answer, started_at, updated_at, answered_in_round = (
+        aggregator.latestRoundData()
+    )
+    assert answer == oracle.getCachedPoolPrice(pools[0], max_age)
+    assert answer == aggregator.latestAnswer()
+    assert updated_at == chain[-1].timestamp
+    assert round_id == answered_in_round == updated_at
+    assert aggregator.getRoundData(round_id) == aggregator.latestRoundData()
+    with brownie.reverts("Only latest round available"):
+        aggregator.getRoundData(round_id - 1)
+
+    # once our stored price is too old we price live, and our timestamp and round move along with our answer
+    stored_at = updated_at
+    chain.sleep(max_age + 1)
+    chain.mine(1)
+    round_id, answer, started_at, updated_at, answered_in_round = (
+        aggregator.latestRoundData()
+    )
+    assert answer == oracle.getCurrentPoolPrice(pools[0])
+    assert round_id == started_at == updated_at == answered_in_round
+    assert updated_at >= chain[-1].timestamp > stored_at + max_age
+    assert aggregator.getRoundData(round_id) == aggregator.latestRoundData()
+    with brownie.reverts("Only latest round available"):
+        aggregator.getRoundData(stored_at)
+
+
+def test_single_oracle_factory(
+    gov,
+    PessimisticVeloSingleOracle,
+    PessimisticVeloSingleOracleClone,
+    PessimisticVeloSingleOracleFactory,
+):
+    weth_feed = "0x13e3Ee699D1909E989722E753853AE30b17e08c5"
+    usdc_feed = "0x16a9FA2FDa030272Ce99B29CF780dFA30361E0f3"
+    op_feed = "0x0D276FC14719f9292D5C1eA2198673d1f4269246"
+    weth = "0x4200000000000000000000000000000000000006"
+    op = "0x4200000000000000000000000000000000000042"
+    usdc = "0x7F5c764cBc14f9669B88837ca1490cCa17c31607"
+    token_feeds = {weth: weth_feed, op: op_feed, usdc: usdc_feed}
+
+    # rETH-WETH (WETH feed only), OP-USDC and OP-WETH
+    pools = [
+        "0x7e0F65FAB1524dA9E2E5711D160541cf1199912E",
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",
+    ]
+
+    factory = gov.deploy(PessimisticVeloSingleOracleFactory, gov)
+    factory.setOperator(gov, True, {"from": gov})
+
+    oracles = []
+    for pool in pools:
+        velo_pool = interface.IVeloPoolV2(pool)
+        feed0 = token_feeds.get(velo_pool.token0(), ZERO_ADDRESS)
+        feed1 = token_feeds.get(velo_pool.token1(), ZERO_ADDRESS)
+        args = (pool, False, feed0, feed1, 864000, 864000, 4, gov)
+
+        # clones should be much cheaper to deploy, and price exactly the same
+        tx = factory.createOracle(*args, {"from": gov})
+        clone = PessimisticVeloSingleOracleClone.at(tx.return_value)
+        full_deploy = gov.deploy(PessimisticVeloSingleOracle, *args)
+        print("Clone deploy gas:", tx.gas_used, "Full deploy:", full_deploy.tx.gas_used)
+        assert tx.gas_used < full_deploy.tx.gas_used / 2
+        fair_price = full_deploy.getCurrentPoolPrice(False)
+        assert clone.getCurrentPoolPrice(False) == fair_price
+
+        # clones should look just like a full deployment
+        getters = ["pool", "token0", "token1", "token0Feed", "token1Feed", "points"]
+        for getter in getters:
+            assert getattr(clone, getter)() == getattr(full_deploy, getter)()
+        assert clone.owner() == gov
+        assert clone.operator(factory)
+        assert factory.getPoolOracles(pool) == [clone]
+        oracles.append(clone)
+
+    with brownie.reverts("initialized"):
+        oracles[0].initialize(gov, gov, {"from": gov})
+    with brownie.reverts():
+        factory.createOracle(*args, {"from": accounts[0]})
+
+    # one keeper transaction should update every oracle
+    assert factory.getAllOracles() == oracles
+    with brownie.reverts("unauthorized"):
+        factory.updateMany(oracles, {"from": accounts[0]})
+    tx = factory.updateMany(factory.getAllOracles(), {"from": gov})
+    print("Gas to update all single oracles:", tx.gas_used)
+    for oracle in oracles:
+        assert oracle.dailyUpdates(oracle.currentDay()) == 1
+
+    # batch views should match each oracle
+    for use_pessimistic in [True, False]:
+        prices = factory.getManyPoolPrices(oracles, use_pessimistic)
+        for oracle, price in zip(oracles, prices):
+            assert price == oracle.getCurrentPoolPrice(use_pessimistic)
+
+
+def test_batch_setters(
+    gov,
+    oracle,
+):
+    # our fixture sets all of its feeds in one transaction
+    weth = "0x4200000000000000000000000000000000000006"
+    weth_feed = "0x13e3Ee699D1909E989722E753853AE30b17e08c5"
+    assert oracle.feeds(weth) == (weth_feed, 864000)
+
+    # onboarding 50 feeds should fit in one transaction with a single event
+    tokens = ["0x{:040x}".format(i + 1) for i in range(50)]
+    feeds = [weth_feed] * 50
+    with brownie.reverts("ONLY OPERATOR"):
+        oracle.setFeeds(tokens, feeds, [86400] * 50, {"from": accounts[0]})
+    with brownie.reverts("!length"):
+        oracle.setFeeds(tokens, feeds, [86400] * 49, {"from": gov})
+    tx = oracle.setFeeds(tokens, feeds, [86400] * 50, {"from": gov})
+    print("Gas to set 50 feeds:", tx.gas_used)
+    assert len(tx.events["SetTokenFeeds"]) == 1
+    assert "SetTokenFeed" not in tx.events
+    assert oracle.feeds(tokens[0]) == (weth_feed, 86400)
+
+    # OP-USDC, OP-WETH
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",
+    ]
+    with brownie.reverts("Lower bound cannot be higher than upper"):
+        oracle.setManyManualPriceCaps(pools, [100, 200], [50, 300], {"from": gov})
+    with brownie.reverts("!length"):
+        oracle.setManyManualPriceCaps(pools, [100], [50, 60], {"from": gov})
+    tx = oracle.setManyManualPriceCaps(pools, [100, 200], [50, 60], {"from": gov})
+    assert len(tx.events["ManyManualPriceCapsUpdated"]) == 1
+    assert oracle.upperPriceBound(pools[1]) == 200
+    assert oracle.lowerPriceBound(pools[1]) == 60
+
+    with brownie.reverts("!length"):
+        oracle.setManyPointsOverrides(pools, [6], {"from": gov})
+    tx = oracle.setManyPointsOverrides(pools, [6, 8], {"from": gov})
+    assert len(tx.events["UpdatedManyPointsOverrides"]) == 1
+    assert oracle.pointsOverride(pools[0]) == 6
+    assert oracle.pointsOverride(pools[1]) == 8
+
+
+def test_daily_lows_range(
+    gov,
+    oracle,
+):
+    # OP-USDC, OP-WETH, and SNX-USDC, which we never update
+    pools = [
+        "0x0df083de449F75691fc5A36477a6f3284C269108",
+        "0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3",
+        "0x71d53B5B7141E1ec9A3Fc9Cc48b4766102d14A4A",
+    ]
+    start_day = oracle.currentDay()
+
+    # update over five days so some of our lows are archived
+    for i in range(5):
+        for _ in range(i + 1):
+            oracle.updateManyPrices(pools[:2], {"from": gov})
+        chain.sleep(86400)
+        chain.mine(1)
+
+    # include a day before and after our updates
+    num_days = 7
+    lows, updates = oracle.getDailyLowsRange(pools, start_day - 1, num_days)
+    assert len(lows) == len(updates) == len(pools) * num_days
+    for i, pool in enumerate(pools):
+        for j in range(num_days):
+            day = start_day - 1 + j
+            assert lows[i * num_days + j] == oracle.dailyLows(pool, day)
+            assert updates[i * num_days + j] == oracle.dailyUpdates(pool, day)
+    assert list(updates[1:6]) == [1, 2, 3, 4, 5]
+    assert sum(updates[2 * num_days :]) == 0
+
+
+def test_feed_health(
+    gov,
+    oracle,
+):
+    weth = "0x4200000000000000000000000000000000000006"
+    weth_feed = "0x13e3Ee699D1909E989722E753853AE30b17e08c5"
+    usdc = "0x7F5c764cBc14f9669B88837ca1490cCa17c31607"
+    usdc_feed = "0x16a9FA2FDa030272Ce99B29CF780dFA30361E0f3"
+    no_feed = "0x0000000000000000000000000000000000000001"
+
+    # drop our WETH heartbeat so it's stale
+    oracle.setFeed(weth, weth_feed, 1, {"from": gov})
+    health, sequencer_up, sequencer_since = oracle.getFeedHealth([weth, usdc, no_feed])
+    assert sequencer_up
+    assert 0 < sequencer_since <= chain.time()
+
+    feed, heartbeat, answer, updated_at, seconds_until_stale, is_stale = health[0]
+    assert feed == weth_feed
+    assert heartbeat == 1
+    assert answer > 0
+    assert updated_at == oracle.chainlinkPriceLastUpdated(weth)
+    assert seconds_until_stale == 0
+    assert is_stale
+
+    feed, heartbeat, answer, updated_at, seconds_until_stale, is_stale = health[1]
+    assert feed == usdc_feed
+    assert answer == oracle.getChainlinkPrice(usdc)
+    assert seconds_until_stale > 0
+    assert not is_stale
+
+    # missing feeds are stale, but don't revert
+    assert health[2] == (ZERO_ADDRESS, 0, 0, 0, 0, True)
+
+    # feeds getChainlinkPrice would reject for anything besides age are stale too. these return the same five words for
+    #  any call, so the first word is both their round id and their decimals.
+    def fixed_feed(decimals, updated_at):
+        words = [decimals, 10**8, updated_at, updated_at, decimals]
+        runtime = "60a0600c60003960a06000f3" + "".join(f"{word:064x}" for word in words)
+        tx = gov.transfer(data="0x60ac600c60003960ac6000f3" + runtime)
+        return tx.contract_address
+
+    now = chain.time()
+    wrong_decimals = fixed_feed(18, now)
+    from_the_future = fixed_feed(8, now + 3600)
+    fine = fixed_feed(8, now)
+    oracle.setFeeds(
+        [weth, usdc, no_feed],
+        [wrong_decimals, from_the_future, fine],
+        [86400] * 3,
+        {"from": gov},
+    )
+    health, _, _ = oracle.getFeedHealth([weth, usdc, no_feed])
+    assert [feed_health[5] for feed_health in health] == [True, True, False]
+    assert [feed_health[4] for feed_health in health[:2]] == [0, 0]
+    for token in [weth, usdc]:
+        with brownie.reverts():
+            oracle.getChainlinkPrice(token)
+    assert oracle.getChainlinkPrice(no_feed) == 10**8
+
+
+def test_price_breakdown(
+    gov,
+    oracle,
+):
+    # tBTC-WETH (vAMM, tBTC is TWAP) and alETH-WETH (sAMM, alETH is TWAP)
+    tbtc = "0x6c84a8f1c29108F47a79964b5Fe888D4f4D0dE40"
+    aleth = "0x3E29D3A9316dAB217754d13b28646B76607c5f04"
+    for pool, twap_token in [
+        ("0xadBB23Bcc3C1B9810491897cb0690Cf645B858b1", tbtc),
+        ("0xa1055762336F92b4B8d2eDC032A0Ce45ead6280a", aleth),
+    ]:
+        oracle.updatePrice(pool, {"from": gov})
+        breakdown = oracle.getPriceBreakdown(pool)
+        assert breakdown["twapToken"] == twap_token
+        assert breakdown["twapQuote"] > 0
+        assert (breakdown["price0"], breakdown["price1"]) == oracle.getTokenPrices(
+            pool
+        )
+        assert breakdown["fairPrice"] == oracle.getFairReservesPrice(pool)
+        assert breakdown["todaysLow"] == oracle.dailyLows(pool, oracle.currentDay())
+        assert breakdown["adjustedPrice"] <= breakdown["fairPrice"]
+        assert breakdown["reportedPrice"] == oracle.getCurrentPoolPrice(pool)
+        assert not breakdown["outOfBounds"]
+
+    # volatile pool with both feeds, check our k directly
+    pool = interface.IVeloPoolV2("0xd25711EdfBf747efCE181442Cc1D8F5F8fc8a0D3")
+    breakdown = oracle.getPriceBreakdown(pool)
+    reserve0, reserve1, _ = pool.getReserves()
+    assert not breakdown["stable"]
+    assert breakdown["twapToken"] == ZERO_ADDRESS
+    assert breakdown["twapQuote"] == 0
+    assert breakdown["reserve0"] == reserve0
+    assert breakdown["reserve1"] == reserve1
+    assert breakdown["k"] == math.isqrt(reserve0 * reserve1)
+    assert breakdown["totalSupply"] == pool.totalSupply()
+
+    # our bounds are flagged instead of reverting
+    if oracle.useAdjustedPricing():
+        price = breakdown["adjustedPrice"]
+        oracle.setManualPriceCaps(pool, price - 1, 0, {"from": gov})
+        with brownie.reverts("Price above upper bound"):
+            oracle.getCurrentPoolPrice(pool)
+        breakdown = oracle.getPriceBreakdown(pool)
+        assert breakdown["upperBound"] == price - 1
+        assert breakdown["outOfBounds"]
+        assert breakdown["reportedPrice"] == 0
+
+
+def test_window_days(
+    gov,
+    oracle,
+):
+    # OP-USDC (vAMM, both chainlink)
+    pool = "0x0df083de449F75691fc5A36477a6f3284C269108"
+    op = "0x4200000000000000000000000000000000000042"
+    op_feed = "0x0D276FC14719f9292D5C1eA2198673d1f4269246"
+    usdc = "0x7F5c764cBc14f9669B88837ca1490cCa17c31607"
+    # USDC, DAI and USDT feeds, rotated on USDC so our daily lows differ
+    stable_feeds = [
+        "0x16a9FA2FDa030272Ce99B29CF780dFA30361E0f3",
+        "0x8dba75e83da73cc766a7e5a0ee71f656bab470d6",
+        "0xecef79e109e997bca29c1c0897ec9d7b03647f5e",
+    ]
+
+    # long heartbeats so our feeds don't go stale while we sleep
+    oracle.setFeeds(
+        [op, usdc], [op_feed, stable_feeds[0]], [86400 * 100] * 2, {"from": gov}
+    )
+    oracle.setUseAdjustedPrice(True, False, {"from": gov})
+    assert oracle.getWindowDays(pool) == 2
+
+    with brownie.reverts("!window"):
+        oracle.setWindowDays(pool, 1, {"from": gov})
+    with brownie.reverts("!window"):
+        oracle.setWindowDays(pool, oracle.MAX_WINDOW_DAYS() + 1, {"from": gov})
+    with brownie.reverts("ONLY OPERATOR"):
+        oracle.setWindowDays(pool, 7, {"from": accounts[0]})
+
+    def brute_force_low(window_days):
+        today = oracle.currentDay()
+        lows = [oracle.dailyLows(pool, today - i) for i in range(window_days)]
+        return min([oracle.getFairReservesPrice(pool)] + [x for x in lows if x > 0])
+
+    # update most days, skipping some so we have gaps and stale buffers
+    skipped_days = [4, 8, 9]
+    for i in range(14):
+        if i == 5:
+            oracle.setWindowDays(pool, 7, {"from": gov})
+        window_days = oracle.getWindowDays(pool)
+
+        # read before our first update of the day, then after it
+        assert oracle.getCurrentPoolPrice(pool) == brute_force_low(window_days)
+        first_read_gas = oracle.getCurrentPoolPrice.estimate_gas(pool)
+        if i not in skipped_days:
+            oracle.updatePrice(pool, {"from": gov})
+            assert oracle.getCurrentPoolPrice(pool) == brute_force_low(window_days)
+            assert oracle.getPriceBreakdown(pool)["windowDays"] == window_days
+
+            # our older lows were already worked out yesterday (or when we set our window), unless we skipped a
+            #  whole day and have to look up each archived day
+            if window_days > 3:
+                read_gas = oracle.getCurrentPoolPrice.estimate_gas(pool)
+                if i - 1 in skipped_days and i != 5:
+                    assert first_read_gas > read_gas + 5_000
+                else:
+                    assert abs(first_read_gas - read_gas) < 1_000
+
+            # rotate our USDC feed for tomorrow
+            oracle.setFeed(usdc, stable_feeds[i * 2 % 3], 86400 * 100, {"from": gov})
+
+        chain.sleep(86400)
+        chain.mine(1)
+
+    # our longer window actually reaches past our three-day buffer
+    today = oracle.currentDay()
+    assert any(oracle.dailyLows(pool, today - i) for i in range(3, 7))
+
+    # shrinking our window only uses the most recent lows again
+    for window_days in [2, 3, 6, 0]:
+        oracle.setWindowDays(pool, window_days, {"from": gov})
+        assert oracle.getCurrentPoolPrice(pool) == brute_force_low(
+            oracle.getWindowDays(pool)
+        )
+
+
 def test_aleth_only(
     gov,
     oracle,